@@ -16,30 +16,126 @@ load_dotenv()
 LLM_API_ENDPOINT = os.getenv("LLM_API_ENDPOINT", "http://127.0.0.1:1234/v1/chat/completions")
 TTS_API_ENDPOINT = os.getenv("TTS_API_ENDPOINT", "http://localhost:5005/v1/audio/speech")
 
+# LLM Routing (LLM_API_ENDPOINT may list several servers, separated by commas)
+LLM_API_ENDPOINTS = [url.strip() for url in LLM_API_ENDPOINT.split(",") if url.strip()]
+LLM_PROBE_INTERVAL_S = float(os.getenv("LLM_PROBE_INTERVAL_S", 10))
+LLM_PROBE_TIMEOUT_S = float(os.getenv("LLM_PROBE_TIMEOUT_S", 2))
+
+# LLM Hedging and Circuit Breaker
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", 95))
+LLM_HEDGE_MIN_DELAY_S = float(os.getenv("LLM_HEDGE_MIN_DELAY_S", 0.5))
+LLM_HEDGE_MAX_DELAY_S = float(os.getenv("LLM_HEDGE_MAX_DELAY_S", 3))
+LLM_HEDGE_OPENAI = os.getenv("LLM_HEDGE_OPENAI", "false").lower() == "true"
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 3))
+LLM_BREAKER_COOLDOWN_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", 30))
+LLM_BREAKER_SLOW_S = float(os.getenv("LLM_BREAKER_SLOW_S", 10))
+
+# HTTP Connection Pool (shared by the LLM and TTS clients)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 20))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 10))
+HTTP_KEEPALIVE_EXPIRY_S = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_S", 60))
+HTTP_CONNECT_TIMEOUT_S = float(os.getenv("HTTP_CONNECT_TIMEOUT_S", 5))
+HTTP_READ_TIMEOUT_S = float(os.getenv("HTTP_READ_TIMEOUT_S", 60))
+HTTP_PREWARM_CONNECTIONS = int(os.getenv("HTTP_PREWARM_CONNECTIONS", 2))
+
+# LLM Prompt Cache (llama.cpp / LM Studio KV cache reuse)
+LLM_CACHE_PROMPT = os.getenv("LLM_CACHE_PROMPT", "true").lower() == "true"
+LLM_CACHE_SLOTS = int(os.getenv("LLM_CACHE_SLOTS", 0))
+
 # OpenAI Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "")
 OPENAI_TTS_VOICE = os.getenv("OPENAI_TTS_VOICE", "alloy")
 OPENAI_TTS_MODEL = os.getenv("OPENAI_TTS_MODEL", "tts-1")
 USE_OPENAI = os.getenv("USE_OPENAI", "false").lower() == "true"
 
 # Whisper Model Configuration
 WHISPER_MODEL = os.getenv("WHISPER_MODEL", "tiny.en")
+TRANSCRIPTION_WORKERS = int(os.getenv("TRANSCRIPTION_WORKERS", 1))
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", 0))
+WHISPER_NUM_WORKERS = int(os.getenv("WHISPER_NUM_WORKERS", 1))
+TRANSCRIPTION_MAX_BATCH_SIZE = int(os.getenv("TRANSCRIPTION_MAX_BATCH_SIZE", 1))
+TRANSCRIPTION_MAX_BATCH_WAIT_MS = float(os.getenv("TRANSCRIPTION_MAX_BATCH_WAIT_MS", 5.0))
+WHISPER_DECODING_PROFILE = os.getenv("WHISPER_DECODING_PROFILE", "balanced")
+
+# Whisper Model Registry
+WHISPER_MODEL_TIERS = [m.strip() for m in os.getenv("WHISPER_MODEL_TIERS", "").split(",") if m.strip()]
+WHISPER_MEMORY_BUDGET_MB = float(os.getenv("WHISPER_MEMORY_BUDGET_MB", 0))
+WHISPER_LOAD_FALLBACK_MODEL = os.getenv("WHISPER_LOAD_FALLBACK_MODEL", "")
+WHISPER_LOAD_FALLBACK_QUEUE_DEPTH = int(os.getenv("WHISPER_LOAD_FALLBACK_QUEUE_DEPTH", 4))
+
+# Whisper Autotuning
+WHISPER_AUTOTUNE = os.getenv("WHISPER_AUTOTUNE", "false").lower() == "true"
+WHISPER_AUTOTUNE_CLIP = os.getenv("WHISPER_AUTOTUNE_CLIP", "")
+WHISPER_AUTOTUNE_CACHE = os.getenv("WHISPER_AUTOTUNE_CACHE", os.path.join("cache", "whisper_autotune.json"))
+WHISPER_AUTOTUNE_WER_TOLERANCE = float(os.getenv("WHISPER_AUTOTUNE_WER_TOLERANCE", 0.1))
 
 # TTS Configuration
 TTS_MODEL = os.getenv("TTS_MODEL", "tts-1")
 TTS_VOICE = os.getenv("TTS_VOICE", "tara")
 TTS_FORMAT = os.getenv("TTS_FORMAT", "wav")
+TTS_SENTENCE_PIPELINE = os.getenv("TTS_SENTENCE_PIPELINE", "true").lower() == "true"
+TTS_MAX_PARALLEL = int(os.getenv("TTS_MAX_PARALLEL", 2))
+TTS_STREAM_CHUNK_MS = float(os.getenv("TTS_STREAM_CHUNK_MS", 250))
+
+# Opus Transcoding
+TTS_OPUS_ENABLED = os.getenv("TTS_OPUS_ENABLED", "false").lower() == "true"
+TTS_OPUS_BITRATE = os.getenv("TTS_OPUS_BITRATE", "24k")
+TTS_OPUS_FORMAT = os.getenv("TTS_OPUS_FORMAT", "opus")
+
+# TTS Cache
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+TTS_CACHE_MEMORY_MB = float(os.getenv("TTS_CACHE_MEMORY_MB", 32))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join("cache", "tts"))
+TTS_CACHE_DISK_MB = float(os.getenv("TTS_CACHE_DISK_MB", 512))
+TTS_CACHE_MAX_CHARS = int(os.getenv("TTS_CACHE_MAX_CHARS", 200))
+TTS_CACHE_PHRASES = os.getenv("TTS_CACHE_PHRASES", "")
+
+# Pre-generated Speech
+SPEECH_POOL_SIZE = int(os.getenv("SPEECH_POOL_SIZE", 2))
+SPEECH_POOL_FOLLOWUPS = os.getenv("SPEECH_POOL_FOLLOWUPS", "true").lower() == "true"
 
 # WebSocket Server Configuration
 WEBSOCKET_HOST = os.getenv("WEBSOCKET_HOST", "0.0.0.0")
 WEBSOCKET_PORT = int(os.getenv("WEBSOCKET_PORT", 8000))
+INTERRUPT_TIMEOUT_MS = float(os.getenv("INTERRUPT_TIMEOUT_MS", 250))
+WEBSOCKET_BINARY_FRAMES = os.getenv("WEBSOCKET_BINARY_FRAMES", "true").lower() == "true"
 
 # Audio Processing
 VAD_THRESHOLD = float(os.getenv("VAD_THRESHOLD", 0.5))
 VAD_BUFFER_SIZE = int(os.getenv("VAD_BUFFER_SIZE", 30))
 AUDIO_SAMPLE_RATE = int(os.getenv("AUDIO_SAMPLE_RATE", 48000))
 
+# Server-side Voice Activity Detection
+SERVER_VAD_ENABLED = os.getenv("SERVER_VAD_ENABLED", "true").lower() == "true"
+SERVER_VAD_BACKEND = os.getenv("SERVER_VAD_BACKEND", "energy")
+SERVER_VAD_PADDING_MS = float(os.getenv("SERVER_VAD_PADDING_MS", 200))
+SERVER_VAD_MIN_SPEECH_MS = float(os.getenv("SERVER_VAD_MIN_SPEECH_MS", 150))
+
+# Conversation Sessions
+SESSION_IDLE_TTL_S = float(os.getenv("SESSION_IDLE_TTL_S", 1800))
+SESSION_MEMORY_CAP_MB = float(os.getenv("SESSION_MEMORY_CAP_MB", 256))
+
+# Context Window
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 6000))
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "")
+
+# Conversation Compaction
+COMPACTION_ENABLED = os.getenv("COMPACTION_ENABLED", "true").lower() == "true"
+COMPACTION_THRESHOLD_TOKENS = int(os.getenv("COMPACTION_THRESHOLD_TOKENS", 3000))
+COMPACTION_KEEP_MESSAGES = int(os.getenv("COMPACTION_KEEP_MESSAGES", 6))
+COMPACTION_SUMMARY_TOKENS = int(os.getenv("COMPACTION_SUMMARY_TOKENS", 300))
+
+# Streaming Transcription
+STREAMING_PARTIAL_INTERVAL_MS = float(os.getenv("STREAMING_PARTIAL_INTERVAL_MS", 500))
+STREAMING_MAX_WINDOW_S = float(os.getenv("STREAMING_MAX_WINDOW_S", 20))
+
+# Speculative Replies
+SPECULATIVE_LLM_ENABLED = os.getenv("SPECULATIVE_LLM_ENABLED", "false").lower() == "true"
+SPECULATIVE_STABLE_MS = float(os.getenv("SPECULATIVE_STABLE_MS", 300))
+SPECULATIVE_SILENCE_MS = float(os.getenv("SPECULATIVE_SILENCE_MS", 250))
+
 def get_config() -> Dict[str, Any]:
     """
     Returns all configuration settings as a dictionary.
@@ -49,19 +145,85 @@ def get_config() -> Dict[str, Any]:
     """
     return {
         "llm_api_endpoint": LLM_API_ENDPOINT,
+        "llm_api_endpoints": LLM_API_ENDPOINTS,
+        "llm_probe_interval_s": LLM_PROBE_INTERVAL_S,
+        "llm_probe_timeout_s": LLM_PROBE_TIMEOUT_S,
+        "llm_hedge_percentile": LLM_HEDGE_PERCENTILE,
+        "llm_hedge_min_delay_s": LLM_HEDGE_MIN_DELAY_S,
+        "llm_hedge_max_delay_s": LLM_HEDGE_MAX_DELAY_S,
+        "llm_hedge_openai": LLM_HEDGE_OPENAI,
+        "llm_breaker_failures": LLM_BREAKER_FAILURES,
+        "llm_breaker_cooldown_s": LLM_BREAKER_COOLDOWN_S,
+        "llm_breaker_slow_s": LLM_BREAKER_SLOW_S,
         "tts_api_endpoint": TTS_API_ENDPOINT,
+        "http_max_connections": HTTP_MAX_CONNECTIONS,
+        "http_max_keepalive_connections": HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        "http_keepalive_expiry_s": HTTP_KEEPALIVE_EXPIRY_S,
+        "http_connect_timeout_s": HTTP_CONNECT_TIMEOUT_S,
+        "http_read_timeout_s": HTTP_READ_TIMEOUT_S,
+        "http_prewarm_connections": HTTP_PREWARM_CONNECTIONS,
+        "llm_cache_prompt": LLM_CACHE_PROMPT,
+        "llm_cache_slots": LLM_CACHE_SLOTS,
         "openai_api_key": OPENAI_API_KEY,
         "openai_model": OPENAI_MODEL,
+        "openai_base_url": OPENAI_BASE_URL,
         "openai_tts_voice": OPENAI_TTS_VOICE,
         "openai_tts_model": OPENAI_TTS_MODEL,
         "use_openai": USE_OPENAI,
         "whisper_model": WHISPER_MODEL,
+        "transcription_workers": TRANSCRIPTION_WORKERS,
+        "whisper_cpu_threads": WHISPER_CPU_THREADS,
+        "whisper_num_workers": WHISPER_NUM_WORKERS,
+        "transcription_max_batch_size": TRANSCRIPTION_MAX_BATCH_SIZE,
+        "transcription_max_batch_wait_ms": TRANSCRIPTION_MAX_BATCH_WAIT_MS,
+        "whisper_decoding_profile": WHISPER_DECODING_PROFILE,
+        "whisper_model_tiers": WHISPER_MODEL_TIERS,
+        "whisper_memory_budget_mb": WHISPER_MEMORY_BUDGET_MB,
+        "whisper_load_fallback_model": WHISPER_LOAD_FALLBACK_MODEL,
+        "whisper_load_fallback_queue_depth": WHISPER_LOAD_FALLBACK_QUEUE_DEPTH,
+        "whisper_autotune": WHISPER_AUTOTUNE,
+        "whisper_autotune_clip": WHISPER_AUTOTUNE_CLIP,
+        "whisper_autotune_cache": WHISPER_AUTOTUNE_CACHE,
+        "whisper_autotune_wer_tolerance": WHISPER_AUTOTUNE_WER_TOLERANCE,
         "tts_model": TTS_MODEL,
         "tts_voice": TTS_VOICE,
         "tts_format": TTS_FORMAT,
+        "tts_sentence_pipeline": TTS_SENTENCE_PIPELINE,
+        "tts_max_parallel": TTS_MAX_PARALLEL,
+        "tts_stream_chunk_ms": TTS_STREAM_CHUNK_MS,
+        "tts_opus_enabled": TTS_OPUS_ENABLED,
+        "tts_opus_bitrate": TTS_OPUS_BITRATE,
+        "tts_opus_format": TTS_OPUS_FORMAT,
+        "tts_cache_enabled": TTS_CACHE_ENABLED,
+        "tts_cache_memory_mb": TTS_CACHE_MEMORY_MB,
+        "tts_cache_dir": TTS_CACHE_DIR,
+        "tts_cache_disk_mb": TTS_CACHE_DISK_MB,
+        "tts_cache_max_chars": TTS_CACHE_MAX_CHARS,
+        "tts_cache_phrases": TTS_CACHE_PHRASES,
+        "speech_pool_size": SPEECH_POOL_SIZE,
+        "speech_pool_followups": SPEECH_POOL_FOLLOWUPS,
         "websocket_host": WEBSOCKET_HOST,
         "websocket_port": WEBSOCKET_PORT,
+        "interrupt_timeout_ms": INTERRUPT_TIMEOUT_MS,
+        "websocket_binary_frames": WEBSOCKET_BINARY_FRAMES,
         "vad_threshold": VAD_THRESHOLD,
         "vad_buffer_size": VAD_BUFFER_SIZE,
         "audio_sample_rate": AUDIO_SAMPLE_RATE,
+        "server_vad_enabled": SERVER_VAD_ENABLED,
+        "server_vad_backend": SERVER_VAD_BACKEND,
+        "server_vad_padding_ms": SERVER_VAD_PADDING_MS,
+        "server_vad_min_speech_ms": SERVER_VAD_MIN_SPEECH_MS,
+        "session_idle_ttl_s": SESSION_IDLE_TTL_S,
+        "session_memory_cap_mb": SESSION_MEMORY_CAP_MB,
+        "context_token_budget": CONTEXT_TOKEN_BUDGET,
+        "context_tokenizer": CONTEXT_TOKENIZER,
+        "compaction_enabled": COMPACTION_ENABLED,
+        "compaction_threshold_tokens": COMPACTION_THRESHOLD_TOKENS,
+        "compaction_keep_messages": COMPACTION_KEEP_MESSAGES,
+        "compaction_summary_tokens": COMPACTION_SUMMARY_TOKENS,
+        "streaming_partial_interval_ms": STREAMING_PARTIAL_INTERVAL_MS,
+        "streaming_max_window_s": STREAMING_MAX_WINDOW_S,
+        "speculative_llm_enabled": SPECULATIVE_LLM_ENABLED,
+        "speculative_stable_ms": SPECULATIVE_STABLE_MS,
+        "speculative_silence_ms": SPECULATIVE_SILENCE_MS,
     }
@@ -4,6 +4,7 @@ Vocalis Backend Server
 FastAPI application entry point.
 """
 
+import asyncio
 import logging
 import uvicorn
 from fastapi import FastAPI, WebSocket, Depends, HTTPException
@@ -14,14 +15,25 @@ from contextlib import asynccontextmanager
 from . import config
 
 # Import services
-from .services.transcription import WhisperTranscriber
+from .services.model_registry import WhisperModelRegistry
+from .services.vad import SpeechDetector
+from .services.whisper_autotune import WhisperAutotuner
+from .services.http_pool import HTTPConnectionPool
 from .services.llm import LLMClient
 from .services.tts import TTSClient
+from .services.tts_cache import TTSCache, DEFAULT_PHRASES, load_phrases
+from .services.opus_transcoder import OpusTranscoder, ffmpeg_has_libopus
 from .services.vision import vision_service
 from .services.openai_agent import OpenAIAgent
+from .services.session_store import SessionStore
+from .services.context_window import load_token_counter
+from .services.compaction import ConversationCompactor
+from .services.speech_pool import SpeechPool
+from .services.speculation import Speculator
+from .services.hedging import HedgePolicy
 
 # Import routes
-from .routes.websocket import websocket_endpoint
+from .routes.websocket import websocket_endpoint, interrupt_latency, speech_first_byte, speech_last_byte
 
 # Configure logging
 logging.basicConfig(
@@ -31,10 +43,17 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Global service instances
+http_pool = None
 transcription_service = None
 llm_service = None
 tts_service = None
+tts_cache = None
 openai_agent_service = None
+session_store = None
+compactor = None
+speech_pool = None
+speculator = None
+opus_transcoder = None
 # Vision service is a singleton already initialized in its module
 
 @asynccontextmanager
@@ -48,33 +67,173 @@ async def lifespan(app: FastAPI):
     # Initialize services on startup
     logger.info("Initializing services...")
     
-    global transcription_service, llm_service, tts_service, openai_agent_service
+    global http_pool, transcription_service, llm_service, tts_service, tts_cache, openai_agent_service, session_store, compactor, speech_pool, speculator, opus_transcoder
     
-    # Initialize transcription service
-    transcription_service = WhisperTranscriber(
-        model_size=cfg["whisper_model"],
-        sample_rate=cfg["audio_sample_rate"]
+    # Server-side VAD trims silence the frontend leaves around each segment
+    speech_detector = None
+    if cfg["server_vad_enabled"]:
+        speech_detector = SpeechDetector(
+            backend=cfg["server_vad_backend"],
+            padding_ms=cfg["server_vad_padding_ms"],
+            min_speech_ms=cfg["server_vad_min_speech_ms"]
+        )
+    
+    # Optionally benchmark compute type and thread counts for this host (cached per CPU model)
+    compute_type = None
+    cpu_threads = cfg["whisper_cpu_threads"]
+    num_workers = cfg["whisper_num_workers"]
+    if cfg["whisper_autotune"]:
+        autotuner = WhisperAutotuner(
+            model_size=cfg["whisper_model"],
+            workers=cfg["transcription_workers"],
+            decoding_profile=cfg["whisper_decoding_profile"],
+            clip_path=cfg["whisper_autotune_clip"] or None,
+            cache_path=cfg["whisper_autotune_cache"],
+            wer_tolerance=cfg["whisper_autotune_wer_tolerance"]
+        )
+        try:
+            tuned = await asyncio.to_thread(autotuner.run)
+            compute_type = tuned["compute_type"]
+            cpu_threads = tuned["cpu_threads"]
+            num_workers = tuned["num_workers"]
+        except Exception as e:
+            logger.error(f"Whisper autotuning failed, using configured settings: {e}")
+    
+    # Initialize transcription service (a worker pool per model size keeps ASR off the event loop)
+    transcription_service = WhisperModelRegistry(
+        default_model=cfg["whisper_model"],
+        tiers=cfg["whisper_model_tiers"],
+        memory_budget_mb=cfg["whisper_memory_budget_mb"],
+        load_fallback_model=cfg["whisper_load_fallback_model"] or None,
+        load_fallback_queue_depth=cfg["whisper_load_fallback_queue_depth"],
+        workers=cfg["transcription_workers"],
+        compute_type=compute_type,
+        sample_rate=cfg["audio_sample_rate"],
+        cpu_threads=cpu_threads,
+        num_workers=num_workers,
+        max_batch_size=cfg["transcription_max_batch_size"],
+        max_batch_wait_ms=cfg["transcription_max_batch_wait_ms"],
+        vad=speech_detector,
+        decoding_profile=cfg["whisper_decoding_profile"]
     )
+    if cfg["whisper_load_fallback_model"]:
+        # Load the fallback in the background so it is ready before the server gets busy
+        transcription_service.request(cfg["whisper_load_fallback_model"])
+    
+    # Keep-alive connection pool shared by the local LLM and TTS clients and the OpenAI Agent
+    http_pool = HTTPConnectionPool(
+        max_connections=cfg["http_max_connections"],
+        max_keepalive_connections=cfg["http_max_keepalive_connections"],
+        keepalive_expiry=cfg["http_keepalive_expiry_s"],
+        connect_timeout=cfg["http_connect_timeout_s"],
+        read_timeout=cfg["http_read_timeout_s"]
+    )
+    
+    # Token counter shared by the context windows and prompt size reporting
+    token_counter = load_token_counter(cfg["context_tokenizer"])
     
     # Initialize LLM service (for local AI)
     llm_service = LLMClient(
-        api_endpoint=cfg["llm_api_endpoint"]
+        api_endpoint=cfg["llm_api_endpoints"],
+        http_pool=http_pool,
+        token_counter=token_counter,
+        cache_prompt=cfg["llm_cache_prompt"],
+        cache_slots=cfg["llm_cache_slots"],
+        probe_interval=cfg["llm_probe_interval_s"],
+        probe_timeout=cfg["llm_probe_timeout_s"],
+        breaker_failures=cfg["llm_breaker_failures"],
+        breaker_cooldown=cfg["llm_breaker_cooldown_s"],
+        breaker_slow=cfg["llm_breaker_slow_s"],
+        hedging=HedgePolicy(
+            percentile=cfg["llm_hedge_percentile"],
+            min_delay=cfg["llm_hedge_min_delay_s"],
+            max_delay=cfg["llm_hedge_max_delay_s"]
+        )
     )
+    llm_service.start()
+    
+    # Repeated phrases are played from cache (shared by the local and OpenAI TTS)
+    if cfg["tts_cache_enabled"]:
+        tts_cache = TTSCache(
+            memory_budget_bytes=int(cfg["tts_cache_memory_mb"] * 1024 * 1024),
+            disk_dir=cfg["tts_cache_dir"] or None,
+            disk_budget_bytes=int(cfg["tts_cache_disk_mb"] * 1024 * 1024),
+            max_chars=cfg["tts_cache_max_chars"]
+        )
     
     # Initialize TTS service (for local AI)
     tts_service = TTSClient(
         api_endpoint=cfg["tts_api_endpoint"],
         model=cfg["tts_model"],
         voice=cfg["tts_voice"],
-        output_format=cfg["tts_format"]
+        output_format=cfg["tts_format"],
+        http_pool=http_pool,
+        stream_chunk_ms=cfg["tts_stream_chunk_ms"],
+        cache=tts_cache
     )
     
+    # Encode speech as Opus for clients that can decode it
+    if cfg["tts_opus_enabled"]:
+        if not cfg["tts_sentence_pipeline"]:
+            logger.warning("TTS_OPUS_ENABLED needs TTS_SENTENCE_PIPELINE=true (clients buffer each Opus "
+                           "stream until it ends), sending WAV")
+        elif ffmpeg_has_libopus():
+            opus_transcoder = OpusTranscoder(
+                bitrate=cfg["tts_opus_bitrate"],
+                preferred_format=cfg["tts_opus_format"],
+                page_ms=cfg["tts_stream_chunk_ms"] or 250.0
+            )
+        else:
+            logger.warning("TTS_OPUS_ENABLED is set but ffmpeg with libopus was not found, sending WAV")
+    
+    # Greetings and follow-ups are generated in the background once the first client connects
+    if cfg["speech_pool_size"] > 0:
+        speech_pool = SpeechPool(llm_service, tts_service, size=cfg["speech_pool_size"])
+    
+    # Start replies from stable partial transcripts of streamed utterances
+    if cfg["speculative_llm_enabled"]:
+        speculator = Speculator(
+            llm_service,
+            stable_ms=cfg["speculative_stable_ms"],
+            silence_ms=cfg["speculative_silence_ms"]
+        )
+    
+    # Open connections now so the first turn does not pay for the handshakes
+    if cfg["http_prewarm_connections"] > 0:
+        await http_pool.prewarm(
+            [*cfg["llm_api_endpoints"], cfg["tts_api_endpoint"]],
+            connections=cfg["http_prewarm_connections"]
+        )
+    
+    # Per-session conversation history (the LLM clients themselves are stateless)
+    session_store = SessionStore(
+        idle_ttl_s=cfg["session_idle_ttl_s"],
+        memory_cap_mb=cfg["session_memory_cap_mb"],
+        token_budget=cfg["context_token_budget"],
+        token_counter=token_counter
+    )
+    
+    # Summarize older turns of long conversations in the background
+    if cfg["compaction_enabled"]:
+        compactor = ConversationCompactor(
+            llm_service,
+            threshold_tokens=cfg["compaction_threshold_tokens"],
+            keep_messages=cfg["compaction_keep_messages"],
+            summary_tokens=cfg["compaction_summary_tokens"]
+        )
+    
     # Initialize OpenAI Agent service if configured
     if cfg["use_openai"] and cfg["openai_api_key"]:
         try:
             openai_agent_service = OpenAIAgent(
                 api_key=cfg["openai_api_key"],
-                model=cfg["openai_model"]
+                model=cfg["openai_model"],
+                tts_cache=tts_cache,
+                base_url=cfg["openai_base_url"] or None,
+                http_client=http_pool.client,
+                tts_voice=cfg["openai_tts_voice"],
+                tts_model=cfg["openai_tts_model"],
+                stream_chunk_ms=cfg["tts_stream_chunk_ms"]
             )
             logger.info("OpenAI Agent service initialized successfully")
         except Exception as e:
@@ -84,6 +243,21 @@ async def lifespan(app: FastAPI):
         logger.info("OpenAI Agent service not configured, using local AI services")
         openai_agent_service = None
     
+    # Let local turns hedge slow requests to OpenAI when no other local server can take them
+    if cfg["llm_hedge_openai"] and cfg["openai_api_key"]:
+        llm_service.hedge_fallback = openai_agent_service or OpenAIAgent(
+            api_key=cfg["openai_api_key"],
+            model=cfg["openai_model"],
+            base_url=cfg["openai_base_url"] or None,
+            http_client=http_pool.client
+        )
+    
+    # Synthesize the phrase list in the background so the server starts without waiting for TTS
+    tts_preload = None
+    if tts_cache is not None:
+        phrases = DEFAULT_PHRASES + (load_phrases(cfg["tts_cache_phrases"]) if cfg["tts_cache_phrases"] else [])
+        tts_preload = asyncio.create_task(tts_service.preload(phrases))
+    
     # Initialize vision service (will download model if not cached)
     logger.info("Initializing vision service...")
     vision_service.initialize()
@@ -95,8 +269,25 @@ async def lifespan(app: FastAPI):
     # Cleanup on shutdown
     logger.info("Shutting down services...")
     
-    # No specific cleanup needed for these services,
-    # but we could add resource release code here if needed (maybe in a future release lex 31/03/25)
+    # Wait for in-flight transcriptions before the models are released
+    if transcription_service is not None:
+        await transcription_service.close()
+    
+    if compactor is not None:
+        await compactor.close()
+    
+    if speech_pool is not None:
+        await speech_pool.close()
+    
+    if tts_preload is not None:
+        tts_preload.cancel()
+        await asyncio.gather(tts_preload, return_exceptions=True)
+    
+    if llm_service is not None:
+        await llm_service.close()
+    
+    if http_pool is not None:
+        await http_pool.close()
     
     logger.info("Shutdown complete")
 
@@ -144,13 +335,58 @@ async def health_check():
             "tts": tts_service is not None,
             "vision": vision_service.is_ready()
         },
+        "transcription_pool": transcription_service.get_stats() if transcription_service else None,
+        "llm_stats": llm_service.get_stats() if llm_service else None,
+        "openai_stats": openai_agent_service.get_stats() if openai_agent_service else None,
+        "http_pool": http_pool.get_stats() if http_pool else None,
+        "sessions": session_store.get_stats() if session_store else None,
+        "compaction": compactor.get_stats() if compactor else None,
+        "speech_pool": speech_pool.get_stats() if speech_pool else None,
+        "interrupt_latency": interrupt_latency.summary(),
+        "speculation": speculator.get_stats() if speculator else None,
+        "opus_transcoding": opus_transcoder.get_stats() if opus_transcoder else None,
+        "tts_stats": tts_service.get_stats() if tts_service else None,
+        "tts_cache": tts_cache.get_stats() if tts_cache else None,
+        "speech_latency": {
+            "time_to_first_byte": speech_first_byte.summary(),
+            "time_to_last_byte": speech_last_byte.summary()
+        },
         "config": {
-            "whisper_model": config.WHISPER_MODEL,
+            "whisper_model": transcription_service.active_model if transcription_service else config.WHISPER_MODEL,
             "tts_voice": config.TTS_VOICE,
             "websocket_port": config.WEBSOCKET_PORT
         }
     }
 
+@app.get("/models")
+async def list_models():
+    """List loaded Whisper models and registry statistics."""
+    if transcription_service is None:
+        raise HTTPException(status_code=503, detail="Transcription service not initialized")
+    return transcription_service.get_stats()
+
+@app.post("/models/{model_size}/load")
+async def load_model(model_size: str):
+    """Load a Whisper model size in the background without activating it."""
+    if transcription_service is None:
+        raise HTTPException(status_code=503, detail="Transcription service not initialized")
+    try:
+        await transcription_service.load(model_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return transcription_service.get_stats()
+
+@app.post("/models/{model_size}/activate")
+async def activate_model(model_size: str):
+    """Switch the active Whisper model, loading it first if needed."""
+    if transcription_service is None:
+        raise HTTPException(status_code=503, detail="Transcription service not initialized")
+    try:
+        await transcription_service.activate(model_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return transcription_service.get_stats()
+
 @app.get("/config")
 async def get_full_config():
     """Get full configuration."""
@@ -173,7 +409,12 @@ async def websocket_route(websocket: WebSocket):
         transcription_service, 
         llm_service, 
         tts_service,
-        openai_agent_service
+        session_store,
+        openai_agent_service,
+        compactor,
+        speech_pool,
+        speculator,
+        opus_transcoder
     )
 
 # Run server directly if executed as script
@@ -5,31 +5,55 @@ Handles WebSocket connections for bidirectional audio streaming.
 """
 
 import json
+import time
 import logging
 import asyncio
 import numpy as np
 import base64
 import os
-from typing import Dict, Any, List, Optional, AsyncGenerator
+from typing import Dict, Any, List, Optional, AsyncGenerator, Callable, Awaitable
 from fastapi import WebSocket, WebSocketDisconnect, BackgroundTasks
 from pydantic import BaseModel
 from datetime import datetime
 
-from ..services.transcription import WhisperTranscriber
+from ..services.model_registry import WhisperModelRegistry
+from ..services.transcription import DECODING_PROFILES
 from ..services.llm import LLMClient
-from ..services.tts import TTSClient
+from ..services.tts import TTSClient, AudioChunk
+from ..services.speech_pipeline import SpeechPipeline
+from ..services.opus_transcoder import OpusTranscoder
 from ..services.openai_agent import OpenAIAgent
 from ..services.conversation_storage import ConversationStorage
+from ..services.session_store import SessionStore, ConversationState
+from ..services.compaction import ConversationCompactor
+from ..services.speech_pool import (SpeechPool, PregeneratedSpeech, greeting_instruction,
+                                    followup_instruction, greeting_key, followup_key)
+from ..services.streaming_transcription import StreamingSession
+from ..services.speculation import Speculator, SpeculativeResponse
+from ..services.metrics import LatencyStats
+from ..services.frame_protocol import (PROTOCOL_NAME, FrameType, FrameFlag, FrameHeader, FORMAT_CODES,
+                                       AudioFormat, encode_frame, decode_frame)
+from .. import config
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Time from an interrupt until the cancelled turn has stopped (shared by all connections)
+interrupt_latency = LatencyStats()
+
+# Time from the start of a reply until its first and last audio byte was sent
+speech_first_byte = LatencyStats()
+speech_last_byte = LatencyStats()
+
 # WebSocket message types
 class MessageType:
     AUDIO = "audio"
+    AUDIO_STREAM = "audio_stream"
     TRANSCRIPTION = "transcription"
+    TRANSCRIPTION_PARTIAL = "transcription_partial"
     LLM_RESPONSE = "llm_response"
+    LLM_DELTA = "llm_delta"
     TTS_CHUNK = "tts_chunk"
     TTS_START = "tts_start"
     TTS_END = "tts_end"
@@ -41,6 +65,7 @@ class MessageType:
     SILENT_FOLLOWUP = "silent_followup"
     USER_PROFILE = "user_profile"
     USER_PROFILE_UPDATED = "user_profile_updated"
+    TRANSCRIPTION_SETTINGS = "transcription_settings"
     
     # Session storage message types
     SAVE_SESSION = "save_session"
@@ -67,32 +92,62 @@ class WebSocketManager:
     
     def __init__(
         self,
-        transcriber: WhisperTranscriber,
+        transcriber: WhisperModelRegistry,
         llm_client: LLMClient,
         tts_client: TTSClient,
-        openai_agent: Optional[OpenAIAgent] = None
+        session_store: SessionStore,
+        openai_agent: Optional[OpenAIAgent] = None,
+        session_id: Optional[str] = None,
+        compactor: Optional[ConversationCompactor] = None,
+        speech_pool: Optional[SpeechPool] = None,
+        speculator: Optional[Speculator] = None,
+        transcoder: Optional[OpusTranscoder] = None
     ):
         """
         Initialize the WebSocket manager.
         
         Args:
-            transcriber: Whisper transcription service
+            transcriber: Whisper transcription worker pool
             llm_client: LLM client service
             tts_client: TTS client service
+            session_store: Store holding each session's conversation history
             openai_agent: Optional OpenAI Agent service
+            session_id: Session to resume (a new session is started if None or expired)
+            compactor: Optional background summarizer of long conversations
+            speech_pool: Optional pool of pre-generated greetings and follow-ups
+            speculator: Optional starter of replies from stable partial transcripts
+            transcoder: Optional Opus encoder of speech for clients that can decode it
         """
         self.transcriber = transcriber
         self.llm_client = llm_client
         self.tts_client = tts_client
         self.openai_agent = openai_agent
+        self.compactor = compactor
+        self.speech_pool = speech_pool
+        self.speculator = speculator
+        self.transcoder = transcoder
+        
+        # Conversation state lives in the session store, not in the shared clients
+        self.session_store = session_store
+        self.resumed = bool(session_id) and session_store.resume(session_id)
+        self.session_id = session_id if self.resumed else SessionStore.new_session_id()
         
         # State tracking
         self.active_connections: List[WebSocket] = []
         self.is_processing = False
         self.speech_buffer = []
         self.current_audio_task = None
+        self.responding = False  # Whether the current turn is generating its reply
         self.interrupt_playback = asyncio.Event()
         self.current_vision_context = None  # Store the latest vision context
+        self.streaming_session: Optional[StreamingSession] = None  # Utterance being streamed
+        self.speculation: Optional[SpeculativeResponse] = None  # Reply started from its partial transcript
+        self.decoding_profile: Optional[str] = None  # Per-session override of the deployment default
+        self.model_tier: Optional[str] = None  # Whisper model size requested by this session
+        self.binary_frames = False  # Whether audio is exchanged as binary frames (see frame_protocol)
+        self.audio_turn = 0  # Turn id of the reply audio being sent
+        self.audio_seq = 0  # Sequence number of the next audio chunk of that reply
+        self.opus_format: Optional[str] = None  # Opus container speech is encoded to for this client
         
         # File paths
         self.prompt_path = os.path.join("prompts", "system_prompt.md")
@@ -107,7 +162,13 @@ class WebSocketManager:
         # Initialize conversation storage
         self.conversation_storage = ConversationStorage()
         
-        logger.info("Initialized WebSocket Manager")
+        logger.info(f"Initialized WebSocket Manager for session {self.session_id}"
+                   f"{' (resumed)' if self.resumed else ''}")
+    
+    @property
+    def conversation(self) -> ConversationState:
+        """This session's conversation history (recreated empty if it was evicted)."""
+        return self.session_store.get(self.session_id)
     
     def _load_system_prompt(self) -> str:
         """
@@ -161,8 +222,26 @@ class WebSocketManager:
         await websocket.accept()
         self.active_connections.append(websocket)
         
+        # Clients opt in to binary audio frames with ?protocol=binary; everyone else gets JSON
+        self.binary_frames = (config.WEBSOCKET_BINARY_FRAMES
+                              and websocket.query_params.get("protocol") == PROTOCOL_NAME)
+        
+        # Clients list the audio formats they decode (?audio_formats=opus,webm); Opus saves bandwidth.
+        # Clients decode an Opus stream only once it is complete, so Opus is only used when each
+        # sentence is its own stream; a whole reply in one stream would delay its first audio
+        if self.transcoder and config.TTS_SENTENCE_PIPELINE:
+            client_formats = websocket.query_params.get("audio_formats", "").split(",")
+            self.opus_format = self.transcoder.choose_format([f.strip() for f in client_formats])
+        
+        # Start pre-generating greetings for this prompt and user (no-op if already current)
+        self._configure_speech_pool()
+        
         # Send initial status
         await self._send_status(websocket, "connected", {
+            "session_id": self.session_id,
+            "session_resumed": self.resumed,
+            "protocol": PROTOCOL_NAME if self.binary_frames else "json",
+            "opus_format": self.opus_format,
             "transcription_active": self.transcriber.is_processing,
             "llm_active": self.llm_client.is_processing,
             "tts_active": self.tts_client.is_processing
@@ -170,6 +249,11 @@ class WebSocketManager:
         
         logger.info(f"Client connected. Active connections: {len(self.active_connections)}")
     
+    def _configure_speech_pool(self):
+        """Point the speech pool at the current system prompt and user name."""
+        if self.speech_pool:
+            self.speech_pool.configure(self.system_prompt, self._get_user_name())
+    
     def disconnect(self, websocket: WebSocket):
         """
         Handle a WebSocket disconnection.
@@ -179,6 +263,11 @@ class WebSocketManager:
         """
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+        
+        # Nobody will hear the reply, so stop its LLM and TTS requests
+        if self.current_audio_task and not self.current_audio_task.done():
+            self.current_audio_task.cancel()
+        self._discard_speculation()
         logger.info(f"Client disconnected. Active connections: {len(self.active_connections)}")
     
     async def _send_status(self, websocket: WebSocket, status: str, data: Dict[str, Any]):
@@ -228,16 +317,7 @@ class WebSocketManager:
             audio_array = np.frombuffer(audio_data, dtype=np.uint8)
             
             # Interrupt any ongoing TTS playback
-            if self.tts_client.is_processing:
-                logger.info("Interrupting TTS playback due to new speech")
-                self.interrupt_playback.set()
-                
-                # Let any current processing finish before starting new
-                if self.current_audio_task and not self.current_audio_task.done():
-                    try:
-                        await self.current_audio_task
-                    except asyncio.CancelledError:
-                        logger.info("Previous audio task cancelled")
+            await self._interrupt_for_new_speech()
             
             # Process the audio segment in a background task
             # Whisper will handle voice activity detection internally
@@ -254,95 +334,203 @@ class WebSocketManager:
             logger.error(f"Error processing audio: {e}")
             await self._send_error(websocket, f"Audio processing error: {str(e)}")
     
-    async def _process_speech_segment(self, websocket: WebSocket, speech_audio: np.ndarray):
+    async def _interrupt_for_new_speech(self):
         """
-        Process a complete speech segment.
+        Stop the assistant's reply because the user started a new utterance.
+        """
+        if self.responding:
+            logger.info("Interrupting the current reply due to new speech")
+            await self._cancel_turn()
+    
+    async def _cancel_turn(self) -> Optional[float]:
+        """
+        Cancel the current turn, closing its streaming LLM and TTS requests.
+        
+        Cancelling the turn's task unwinds the open HTTP responses (so the
+        servers stop generating) and the speech pipeline (dropping audio that
+        is queued or still being synthesized). Waits at most INTERRUPT_TIMEOUT_MS
+        for the turn to stop.
+        
+        Returns:
+            Seconds from the interrupt until the turn stopped, or None if no turn was running
+        """
+        self.interrupt_playback.set()
+        task = self.current_audio_task
+        if task is None or task.done():
+            return None
+        
+        start_time = time.perf_counter()
+        task.cancel()
+        done, _ = await asyncio.wait({task}, timeout=config.INTERRUPT_TIMEOUT_MS / 1000)
+        quiet_time = time.perf_counter() - start_time
+        interrupt_latency.record(quiet_time)
+        
+        if done:
+            logger.info(f"Turn cancelled after {quiet_time * 1000:.0f}ms")
+        else:
+            logger.warning(f"Turn still stopping {config.INTERRUPT_TIMEOUT_MS:.0f}ms after the interrupt")
+        return quiet_time
+    
+    async def _start_turn(self, reply: Awaitable[None]):
+        """
+        Run a reply that is not triggered by speech (greeting, follow-up) as the current turn.
+        
+        Args:
+            reply: Coroutine generating and sending the reply
+        """
+        await self._cancel_turn()
+        self.interrupt_playback.clear()
+        self.current_audio_task = asyncio.create_task(self._respond(reply))
+    
+    async def _respond(self, reply: Awaitable[None]):
+        """
+        Run the reply part of a turn, which new speech interrupts.
+        
+        Args:
+            reply: Coroutine generating and sending the reply
+        """
+        self.responding = True
+        try:
+            await reply
+        finally:
+            self.responding = False
+    
+    async def handle_audio_stream(self, websocket: WebSocket, audio_data: bytes, sample_rate: int,
+                                  final: bool = False, cancel: bool = False):
+        """
+        Process a frame of streamed PCM audio from a WebSocket client.
+        
+        Frames are appended to the current utterance; partial transcripts are
+        decoded in the background while the user is still speaking, and the
+        final frame triggers the normal response pipeline.
         
         Args:
             websocket: The WebSocket connection
-            speech_audio: Speech audio as numpy array
+            audio_data: Raw 16-bit PCM frame
+            sample_rate: Sample rate of the frame in Hz
+            final: Whether this frame ends the utterance
+            cancel: Whether the client discarded the utterance
         """
         try:
-            # Set processing flag
-            self.is_processing = True
-            self.interrupt_playback.clear()
+            if cancel:
+                logger.info("Client cancelled streamed utterance")
+                self.streaming_session = None
+                self._discard_speculation()
+                return
             
-            # Transcribe speech
-            await self._send_status(websocket, "transcribing", {})
-            transcript, metadata = self.transcriber.transcribe(speech_audio)
+            # First frame of a new utterance
+            if self.streaming_session is None:
+                await self._interrupt_for_new_speech()
+                self.streaming_session = StreamingSession(
+                    self.transcriber,
+                    input_sample_rate=sample_rate,
+                    partial_interval_ms=config.STREAMING_PARTIAL_INTERVAL_MS,
+                    max_window_s=config.STREAMING_MAX_WINDOW_S,
+                    profile=self.decoding_profile,
+                    model=self.model_tier
+                )
             
-            # Send transcription result
-            await websocket.send_json({
-                "type": MessageType.TRANSCRIPTION,
-                "text": transcript,
-                "metadata": metadata,
-                "timestamp": datetime.now().isoformat()
-            })
+            session = self.streaming_session
+            if audio_data:
+                session.append_pcm(np.frombuffer(audio_data, dtype=np.int16))
             
-            # Skip LLM and TTS if transcription is empty
-            if not transcript.strip():
-                logger.info("Empty transcription, skipping LLM and TTS")
+            if final:
+                self.streaming_session = None
+                self.current_audio_task = asyncio.create_task(
+                    self._finish_audio_stream(websocket, session)
+                )
+            else:
+                if session.partial_due():
+                    asyncio.create_task(self._send_partial_transcription(websocket, session))
+                
+                # Start the reply early if the utterance looks finished
+                if (self.speculator and not self.openai_agent and self.speculation is None
+                        and self.speculator.should_start(session)):
+                    self.speculation = self.speculator.start(session.partial_text, self.system_prompt,
+                                                             self.conversation)
+                
+        except Exception as e:
+            logger.error(f"Error processing audio stream: {e}")
+            await self._send_error(websocket, f"Audio stream error: {str(e)}")
+    
+    async def _send_partial_transcription(self, websocket: WebSocket, session: StreamingSession):
+        """
+        Decode the streamed audio so far and send the partial transcript.
+        
+        Args:
+            websocket: The WebSocket connection
+            session: The streaming session to decode
+        """
+        try:
+            text = await session.decode_partial()
+            if text is not None:
+                # The user kept talking, so a reply started earlier is answering the wrong question
+                if self.speculation and not self.speculation.matches(text, self.conversation):
+                    self._discard_speculation()
                 
-                # Notify frontend that transcription occurred (even if it's just "...") to let it reset
-                await websocket.send_json({
-                    "type": MessageType.TRANSCRIPTION,
-                    "text": transcript,
-                    "metadata": {},
-                    "timestamp": datetime.now().isoformat()
-                })
-
-                # Still send TTS_END to fully reset UI
                 await websocket.send_json({
-                    "type": MessageType.TTS_END,
+                    "type": MessageType.TRANSCRIPTION_PARTIAL,
+                    "text": text,
                     "timestamp": datetime.now().isoformat()
                 })
-                return
-                
-            # Check if we have recent vision context to incorporate
-            has_vision_context = self.current_vision_context is not None
+        except Exception as e:
+            logger.error(f"Error sending partial transcription: {e}")
+    
+    def _discard_speculation(self):
+        """Cancel the pending speculative reply, if any."""
+        if self.speculation:
+            self.speculator.discard(self.speculation)
+            self.speculation = None
+    
+    async def _finish_audio_stream(self, websocket: WebSocket, session: StreamingSession):
+        """
+        Finalize a streamed utterance and respond to it.
+        
+        Args:
+            websocket: The WebSocket connection
+            session: The completed streaming session
+        """
+        try:
+            # Set processing flag
+            self.is_processing = True
+            self.interrupt_playback.clear()
             
-            # Use OpenAI Agent if available, otherwise use local LLM
-            if self.openai_agent:
-                logger.info("Using OpenAI Agent for processing")
-                await self._send_status(websocket, "processing_llm", {"using_openai": True})
-                
-                if has_vision_context:
-                    logger.info("Processing speech with vision context using OpenAI")
-                    # Add vision context to conversation history
-                    self._add_vision_context_to_conversation(self.current_vision_context)
-                    enhanced_transcript = f"{transcript} [Note: This question refers to the image I just analyzed.]"
-                    llm_response = self.openai_agent.get_response(enhanced_transcript, self.system_prompt)
-                    self.current_vision_context = None
-                else:
-                    llm_response = self.openai_agent.get_response(transcript, self.system_prompt)
-                
-                # Generate TTS using OpenAI's native TTS
-                await self._send_openai_tts_response(websocket, llm_response["text"])
-            else:
-                # Use local AI services
-                logger.info("Using local AI services for processing")
-                await self._send_status(websocket, "processing_llm", {"using_openai": False})
-                
-                if has_vision_context:
-                    logger.info("Processing speech with vision context using local AI")
-                    # Add vision context to conversation history
-                    self._add_vision_context_to_conversation(self.current_vision_context)
-                    enhanced_transcript = f"{transcript} [Note: This question refers to the image I just analyzed.]"
-                    llm_response = self.llm_client.get_response(enhanced_transcript, self.system_prompt)
-                    self.current_vision_context = None
-                else:
-                    llm_response = self.llm_client.get_response(transcript, self.system_prompt)
-                
-                # Generate and send TTS audio using local TTS
-                await self._send_tts_response(websocket, llm_response["text"])
+            await self._send_status(websocket, "transcribing", {
+                "queue_depth": self.transcriber.queue_depth,
+                "streaming": True
+            })
+            transcript, metadata = await session.finish()
             
-            # Send LLM response
-            await websocket.send_json({
-                "type": MessageType.LLM_RESPONSE,
-                "text": llm_response["text"],
-                "metadata": {k: v for k, v in llm_response.items() if k != "text"},
-                "timestamp": datetime.now().isoformat()
+            await self._respond(self._respond_to_transcript(websocket, transcript, metadata))
+            
+        except Exception as e:
+            logger.error(f"Error finishing audio stream: {e}")
+            await self._send_error(websocket, f"Speech processing error: {str(e)}")
+        finally:
+            self.is_processing = False
+    
+    async def _process_speech_segment(self, websocket: WebSocket, speech_audio: np.ndarray):
+        """
+        Process a complete speech segment.
+        
+        Args:
+            websocket: The WebSocket connection
+            speech_audio: Speech audio as numpy array
+        """
+        try:
+            # Set processing flag
+            self.is_processing = True
+            self.interrupt_playback.clear()
+            
+            # Transcribe speech on the worker pool so other connections keep flowing
+            await self._send_status(websocket, "transcribing", {
+                "queue_depth": self.transcriber.queue_depth
             })
+            transcript, metadata = await self.transcriber.transcribe_async(
+                speech_audio, self.decoding_profile, model=self.model_tier
+            )
+            
+            await self._respond(self._respond_to_transcript(websocket, transcript, metadata))
             
         except Exception as e:
             logger.error(f"Error processing speech segment: {e}")
@@ -350,92 +538,343 @@ class WebSocketManager:
         finally:
             self.is_processing = False
     
-    async def _send_tts_response(self, websocket: WebSocket, text: str):
+    async def _respond_to_transcript(self, websocket: WebSocket, transcript: str, metadata: Dict[str, Any]):
         """
-        Generate and send TTS audio using local TTS service.
+        Send a final transcript to the client and generate the assistant's reply.
         
         Args:
             websocket: The WebSocket connection
-            text: Text to convert to speech
+            transcript: Final transcribed text
+            metadata: Transcription metadata
         """
-        if not text.strip():
-            logger.info("Empty text for TTS, skipping")
-            return
+        # Send transcription result
+        await websocket.send_json({
+            "type": MessageType.TRANSCRIPTION,
+            "text": transcript,
+            "metadata": metadata,
+            "timestamp": datetime.now().isoformat()
+        })
         
-        try:
-            # Signal TTS start
+        # Take over any reply started from the partial transcript
+        speculation, self.speculation = self.speculation, None
+        
+        # Skip LLM and TTS if transcription is empty
+        if not transcript.strip():
+            logger.info("Empty transcription, skipping LLM and TTS")
+            if speculation:
+                self.speculator.discard(speculation)
+            
+            # Notify frontend that transcription occurred (even if it's just "...") to let it reset
+            await websocket.send_json({
+                "type": MessageType.TRANSCRIPTION,
+                "text": transcript,
+                "metadata": {},
+                "timestamp": datetime.now().isoformat()
+            })
+
+            # Still send TTS_END to fully reset UI
             await websocket.send_json({
-                "type": MessageType.TTS_START,
+                "type": MessageType.TTS_END,
                 "timestamp": datetime.now().isoformat()
             })
+            return
             
-            await self._send_status(websocket, "generating_speech", {})
+        # Check if we have recent vision context to incorporate
+        has_vision_context = self.current_vision_context is not None
+        
+        # Use OpenAI Agent if available, otherwise use local LLM; both stream the reply and its speech
+        using_openai = self.openai_agent is not None
+        logger.info("Using OpenAI Agent for processing" if using_openai else "Using local AI services for processing")
+        reply_start = time.perf_counter()
+        await self._send_status(websocket, "processing_llm", {"using_openai": using_openai})
+        
+        if has_vision_context:
+            logger.info(f"Processing speech with vision context using {'OpenAI' if using_openai else 'local AI'}")
+            # Add vision context to conversation history
+            self._add_vision_context_to_conversation(self.current_vision_context)
+            user_input = f"{transcript} [Note: This question refers to the image I just analyzed.]"
+            self.current_vision_context = None
+        else:
+            user_input = transcript
+        
+        # Keep the speculative reply only if it answers exactly this input
+        if speculation and not self.speculator.claim(speculation, user_input, self.conversation):
+            speculation = None
+        
+        if config.TTS_SENTENCE_PIPELINE:
+            # Speak each sentence as soon as it has been generated
+            llm_response = await self._stream_spoken_response(websocket, user_input, speculation)
+            pipeline_stats = llm_response["speech_pipeline"]
+            speech_latency = {
+                "time_to_first_byte": pipeline_stats["time_to_first_audio"],
+                "time_to_last_byte": pipeline_stats["time_to_last_audio"]
+            }
+        else:
+            llm_response = await self._stream_llm_response(websocket, user_input, speculation=speculation)
             
-            # Get the complete audio file
-            audio_data = await self.tts_client.async_text_to_speech(text)
+            # Generate and send TTS audio
+            speech_latency = await self._send_tts_response(websocket, llm_response["text"], reply_start)
+        
+        self._record_speech_latency(speech_latency)
+        llm_response["speech_latency"] = speech_latency
+        
+        # Send LLM response
+        await websocket.send_json({
+            "type": MessageType.LLM_RESPONSE,
+            "text": llm_response["text"],
+            "metadata": {k: v for k, v in llm_response.items() if k != "text"},
+            "timestamp": datetime.now().isoformat()
+        })
+        
+        # Summarize older turns in the background, off the user's turn path
+        if self.compactor and not self.openai_agent:
+            self.compactor.schedule(self.conversation)
+    
+    async def _stream_llm_response(self, websocket: WebSocket, user_input: str,
+                                   on_delta: Optional[Callable[[str], None]] = None,
+                                   speculation: Optional[SpeculativeResponse] = None) -> Dict[str, Any]:
+        """
+        Stream an LLM response, forwarding each token to the client as it arrives.
+        
+        Args:
+            websocket: The WebSocket connection
+            user_input: Text to send to the LLM
+            on_delta: Optional callback receiving each token as well
+            speculation: Reply already started for this input, used instead of a new request
+            
+        Returns:
+            The complete LLM response (text and metadata)
+        """
+        llm_response: Dict[str, Any] = {"text": ""}
+        if speculation:
+            stream = speculation.events()
+        elif self.openai_agent:
+            stream = self.openai_agent.stream_response(user_input, self.system_prompt, conversation=self.conversation)
+        else:
+            stream = self.llm_client.stream_response(user_input, self.system_prompt, conversation=self.conversation)
+        try:
+            async for event in stream:
+                if "delta" in event:
+                    await websocket.send_json({
+                        "type": MessageType.LLM_DELTA,
+                        "text": event["delta"],
+                        "timestamp": datetime.now().isoformat()
+                    })
+                    if on_delta is not None:
+                        on_delta(event["delta"])
+                else:
+                    llm_response = event
+        finally:
+            # Close the LLM stream right away if the turn was cancelled
+            await stream.aclose()
+            if speculation:
+                speculation.cancel()
+                speculation.commit(self.conversation)
+                llm_response["speculative"] = True
+        
+        llm_response.pop("done", None)
+        return llm_response
+    
+    async def _stream_spoken_response(self, websocket: WebSocket, user_input: str,
+                                      speculation: Optional[SpeculativeResponse] = None) -> Dict[str, Any]:
+        """
+        Stream an LLM response and speak it sentence by sentence while it is generated.
+        
+        Each sentence is sent to the TTS service as soon as the LLM completes
+        it, and its audio is forwarded to the client piece by piece, in reply
+        order, as the TTS service produces it.
+        
+        Args:
+            websocket: The WebSocket connection
+            user_input: Text to send to the LLM
+            speculation: Reply already started for this input, used instead of a new request
+            
+        Returns:
+            The complete LLM response (text and metadata)
+        """
+        pipeline = SpeechPipeline(self._speech_stream, max_parallel=config.TTS_MAX_PARALLEL)
+        started = False
+        
+        async def send_audio(chunk: str, audio: AudioChunk):
+            nonlocal started
             
             # Check if playback should be interrupted
             if self.interrupt_playback.is_set():
                 logger.info("TTS generation interrupted")
+                pipeline.cancel()
                 return
             
-            # Encode and send the complete audio file
-            encoded_audio = base64.b64encode(audio_data).decode("utf-8")
+            if not started:
+                started = True
+                # Signal TTS start
+                await self._send_tts_start(websocket)
+                await self._send_status(websocket, "generating_speech", {})
+            
+            await self._send_audio_chunk(websocket, audio)
+        
+        speaker = asyncio.create_task(pipeline.drain(send_audio))
+        try:
+            llm_response = await self._stream_llm_response(websocket, user_input, on_delta=pipeline.feed,
+                                                           speculation=speculation)
+            if "error" in llm_response:
+                # Speak the error message, as the non-streaming path does
+                pipeline.feed("\n" + llm_response["text"])
+            pipeline.finish()
+            await speaker
+        finally:
+            if not speaker.done():
+                pipeline.cancel()
+                speaker.cancel()
+        
+        if pipeline.errors and not started:
+            await self._send_error(websocket, f"TTS streaming error: {pipeline.errors[0]}")
+        
+        # Signal TTS end
+        if started and not self.interrupt_playback.is_set():
             await websocket.send_json({
-                "type": MessageType.TTS_CHUNK,
-                "audio_chunk": encoded_audio,
-                "format": self.tts_client.output_format,
+                "type": MessageType.TTS_END,
                 "timestamp": datetime.now().isoformat()
             })
+        
+        llm_response["speech_pipeline"] = pipeline.get_stats()
+        return llm_response
+    
+    def _encode(self, audio: AsyncGenerator[AudioChunk, None]) -> AsyncGenerator[AudioChunk, None]:
+        """
+        Encode speech for this client (Opus if it negotiated it, otherwise unchanged).
+        
+        Args:
+            audio: Synthesized speech pieces
             
-            # Signal TTS end
-            if not self.interrupt_playback.is_set():
-                await websocket.send_json({
-                    "type": MessageType.TTS_END,
-                    "timestamp": datetime.now().isoformat()
-                })
+        Returns:
+            The pieces to send
+        """
+        if self.opus_format is None:
+            return audio
+        return self.transcoder.transcode(audio, self.opus_format)
+    
+    def _speech_stream(self, text: str) -> AsyncGenerator[AudioChunk, None]:
+        """
+        Stream speech from OpenAI's TTS if the OpenAI Agent is used, otherwise
+        from the local TTS service, encoded for this client.
+        
+        Args:
+            text: Text to convert to speech
             
-        except Exception as e:
-            logger.error(f"Error streaming TTS: {e}")
-            await self._send_error(websocket, f"TTS streaming error: {str(e)}")
+        Returns:
+            Audio pieces in playback order
+        """
+        if self.openai_agent:
+            return self._encode(self.openai_agent.stream_audio(text))
+        return self._encode(self.tts_client.stream_audio(text))
+    
+    async def _send_tts_start(self, websocket: WebSocket):
+        """
+        Signal the start of a reply's audio, which starts a new audio turn.
+        
+        Args:
+            websocket: The WebSocket connection
+        """
+        self.audio_turn += 1
+        self.audio_seq = 0
+        await websocket.send_json({
+            "type": MessageType.TTS_START,
+            "turn_id": self.audio_turn,
+            "timestamp": datetime.now().isoformat()
+        })
+    
+    async def _send_audio_chunk(self, websocket: WebSocket, audio: AudioChunk):
+        """
+        Send one piece of synthesized audio, as a binary frame if the client negotiated them.
+        
+        Args:
+            websocket: The WebSocket connection
+            audio: Audio piece; pieces of a split WAV stream carry the header on the first one
+        """
+        seq = self.audio_seq
+        self.audio_seq += 1
+        
+        if self.binary_frames:
+            flags = FrameFlag.WAV_HEADER if audio.header is not None else 0
+            if audio.stream_end is not None:
+                flags |= FrameFlag.ENCODED | (FrameFlag.STREAM_END if audio.stream_end else 0)
+            header = FrameHeader(
+                FrameType.TTS_CHUNK,
+                format=FORMAT_CODES.get(audio.format, AudioFormat.UNKNOWN),
+                flags=flags,
+                turn_id=self.audio_turn,
+                seq=seq
+            )
+            await websocket.send_bytes(encode_frame(header, audio.header or b"", audio.data))
+            return
+        
+        message = {
+            "type": MessageType.TTS_CHUNK,
+            "audio_chunk": base64.b64encode(audio.data).decode("utf-8"),
+            "format": audio.format,
+            "turn_id": self.audio_turn,
+            "seq": seq,
+            "timestamp": datetime.now().isoformat()
+        }
+        if audio.header is not None:
+            message["audio_header"] = base64.b64encode(audio.header).decode("utf-8")
+        if audio.stream_end is not None:
+            message["stream_end"] = audio.stream_end
+        await websocket.send_json(message)
+    
+    def _record_speech_latency(self, speech_latency: Dict[str, Optional[float]]):
+        """Record a reply's time to first and last audio byte (the latter only if it was spoken completely)."""
+        first_byte, last_byte = speech_latency["time_to_first_byte"], speech_latency["time_to_last_byte"]
+        if first_byte is not None:
+            speech_first_byte.record(first_byte)
+        if last_byte is not None:
+            speech_last_byte.record(last_byte)
+            logger.info(f"Reply audio: first byte after {first_byte:.2f}s, last byte after {last_byte:.2f}s")
     
-    async def _send_openai_tts_response(self, websocket: WebSocket, text: str):
+    async def _send_tts_response(self, websocket: WebSocket, text: str,
+                                 start_time: Optional[float] = None) -> Dict[str, Optional[float]]:
         """
-        Generate and send TTS audio using OpenAI's TTS API.
+        Generate and send TTS audio using the local TTS service or OpenAI's TTS.
+        
+        Audio is forwarded as the TTS service produces it (see _speech_stream).
         
         Args:
             websocket: The WebSocket connection
             text: Text to convert to speech
+            start_time: perf_counter() time the reply started (defaults to now)
+            
+        Returns:
+            Seconds from start_time until the first and last audio byte was sent
+            (None if no audio was sent, or the reply was interrupted)
         """
+        start_time = start_time if start_time is not None else time.perf_counter()
+        latency: Dict[str, Optional[float]] = {"time_to_first_byte": None, "time_to_last_byte": None}
+        
         if not text.strip():
             logger.info("Empty text for TTS, skipping")
-            return
+            return latency
         
         try:
             # Signal TTS start
-            await websocket.send_json({
-                "type": MessageType.TTS_START,
-                "timestamp": datetime.now().isoformat()
-            })
+            await self._send_tts_start(websocket)
             
             await self._send_status(websocket, "generating_speech", {})
             
-            # Get the complete audio file from OpenAI TTS
-            audio_data = await self.openai_agent.text_to_speech(text)
-            
-            # Check if playback should be interrupted
-            if self.interrupt_playback.is_set():
-                logger.info("TTS generation interrupted")
-                return
-            
-            # Encode and send the complete audio file
-            encoded_audio = base64.b64encode(audio_data).decode("utf-8")
-            await websocket.send_json({
-                "type": MessageType.TTS_CHUNK,
-                "audio_chunk": encoded_audio,
-                "format": "mp3",  # OpenAI TTS returns MP3 format
-                "timestamp": datetime.now().isoformat()
-            })
+            audio_stream = self._speech_stream(text)
+            try:
+                async for audio in audio_stream:
+                    # Check if playback should be interrupted
+                    if self.interrupt_playback.is_set():
+                        logger.info("TTS generation interrupted")
+                        return latency
+                    
+                    await self._send_audio_chunk(websocket, audio)
+                    if latency["time_to_first_byte"] is None:
+                        latency["time_to_first_byte"] = time.perf_counter() - start_time
+            finally:
+                # Stop synthesis right away if the reply was interrupted or cancelled
+                await audio_stream.aclose()
+            latency["time_to_last_byte"] = time.perf_counter() - start_time
             
             # Signal TTS end
             if not self.interrupt_playback.is_set():
@@ -445,8 +884,39 @@ class WebSocketManager:
                 })
             
         except Exception as e:
-            logger.error(f"Error streaming OpenAI TTS: {e}")
-            await self._send_error(websocket, f"OpenAI TTS streaming error: {str(e)}")
+            logger.error(f"Error streaming TTS: {e}")
+            await self._send_error(websocket, f"TTS streaming error: {str(e)}")
+        
+        return latency
+    
+    async def _send_pregenerated_speech(self, websocket: WebSocket, speech: PregeneratedSpeech):
+        """
+        Send a pre-generated response and its audio.
+        
+        Args:
+            websocket: The WebSocket connection
+            speech: (text, audio) from the speech pool
+        """
+        text, audio_data = speech
+        
+        # Send LLM response
+        await websocket.send_json({
+            "type": MessageType.LLM_RESPONSE,
+            "text": text,
+            "metadata": {"pregenerated": True},
+            "timestamp": datetime.now().isoformat()
+        })
+        
+        async def pregenerated_audio():
+            yield AudioChunk(audio_data, self.tts_client.output_format)
+        
+        await self._send_tts_start(websocket)
+        async for audio in self._encode(pregenerated_audio()):
+            await self._send_audio_chunk(websocket, audio)
+        await websocket.send_json({
+            "type": MessageType.TTS_END,
+            "timestamp": datetime.now().isoformat()
+        })
     
     def _load_user_profile(self) -> Dict[str, Any]:
         """
@@ -524,18 +994,7 @@ class WebSocketManager:
         Returns:
             str: The greeting prompt
         """
-        user_name = self._get_user_name()
-        
-        if user_name:
-            if is_returning_user:
-                return f"Create a friendly greeting for {user_name} who just activated their microphone. Be brief and conversational, but treat it like you've met them before. Do not do anything else."
-            else:
-                return f"Create a friendly greeting for {user_name} who just activated their microphone. Be brief and conversational, but treat it like you're meeting them for the first time. Do not do anything else."
-        else:
-            if is_returning_user:
-                return "Create a friendly greeting for someone who just activated their microphone. Be brief and conversational, but treat it like you've met them before. Do not do anything else."
-            else:
-                return "Create a friendly greeting for someone who just activated their microphone. Be brief and conversational, but treat it like you're meeting them for the first time. Do not do anything else."
+        return greeting_instruction(self._get_user_name(), is_returning_user)
     
     def _get_followup_prompt(self, tier: int) -> str:
         """
@@ -547,21 +1006,7 @@ class WebSocketManager:
         Returns:
             str: The follow-up prompt
         """
-        user_name = self._get_user_name()
-        name_part = f" {user_name}" if user_name else ""
-        
-        # Adjust approach based on tier
-        if tier == 0:
-            approach = "gentle check-in"
-        elif tier == 1:
-            approach = "casual follow-up"
-        else:  # tier == 2
-            approach = "friendly reminder"
-        
-        if user_name:    
-            return f"Create a {approach} for {user_name} who hasn't responded to your last message. Be brief and conversational. Do not do anything else."
-        else:
-            return f"Create a {approach} for someone who hasn't responded to your last message. Be brief and conversational. Do not do anything else."
+        return followup_instruction(self._get_user_name(), tier)
 
     def _initialize_conversation_context(self):
         """
@@ -582,18 +1027,22 @@ class WebSocketManager:
             "content": f"USER CONTEXT: The user's name is {user_name}."
         }
         
+        conversation = self.conversation
+        
         # Check if we already have a system prompt as the first message
-        if self.llm_client.conversation_history and self.llm_client.conversation_history[0]["role"] == "system":
+        if len(conversation) and conversation[0]["role"] == "system":
             # Check if we already have a user context message
-            if len(self.llm_client.conversation_history) > 1 and "USER CONTEXT" in self.llm_client.conversation_history[1].get("content", ""):
-                # Replace existing context message
-                self.llm_client.conversation_history[1] = context_message
+            if len(conversation) > 1 and "USER CONTEXT" in conversation[1].get("content", ""):
+                # Replace existing context message (only if it changed, so the
+                # prompt prefix cached by the LLM server stays valid)
+                if conversation[1] != context_message:
+                    conversation.replace(1, **context_message)
             else:
                 # Insert after system prompt
-                self.llm_client.conversation_history.insert(1, context_message)
+                conversation.insert(1, **context_message)
         else:
             # No system prompt, add context as first message
-            self.llm_client.conversation_history.insert(0, context_message)
+            conversation.insert(0, **context_message)
             
         return True
 
@@ -603,22 +1052,23 @@ class WebSocketManager:
         """
         try:
             # Check if user has conversation history
-            has_history = len(self.llm_client.conversation_history) > 0
+            has_history = len(self.conversation) > 0
             
-            # Save current conversation history and temporarily clear it
-            saved_history = self.llm_client.conversation_history.copy()
-            self.llm_client.conversation_history = []
+            # Play a pre-generated greeting right away if one is ready
+            speech = self.speech_pool.take(greeting_key(has_history)) if self.speech_pool else None
+            if speech:
+                logger.info("Using pre-generated greeting")
+                self._initialize_conversation_context()
+                await self._send_pregenerated_speech(websocket, speech)
+                return
             
             # Get customized greeting prompt
             instruction = self._get_greeting_prompt(is_returning_user=has_history)
             
-            # Get response from LLM without adding to conversation history, with moderate temperature
+            # Get response from LLM without any conversation history, with moderate temperature
             # Use instruction as user message, not as system message
             logger.info("Generating greeting")
-            llm_response = self.llm_client.get_response(instruction, self.system_prompt, add_to_history=False, temperature=0.7)
-            
-            # Restore saved conversation history
-            self.llm_client.conversation_history = saved_history
+            llm_response = await self.llm_client.get_response(instruction, self.system_prompt, add_to_history=False, temperature=0.7)
             
             # Initialize conversation context with user information
             # This ensures the LLM knows the user's name in subsequent interactions
@@ -648,36 +1098,26 @@ class WebSocketManager:
             tier: Current follow-up tier (0-2)
         """
         try:
-            # Save full conversation history
-            full_history = self.llm_client.conversation_history.copy()
-            
-            # Extract recent conversation context (keeping last few exchanges)
-            context_messages = []
-            
-            # If there's a system message, keep it at the beginning
-            if full_history and full_history[0]["role"] == "system":
-                context_messages.append(full_history[0])
-                recent_history = full_history[1:]
-            else:
-                recent_history = full_history
+            # Play a pre-generated (generic, not contextual) follow-up right away if enabled and ready
+            if self.speech_pool and config.SPEECH_POOL_FOLLOWUPS:
+                speech = self.speech_pool.take(followup_key(tier))
+                if speech:
+                    logger.info(f"Using pre-generated follow-up (tier {tier+1})")
+                    await self._send_pregenerated_speech(websocket, speech)
+                    return
             
-            # Include the last several exchanges for context (up to 6 messages)
+            # Use a detached copy of the recent conversation (keeping the system message
+            # and the last several exchanges, up to 6 messages) so the session history is untouched
             # This provides enough context for a meaningful continuation
-            num_context_messages = min(6, len(recent_history))
-            context_messages.extend(recent_history[-num_context_messages:])
-            
-            # Temporarily set conversation history to just these context messages
-            self.llm_client.conversation_history = context_messages
+            context = self.conversation.recent(6)
             
             # Select appropriate silence indicator based on tier
             user_input = "[silent]" if tier == 0 else "[no response]" if tier == 1 else "[still waiting]"
             
             # Generate the follow-up with the silence indicator as user input
             logger.info(f"Generating contextual follow-up (tier {tier+1})")
-            llm_response = self.llm_client.get_response(user_input, self.system_prompt, add_to_history=False, temperature=0.7)
-            
-            # Restore original conversation history
-            self.llm_client.conversation_history = full_history
+            llm_response = await self.llm_client.get_response(user_input, self.system_prompt, add_to_history=False,
+                                                              temperature=0.7, conversation=context)
             
             # Send LLM response
             await websocket.send_json({
@@ -704,8 +1144,9 @@ class WebSocketManager:
             session_id: Optional ID for the session (for overwriting existing)
         """
         try:
-            # Get current conversation history from LLM client
-            messages = self.llm_client.conversation_history.copy()
+            # Get this session's conversation history (including any [SUMMARY] of older turns)
+            conversation = self.conversation
+            messages = conversation.messages()
             
             # Don't save empty conversations
             if not messages:
@@ -724,6 +1165,7 @@ class WebSocketManager:
                 "user_message_count": sum(1 for m in messages if m.get("role") == "user"),
                 "assistant_message_count": sum(1 for m in messages if m.get("role") == "assistant"),
                 "user_name": self._get_user_name() or "Anonymous",
+                "summarized_message_count": conversation.summarized,
             }
             # Save session (now async)
             session_id = await self.conversation_storage.save_session(
@@ -763,8 +1205,10 @@ class WebSocketManager:
                 await self._send_error(websocket, f"Session not found: {session_id}")
                 return
             
-            # Update LLM client's conversation history
-            self.llm_client.conversation_history = session.get("messages", [])
+            # Replace this session's conversation history
+            conversation = self.conversation
+            conversation.load(session.get("messages", []))
+            conversation.summarized = session.get("metadata", {}).get("summarized_message_count", 0)
             
             # Send confirmation
             await websocket.send_json({
@@ -835,6 +1279,37 @@ class WebSocketManager:
             logger.error(f"Error deleting session: {e}")
             await self._send_error(websocket, f"Failed to delete conversation: {str(e)}")
     
+    async def handle_binary_message(self, websocket: WebSocket, data: bytes):
+        """
+        Handle a binary audio frame from a WebSocket client.
+        
+        Args:
+            websocket: The WebSocket connection
+            data: The frame (header and audio, see frame_protocol)
+        """
+        try:
+            header, payload = decode_frame(data)
+            
+            if header.frame_type == FrameType.AUDIO:
+                if payload:
+                    await self.handle_audio(websocket, payload)
+                    
+            elif header.frame_type == FrameType.AUDIO_STREAM:
+                await self.handle_audio_stream(
+                    websocket,
+                    payload,
+                    sample_rate=header.sample_rate or config.AUDIO_SAMPLE_RATE,
+                    final=bool(header.flags & FrameFlag.FINAL),
+                    cancel=bool(header.flags & FrameFlag.CANCEL)
+                )
+                
+            else:
+                logger.warning(f"Unknown binary frame type: {header.frame_type}")
+                
+        except Exception as e:
+            logger.error(f"Error handling binary frame: {e}")
+            await self._send_error(websocket, f"Binary frame error: {str(e)}")
+    
     async def handle_client_message(self, websocket: WebSocket, message: Dict[str, Any]):
         """
         Handle a message from a WebSocket client.
@@ -853,6 +1328,17 @@ class WebSocketManager:
                     audio_bytes = base64.b64decode(audio_base64)
                     await self.handle_audio(websocket, audio_bytes)
                     
+            elif message_type == MessageType.AUDIO_STREAM:
+                # Handle a streamed PCM frame
+                audio_bytes = base64.b64decode(message.get("audio_data", ""))
+                await self.handle_audio_stream(
+                    websocket,
+                    audio_bytes,
+                    sample_rate=int(message.get("sample_rate", config.AUDIO_SAMPLE_RATE)),
+                    final=bool(message.get("final", False)),
+                    cancel=bool(message.get("cancel", False))
+                )
+                    
             elif message_type == MessageType.VISION_FILE_UPLOAD:
                 # Handle vision image upload
                 image_base64 = message.get("image_data", "")
@@ -860,14 +1346,16 @@ class WebSocketManager:
                     await self._handle_vision_file_upload(websocket, image_base64)
             
             elif message_type == "interrupt":
-                # Handle interrupt request
+                # Handle interrupt request: stop the turn and confirm once it is quiet
                 logger.info("Received interrupt request from client")
-                self.interrupt_playback.set()
-                await self._send_status(websocket, "interrupted", {})
+                quiet_time = await self._cancel_turn()
+                await self._send_status(websocket, "interrupted", {
+                    "quiet_ms": round(quiet_time * 1000) if quiet_time is not None else None
+                })
                 
             elif message_type == "clear_history":
                 # Clear conversation history
-                self.llm_client.clear_history(keep_system_prompt=True)
+                self.conversation.clear(keep_system_prompt=True)
                 
                 # Reinitialize conversation context to maintain user name awareness
                 # This ensures the LLM retains knowledge of the user's name even after history is cleared
@@ -877,13 +1365,13 @@ class WebSocketManager:
                 await self._send_status(websocket, "history_cleared", {})
                 
             elif message_type == MessageType.GREETING:
-                # Handle greeting request
-                await self._handle_greeting(websocket)
+                # Handle greeting request (as a turn, so an interrupt can cancel it)
+                await self._start_turn(self._handle_greeting(websocket))
                 
             elif message_type == MessageType.SILENT_FOLLOWUP:
                 # Handle silent follow-up
                 tier = message.get("tier", 0)
-                await self._handle_silent_followup(websocket, tier)
+                await self._start_turn(self._handle_silent_followup(websocket, tier))
                 
             elif message_type == "get_system_prompt":
                 # Send current system prompt to client
@@ -906,6 +1394,14 @@ class WebSocketManager:
                 name = message.get("name", "")
                 await self._handle_update_user_profile(websocket, name)
             
+            elif message_type == "get_transcription_settings":
+                # Send current transcription settings to client
+                await self._handle_get_transcription_settings(websocket)
+                
+            elif message_type == "update_transcription_settings":
+                # Select a decoding profile and/or model tier for this session
+                await self._handle_update_transcription_settings(websocket, message)
+            
             elif message_type == "get_vision_settings":
                 # Send current vision settings to client
                 await self._handle_get_vision_settings(websocket)
@@ -996,6 +1492,9 @@ class WebSocketManager:
             if success:
                 # Initialize conversation context with the updated name
                 self._initialize_conversation_context()
+                
+                # Regenerate pooled greetings and follow-ups for the new name
+                self._configure_speech_pool()
                 logger.info(f"Updated user profile name to: {name} and refreshed conversation context")
             else:
                 logger.error("Failed to update user profile")
@@ -1080,6 +1579,58 @@ class WebSocketManager:
             logger.error(f"Error saving vision settings: {e}")
             return False
     
+    async def _handle_get_transcription_settings(self, websocket: WebSocket):
+        """
+        Send the current transcription settings to the client.
+        
+        Args:
+            websocket: The WebSocket connection
+        """
+        try:
+            await websocket.send_json({
+                "type": MessageType.TRANSCRIPTION_SETTINGS,
+                "decoding_profile": self.decoding_profile or config.WHISPER_DECODING_PROFILE,
+                "available_profiles": list(DECODING_PROFILES),
+                "model": self.model_tier or self.transcriber.active_model,
+                "available_models": self.transcriber.tiers,
+                "timestamp": datetime.now().isoformat()
+            })
+        except Exception as e:
+            logger.error(f"Error sending transcription settings: {e}")
+            await self._send_error(websocket, f"Error sending transcription settings: {str(e)}")
+    
+    async def _handle_update_transcription_settings(self, websocket: WebSocket, settings: Dict[str, Any]):
+        """
+        Update this session's transcription settings.
+        
+        Only the keys present are changed; a null value restores the
+        deployment default. Requesting a model tier that is not loaded yet
+        starts loading it in the background, and the session keeps using the
+        active model until it is ready.
+        
+        Args:
+            websocket: The WebSocket connection
+            settings: Message with optional "decoding_profile" and "model" keys
+        """
+        profile = settings.get("decoding_profile", self.decoding_profile)
+        model = settings.get("model", self.model_tier)
+        
+        if profile is not None and profile not in DECODING_PROFILES:
+            await self._send_error(websocket, f"Unknown decoding profile: {profile}")
+            return
+        if model is not None and model not in self.transcriber.tiers:
+            await self._send_error(websocket, f"Unknown model tier: {model}")
+            return
+        
+        self.decoding_profile = profile
+        self.model_tier = model
+        if model is not None:
+            self.transcriber.request(model)
+        
+        logger.info(f"Session transcription settings: profile={profile or config.WHISPER_DECODING_PROFILE}, "
+                   f"model={model or self.transcriber.active_model}")
+        await self._handle_get_transcription_settings(websocket)
+    
     async def _handle_get_vision_settings(self, websocket: WebSocket):
         """
         Send the current vision settings to the client.
@@ -1147,6 +1698,9 @@ class WebSocketManager:
             with open(self.prompt_path, "w") as f:
                 f.write(new_prompt)
             
+            # Regenerate pooled greetings and follow-ups with the new prompt
+            self._configure_speech_pool()
+            
             # Send confirmation
             await websocket.send_json({
                 "type": MessageType.SYSTEM_PROMPT_UPDATED,
@@ -1166,28 +1720,19 @@ class WebSocketManager:
         Args:
             vision_context: Description of the image from SmolVLM
         """
-        # Add as a system message to provide context for future exchanges
-        vision_message = {
-            "role": "system",
-            "content": f"[VISION CONTEXT]: {vision_context}"
-        }
+        conversation = self.conversation
         
-        # If conversation history is empty, add it as the first message
-        # Otherwise, insert after the main system prompt
-        if not self.llm_client.conversation_history:
-            self.llm_client.conversation_history.append(vision_message)
-        else:
-            # Find the last system message that's not a vision context
-            last_system_idx = -1
-            for i, msg in enumerate(self.llm_client.conversation_history):
-                if msg["role"] == "system" and not msg["content"].startswith("[VISION CONTEXT]"):
-                    last_system_idx = i
-            
-            # Insert after the last system message, or at the beginning if none found
-            if last_system_idx >= 0:
-                self.llm_client.conversation_history.insert(last_system_idx + 1, vision_message)
-            else:
-                self.llm_client.conversation_history.insert(0, vision_message)
+        # Add as a system message to provide context for future exchanges, capped
+        # so one long description cannot take over the history. It is appended in
+        # dialogue order rather than pinned at the front, so the prompt prefix the
+        # LLM server has cached stays valid; older descriptions are trimmed or
+        # summarized with the dialogue around them.
+        max_tokens = max(1, conversation.token_budget // 4)
+        conversation.add(
+            "system",
+            f"[VISION CONTEXT]: {conversation.counter.truncate(vision_context, max_tokens)}",
+            pinned=False
+        )
     
     async def _handle_vision_file_upload(self, websocket: WebSocket, image_base64: str):
         """
@@ -1250,23 +1795,36 @@ class WebSocketManager:
 
 async def websocket_endpoint(
     websocket: WebSocket,
-    transcriber: WhisperTranscriber,
+    transcriber: WhisperModelRegistry,
     llm_client: LLMClient,
     tts_client: TTSClient,
-    openai_agent: Optional[OpenAIAgent] = None
+    session_store: SessionStore,
+    openai_agent: Optional[OpenAIAgent] = None,
+    compactor: Optional[ConversationCompactor] = None,
+    speech_pool: Optional[SpeechPool] = None,
+    speculator: Optional[Speculator] = None,
+    transcoder: Optional[OpusTranscoder] = None
 ):
     """
     FastAPI WebSocket endpoint.
     
     Args:
         websocket: The WebSocket connection
-        transcriber: Whisper transcription service
+        transcriber: Whisper transcription worker pool
         llm_client: LLM client service
         tts_client: TTS client service
+        session_store: Store holding each session's conversation history
         openai_agent: Optional OpenAI Agent service
+        compactor: Optional background summarizer of long conversations
+        speech_pool: Optional pool of pre-generated greetings and follow-ups
+        speculator: Optional starter of replies from stable partial transcripts
+        transcoder: Optional Opus encoder of speech for clients that can decode it
     """
-    # Create WebSocket manager
-    manager = WebSocketManager(transcriber, llm_client, tts_client, openai_agent)
+    # Create WebSocket manager (clients resume their conversation with ?session_id=...)
+    manager = WebSocketManager(transcriber, llm_client, tts_client, session_store, openai_agent,
+                               session_id=websocket.query_params.get("session_id"),
+                               compactor=compactor, speech_pool=speech_pool, speculator=speculator,
+                               transcoder=transcoder)
     
     try:
         # Accept connection
@@ -1277,12 +1835,17 @@ async def websocket_endpoint(
             try:
                 # Receive message with a timeout
                 message = await asyncio.wait_for(
-                    websocket.receive_json(),
+                    websocket.receive(),
                     timeout=30.0  # 30 second timeout
                 )
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
                 
-                # Process message
-                await manager.handle_client_message(websocket, message)
+                # Process message (binary messages are audio frames, text messages JSON)
+                if message.get("bytes") is not None:
+                    await manager.handle_binary_message(websocket, message["bytes"])
+                else:
+                    await manager.handle_client_message(websocket, json.loads(message["text"]))
                 
             except asyncio.TimeoutError:
                 # Send a ping to keep the connection alive
@@ -0,0 +1,422 @@
+"""
+Audio Processing Utilities
+
+Fast path for turning uploaded PCM WAV data into the 16 kHz float32 samples
+Whisper expects, without going through a container decoder.
+"""
+
+import struct
+import logging
+from fractions import Fraction
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Whisper operates on 16 kHz mono audio
+WHISPER_SAMPLE_RATE = 16000
+
+# WAV format tags
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+def parse_wav(data) -> Optional[Tuple[np.ndarray, int, int]]:
+    """
+    Parse a RIFF/WAVE buffer in place.
+
+    Walks the chunk list (the canonical 44-byte header is the common case)
+    and returns a view of the PCM payload without copying it.
+
+    Args:
+        data: WAV file contents (bytes, memoryview or uint8 numpy array)
+
+    Returns:
+        Tuple of (samples view, sample rate, channel count), or None if the
+        data is not uncompressed 16-bit integer or 32-bit float WAV
+    """
+    buffer = memoryview(data).cast("B")
+    if len(buffer) < 12 or buffer[0:4] != b"RIFF" or buffer[8:12] != b"WAVE":
+        return None
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(buffer):
+        chunk_id = bytes(buffer[offset:offset + 4])
+        chunk_size, = struct.unpack_from("<I", buffer, offset + 4)
+        body = offset + 8
+
+        if chunk_id == b"fmt ":
+            format_tag, channels, sample_rate = struct.unpack_from("<HHI", buffer, body)
+            bits_per_sample, = struct.unpack_from("<H", buffer, body + 14)
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40:
+                # The real format tag is the first two bytes of the sub-format GUID
+                format_tag, = struct.unpack_from("<H", buffer, body + 24)
+            fmt = (format_tag, channels, sample_rate, bits_per_sample)
+
+        elif chunk_id == b"data" and fmt is not None:
+            format_tag, channels, sample_rate, bits_per_sample = fmt
+            if format_tag == WAVE_FORMAT_PCM and bits_per_sample == 16:
+                dtype = np.dtype("<i2")
+            elif format_tag == WAVE_FORMAT_IEEE_FLOAT and bits_per_sample == 32:
+                dtype = np.dtype("<f4")
+            else:
+                return None
+
+            # Streaming writers may leave the size as 0 or 0xFFFFFFFF; clamp to what we have
+            available = min(chunk_size, len(buffer) - body)
+            count = available // dtype.itemsize // channels * channels
+            samples = np.frombuffer(buffer, dtype=dtype, count=count, offset=body)
+            return samples, sample_rate, channels
+
+        # Chunks are padded to an even size
+        offset = body + chunk_size + (chunk_size & 1)
+
+    return None
+
+@lru_cache(maxsize=16)
+def _polyphase_plan(from_rate: int, to_rate: int,
+                    zero_crossings: int = 16, beta: float = 8.0) -> Tuple[int, int, int, int, np.ndarray]:
+    """
+    Design (and cache) a windowed-sinc polyphase filter for a rate pair.
+
+    Args:
+        from_rate: Input sample rate in Hz
+        to_rate: Output sample rate in Hz
+        zero_crossings: Filter half-width in zero crossings of the cutoff
+        beta: Kaiser window shape parameter
+
+    Returns:
+        Tuple of (up, down, filter half-length, taps per phase, reversed phase filters)
+    """
+    ratio = Fraction(to_rate, from_rate)
+    up, down = ratio.numerator, ratio.denominator
+
+    # Low-pass at the lower of the two Nyquist rates, designed at up * from_rate
+    max_rate = max(up, down)
+    half_length = zero_crossings * max_rate
+    n = np.arange(-half_length, half_length + 1)
+    prototype = np.sinc(n / max_rate) / max_rate * np.kaiser(len(n), beta) * up
+
+    # Split into `up` phases of equal length, reversed so each output is a dot product
+    taps = -(-len(prototype) // up)
+    padded = np.zeros(taps * up)
+    padded[:len(prototype)] = prototype
+    phases = padded.reshape(taps, up).T[:, ::-1].astype(np.float32)
+
+    return up, down, half_length, taps, np.ascontiguousarray(phases)
+
+def _apply_polyphase(plan, samples: np.ndarray, offset: int, start: int, end: int) -> np.ndarray:
+    """
+    Compute resampled outputs [start, end) from a span of input samples.
+
+    Output n is the dot product of one phase filter with the `taps` input
+    samples ending at (n * down + half_length) // up. Outputs n and n + up
+    share a phase and their windows are `down` samples apart, so each of the
+    `up` residues becomes one strided matrix-vector product.
+
+    Args:
+        plan: Filter plan from _polyphase_plan
+        samples: Input samples, samples[i] being global input index offset + i
+        offset: Global input index of samples[0] (inputs outside the span are zero)
+        start: First output index to compute
+        end: One past the last output index to compute
+
+    Returns:
+        Float32 output samples
+    """
+    up, down, half_length, taps, phases = plan
+    if end <= start:
+        return np.zeros(0, dtype=np.float32)
+
+    first_base = (start * down + half_length) // up
+    last_base = ((end - 1) * down + half_length) // up
+
+    # Global input indices [low, last_base] cover every window; zero-fill outside the span
+    low = first_base - (taps - 1)
+    padded = np.zeros(last_base - low + 1, dtype=np.float32)
+    copy_from = max(low, offset)
+    copy_to = min(last_base + 1, offset + len(samples))
+    if copy_to > copy_from:
+        padded[copy_from - low:copy_to - low] = samples[copy_from - offset:copy_to - offset]
+    windows = sliding_window_view(padded, taps)
+
+    output = np.empty(end - start, dtype=np.float32)
+    streams = None
+    for i in range(min(up, end - start)):
+        centre = (start + i) * down + half_length
+        first = centre // up - first_base
+        count = len(range(i, end - start, up))
+        phase = phases[centre % up]
+
+        if down >= taps:
+            # Windows don't overlap, so the strided view is a valid BLAS operand
+            output[i::up] = windows[first:first + count * down:down] @ phase
+        else:
+            # Overlapping windows would make matmul fall back to a scalar loop;
+            # accumulate one tap at a time over contiguous decimated streams instead
+            if streams is None:
+                streams = [np.ascontiguousarray(padded[r::down]) for r in range(down)]
+            acc = np.zeros(count, dtype=np.float32)
+            for tap in range(min(down, taps)):
+                stream, skip = streams[(first + tap) % down], (first + tap) // down
+                sub_filter = phase[tap::down]
+                acc += np.correlate(stream[skip:skip + count + len(sub_filter) - 1], sub_filter, "valid")
+            output[i::up] = acc
+    return output
+
+def resample(samples: np.ndarray, from_rate: int, to_rate: int = WHISPER_SAMPLE_RATE) -> np.ndarray:
+    """
+    Resample float32 audio with a cached, vectorized polyphase filter.
+
+    Args:
+        samples: Mono float32 samples at from_rate
+        from_rate: Input sample rate in Hz
+        to_rate: Output sample rate in Hz
+
+    Returns:
+        Float32 samples at to_rate
+    """
+    if from_rate == to_rate or len(samples) == 0:
+        return samples.astype(np.float32, copy=False)
+
+    plan = _polyphase_plan(from_rate, to_rate)
+    up, down = plan[0], plan[1]
+    return _apply_polyphase(plan, samples, 0, 0, -(-len(samples) * up // down))
+
+class StreamResampler:
+    """
+    Resamples audio that arrives in frames without seams at frame boundaries.
+
+    Outputs are produced as soon as their whole filter window has arrived;
+    the filter's look-ahead is held back until the next frame or flush().
+    """
+
+    def __init__(self, from_rate: int, to_rate: int = WHISPER_SAMPLE_RATE):
+        """
+        Initialize the stream resampler.
+
+        Args:
+            from_rate: Input sample rate in Hz
+            to_rate: Output sample rate in Hz
+        """
+        self.passthrough = from_rate == to_rate
+        self.plan = None if self.passthrough else _polyphase_plan(from_rate, to_rate)
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._offset = 0    # Global input index of _buffer[0]
+        self._received = 0  # Input samples seen so far
+        self._produced = 0  # Output samples emitted so far
+
+    def _emit(self, end: int) -> np.ndarray:
+        """Produce outputs up to `end` and drop input no longer needed."""
+        up, down, half_length, taps, _ = self.plan
+        output = _apply_polyphase(self.plan, self._buffer, self._offset, self._produced, end)
+        self._produced = max(self._produced, end)
+
+        keep_from = max(self._offset, (self._produced * down + half_length) // up - (taps - 1))
+        self._buffer = self._buffer[keep_from - self._offset:]
+        self._offset = keep_from
+        return output
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Add a frame of input and return every output that is now complete.
+
+        Args:
+            samples: Mono float32 samples at the input rate
+
+        Returns:
+            Float32 samples at the output rate
+        """
+        if self.passthrough:
+            return samples.astype(np.float32, copy=False)
+
+        up, down, half_length, _, _ = self.plan
+        self._buffer = np.concatenate((self._buffer, samples.astype(np.float32, copy=False)))
+        self._received += len(samples)
+
+        # Output n is complete once input (n * down + half_length) // up has arrived
+        ready = max(0, -(-(self._received * up - half_length) // down))
+        return self._emit(ready)
+
+    def flush(self) -> np.ndarray:
+        """
+        Return the remaining outputs, treating the input as ended.
+
+        Returns:
+            Float32 samples at the output rate
+        """
+        if self.passthrough:
+            return np.zeros(0, dtype=np.float32)
+
+        up, down = self.plan[0], self.plan[1]
+        return self._emit(-(-self._received * up // down))
+
+def load_wav_pcm(data) -> Optional[np.ndarray]:
+    """
+    Decode an uncompressed WAV buffer straight to 16 kHz mono float32.
+
+    Args:
+        data: WAV file contents (bytes, memoryview or uint8 numpy array)
+
+    Returns:
+        Float32 samples at 16 kHz, or None if the buffer needs a full decoder
+    """
+    parsed = parse_wav(data)
+    if parsed is None:
+        return None
+    samples, sample_rate, channels = parsed
+
+    if samples.dtype.kind == "i":
+        audio = samples.astype(np.float32)
+        audio *= 1.0 / 32768.0
+    else:
+        audio = samples.astype(np.float32, copy=False)
+
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+
+    return resample(audio, sample_rate)
+
+def wav_header(sample_rate: int, channels: int, bits_per_sample: int,
+               format_tag: int = WAVE_FORMAT_PCM) -> bytes:
+    """
+    Build a canonical 44-byte header for a WAV stream of unknown length.
+
+    Args:
+        sample_rate: Sample rate in Hz
+        channels: Channel count
+        bits_per_sample: Bits per sample
+        format_tag: WAVE_FORMAT_PCM or WAVE_FORMAT_IEEE_FLOAT
+
+    Returns:
+        The header, with the RIFF and data sizes left at 0xFFFFFFFF
+    """
+    block_align = channels * bits_per_sample // 8
+    return (b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, format_tag, channels, sample_rate,
+                                    sample_rate * block_align, block_align, bits_per_sample)
+            + b"data" + struct.pack("<I", 0xFFFFFFFF))
+
+class WavStreamSplitter:
+    """
+    Incremental splitter of a streamed WAV file into playable PCM pieces.
+
+    The RIFF header is parsed as its bytes arrive; the data chunk is then
+    cut at sample frame boundaries into pieces of chunk_ms of audio, so a
+    client holding the header (sent once) can play each piece as soon as it
+    is complete. Writers streaming audio of unknown length may leave the
+    data size as 0 or 0xFFFFFFFF, in which case the data runs to the end
+    of the stream.
+    """
+
+    def __init__(self, chunk_ms: float = 250.0):
+        """
+        Initialize the splitter.
+
+        Args:
+            chunk_ms: Audio per piece in milliseconds
+        """
+        self.chunk_ms = chunk_ms
+        self.header: Optional[bytes] = None  # Canonical header, once parsed
+        self.sample_rate = 0
+        self.block_align = 0
+        self._buffer = bytearray()
+        self._chunk_bytes = 0
+        self._remaining: Optional[int] = None  # Declared data bytes not yet split off
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """
+        Add streamed bytes and return the pieces they completed.
+
+        Args:
+            data: Next bytes of the WAV file
+
+        Returns:
+            Complete PCM pieces, in order (possibly empty)
+
+        Raises:
+            ValueError: If the stream is not 16-bit integer or 32-bit float PCM WAV
+        """
+        self._buffer += data
+        if self.header is None and not self._parse_header():
+            return []
+        return self._split(self._chunk_bytes)
+
+    def flush(self) -> List[bytes]:
+        """
+        Return the remaining whole sample frames once the stream has ended.
+
+        Returns:
+            The remaining PCM pieces
+
+        Raises:
+            ValueError: If the stream ended before its header was complete
+        """
+        if self.header is None:
+            raise ValueError("WAV stream ended before its data chunk")
+        return self._split(self.block_align)
+
+    def _parse_header(self) -> bool:
+        """Parse the header once the data chunk starts; False if more bytes are needed."""
+        buffer = self._buffer
+        if len(buffer) < 12:
+            return False
+        if buffer[0:4] != b"RIFF" or buffer[8:12] != b"WAVE":
+            raise ValueError("Not a RIFF/WAVE stream")
+
+        fmt = None
+        offset = 12
+        while offset + 8 <= len(buffer):
+            chunk_id = bytes(buffer[offset:offset + 4])
+            chunk_size, = struct.unpack_from("<I", buffer, offset + 4)
+            body = offset + 8
+
+            if chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError("WAV data chunk before its fmt chunk")
+                format_tag, channels, sample_rate, bits_per_sample = fmt
+                if (format_tag, bits_per_sample) not in ((WAVE_FORMAT_PCM, 16), (WAVE_FORMAT_IEEE_FLOAT, 32)):
+                    raise ValueError(f"Unsupported WAV format {format_tag} with {bits_per_sample} bits")
+
+                self.header = wav_header(sample_rate, channels, bits_per_sample, format_tag)
+                self.sample_rate = sample_rate
+                self.block_align = channels * bits_per_sample // 8
+                self._chunk_bytes = max(1, int(sample_rate * self.chunk_ms / 1000)) * self.block_align
+                self._remaining = chunk_size if 0 < chunk_size < 0xFFFFFFFF else None
+                del buffer[:body]
+                return True
+
+            if body + chunk_size > len(buffer):
+                return False
+            if chunk_id == b"fmt ":
+                format_tag, channels, sample_rate = struct.unpack_from("<HHI", buffer, body)
+                bits_per_sample, = struct.unpack_from("<H", buffer, body + 14)
+                if format_tag == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40:
+                    format_tag, = struct.unpack_from("<H", buffer, body + 24)
+                fmt = (format_tag, channels, sample_rate, bits_per_sample)
+
+            # Chunks are padded to an even size
+            offset = body + chunk_size + (chunk_size & 1)
+        return False
+
+    def _split(self, min_bytes: int) -> List[bytes]:
+        """Split off pieces of up to chunk_ms while at least min_bytes are buffered."""
+        pieces = []
+        while True:
+            available = len(self._buffer)
+            if self._remaining is not None:
+                available = min(available, self._remaining)
+            if available < min_bytes:
+                return pieces
+
+            size = min(available, self._chunk_bytes) // self.block_align * self.block_align
+            pieces.append(bytes(self._buffer[:size]))
+            del self._buffer[:size]
+            if self._remaining is not None:
+                self._remaining -= size
@@ -0,0 +1,187 @@
+"""
+Conversation Compaction Service
+
+Summarizes older turns of long conversations into a single pinned
+[SUMMARY] system message. Compaction runs as a background task after a
+turn has been answered, so it never adds latency to the user's turn, and
+it keeps prompts short instead of letting the token budget silently drop
+the oldest dialogue.
+"""
+
+import time
+import asyncio
+import logging
+from typing import Dict, Any, Optional
+
+from .llm import LLMClient
+from .metrics import LatencyStats
+from .session_store import ConversationState
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Marker of the summary system message
+SUMMARY_PREFIX = "[SUMMARY]"
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You condense voice assistant conversations into brief notes for the assistant's memory. "
+    "Keep names, facts about the user, decisions, open questions and anything the user asked "
+    "to remember. Write plain sentences in the third person, without preamble."
+)
+
+class ConversationCompactor:
+    """
+    Background summarizer of conversation history.
+
+    After each turn, conversations over the token threshold get a
+    compaction task (at most one per session at a time). The task snapshots
+    the dialogue except for the latest messages, asks the LLM to merge it
+    with the previous summary, and swaps the summary in for the messages it
+    covers. Messages added while the summary was generated are untouched,
+    and the result is discarded if the history was cleared or reloaded in
+    the meantime.
+    """
+
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        threshold_tokens: int = 3000,
+        keep_messages: int = 6,
+        summary_tokens: int = 300
+    ):
+        """
+        Initialize the compactor.
+
+        Args:
+            llm_client: LLM client used to write summaries
+            threshold_tokens: History tokens at which older turns are summarized
+            keep_messages: Latest dialogue messages always kept verbatim
+            summary_tokens: Maximum tokens of a summary
+        """
+        self.llm_client = llm_client
+        self.threshold_tokens = threshold_tokens
+        self.keep_messages = keep_messages
+        self.summary_tokens = summary_tokens
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+        # Statistics
+        self.compactions = 0
+        self.failures = 0
+        self.discarded = 0
+        self.messages_summarized = 0
+        self.prompt_tokens_saved = 0
+        self.compaction_time = LatencyStats()
+
+        logger.info(f"Initialized Conversation Compactor with threshold_tokens={threshold_tokens}, "
+                   f"keep_messages={keep_messages}, summary_tokens={summary_tokens}")
+
+    def schedule(self, conversation: ConversationState) -> bool:
+        """
+        Start compacting a conversation in the background if it is over the threshold.
+
+        Args:
+            conversation: Conversation that just finished a turn
+
+        Returns:
+            True if a compaction task was started
+        """
+        session_id = conversation.session_id
+        if conversation.tokens < self.threshold_tokens or session_id in self._tasks:
+            return False
+
+        entries = conversation.oldest_dialogue(self.keep_messages)
+        if len(entries) < 2:
+            return False
+
+        task = asyncio.create_task(self._compact(conversation, entries, conversation.generation))
+        self._tasks[session_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(session_id, None))
+        return True
+
+    def _previous_summary(self, conversation: ConversationState) -> Optional[str]:
+        """Get the text of the conversation's current summary, if any."""
+        for message in conversation.messages():
+            if message["role"] != "system":
+                break
+            if message["content"].startswith(SUMMARY_PREFIX):
+                return message["content"][len(SUMMARY_PREFIX):].lstrip(": ")
+        return None
+
+    async def _compact(self, conversation: ConversationState, entries: list, generation: int) -> None:
+        """
+        Summarize a snapshot of older messages and swap the summary in.
+
+        Args:
+            conversation: Conversation to compact
+            entries: Snapshot of the older dialogue entries
+            generation: History generation the snapshot was taken from
+        """
+        start_time = time.perf_counter()
+
+        transcript = "\n".join(f"{role.capitalize()}: {content}" for role, content, _ in entries)
+        previous = self._previous_summary(conversation)
+        instruction = (
+            (f"Summary so far:\n{previous}\n\n" if previous else "")
+            + f"Conversation to add:\n{transcript}\n\n"
+            + f"Write an updated summary in at most {self.summary_tokens} tokens."
+        )
+
+        try:
+            response = await self.llm_client.get_response(
+                instruction,
+                SUMMARY_SYSTEM_PROMPT,
+                add_to_history=False,
+                temperature=0.2,
+                max_tokens=self.summary_tokens
+            )
+        except Exception as e:
+            response = {"error": str(e)}
+
+        summary = (response.get("text") or "").strip()
+        if "error" in response or not summary:
+            self.failures += 1
+            logger.warning(f"Could not compact conversation {conversation.session_id}: "
+                          f"{response.get('error', 'empty summary')}")
+            return
+
+        if conversation.generation != generation:
+            self.discarded += 1
+            logger.info(f"Discarded summary for conversation {conversation.session_id}: history was replaced")
+            return
+
+        summarized = conversation.summarized
+        saved = conversation.compact(entries, f"{SUMMARY_PREFIX}: {summary}", SUMMARY_PREFIX)
+        elapsed = time.perf_counter() - start_time
+
+        self.compactions += 1
+        self.messages_summarized += conversation.summarized - summarized
+        self.prompt_tokens_saved += saved
+        self.compaction_time.record(elapsed)
+        logger.info(f"Compacted conversation {conversation.session_id}: "
+                   f"{conversation.summarized - summarized} messages summarized, "
+                   f"~{saved} prompt tokens saved in {elapsed:.2f}s")
+
+    async def close(self) -> None:
+        """Cancel all compactions in progress."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the current compaction statistics.
+
+        Returns:
+            Dict containing compaction counts, prompt tokens saved and time spent compacting
+        """
+        return {
+            "in_progress": len(self._tasks),
+            "compactions": self.compactions,
+            "failures": self.failures,
+            "discarded": self.discarded,
+            "messages_summarized": self.messages_summarized,
+            "prompt_tokens_saved": self.prompt_tokens_saved,
+            "compaction_time": self.compaction_time.summary()
+        }
@@ -0,0 +1,378 @@
+"""
+Context Window Service
+
+Token-budgeted conversation history. Each message's token count is computed
+once when it is added, and the oldest dialogue is dropped to keep the
+history within a token budget, so short exchanges can use the whole context
+while long ones (e.g. image descriptions) cannot overflow it.
+"""
+
+import os
+import re
+import sys
+import logging
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple, Deque
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tokens the chat template adds around each message (role markers, separators)
+MESSAGE_TOKEN_OVERHEAD = 4
+
+ROLES = {"system": "system", "user": "user", "assistant": "assistant"}
+
+# (role, content, tokens)
+Entry = Tuple[str, str, int]
+
+class TokenCounter:
+    """
+    Fast heuristic token counter.
+
+    Estimates BPE tokens as the larger of one token per four characters and
+    one token per word or punctuation mark, which tracks common English
+    tokenizers closely enough for budgeting. Counts of repeated strings
+    (system prompts, instructions) are cached.
+    """
+
+    name = "heuristic"
+
+    _PIECES = re.compile(r"\w+|[^\w\s]")
+
+    def __init__(self, cache_size: int = 1024):
+        """
+        Initialize the token counter.
+
+        Args:
+            cache_size: Number of recent counts kept
+        """
+        self.count = lru_cache(maxsize=cache_size)(self._count)
+
+    def _count(self, text: str) -> int:
+        """Count the tokens of a text (uncached)."""
+        return max((len(text) + 3) // 4, len(self._PIECES.findall(text)))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Shorten a text to about a token limit, cutting at a word boundary.
+
+        Args:
+            text: Text to shorten
+            max_tokens: Maximum number of tokens
+
+        Returns:
+            The text, or its beginning followed by an ellipsis
+        """
+        if self.count(text) <= max_tokens:
+            return text
+
+        # Binary search for the longest prefix within the limit
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self._count(text[:middle]) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        cut = text.rfind(" ", 0, low)
+        return text[:cut if cut > 0 else low].rstrip() + "..."
+
+class TokenizerCounter(TokenCounter):
+    """Exact token counter using a Hugging Face tokenizer (tokenizer.json)."""
+
+    def __init__(self, tokenizer, name: str, cache_size: int = 1024):
+        """
+        Initialize the token counter.
+
+        Args:
+            tokenizer: tokenizers.Tokenizer instance
+            name: Tokenizer file or model name, for reporting
+            cache_size: Number of recent counts kept
+        """
+        super().__init__(cache_size)
+        self.tokenizer = tokenizer
+        self.name = name
+
+    def _count(self, text: str) -> int:
+        """Count the tokens of a text (uncached)."""
+        return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+
+def load_token_counter(tokenizer: str = "") -> TokenCounter:
+    """
+    Load the token counter for the configured tokenizer.
+
+    Args:
+        tokenizer: Path to a tokenizer.json file or a Hugging Face model name
+            with one; empty for the heuristic counter
+
+    Returns:
+        A token counter (the heuristic one if the tokenizer cannot be loaded)
+    """
+    if not tokenizer or tokenizer == "heuristic":
+        return TokenCounter()
+
+    try:
+        from tokenizers import Tokenizer
+        if os.path.exists(tokenizer):
+            loaded = Tokenizer.from_file(tokenizer)
+        else:
+            loaded = Tokenizer.from_pretrained(tokenizer)
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer {tokenizer}, using heuristic token counts: {e}")
+        return TokenCounter()
+
+    logger.info(f"Loaded tokenizer {tokenizer} for context budgeting")
+    return TokenizerCounter(loaded, tokenizer)
+
+class ContextWindow:
+    """
+    Conversation history trimmed to a token budget.
+
+    System messages (system prompt, user context, summary) are pinned at the
+    front and never trimmed; system messages added unpinned (vision context)
+    stay in dialogue order so the front of the prompt does not change. The
+    dialogue is a deque with a running token total:
+    adding a message costs one token count, and the oldest dialogue messages
+    are popped while the total is over the budget, so trimming is O(1)
+    amortized. The newest message is always kept.
+    """
+
+    __slots__ = ("counter", "token_budget", "trimmed", "summarized", "generation", "_system", "_dialogue",
+                 "_system_tokens", "_dialogue_tokens", "_content_bytes")
+
+    def __init__(self, counter: Optional[TokenCounter] = None, token_budget: int = 6000):
+        """
+        Initialize an empty context window.
+
+        Args:
+            counter: Token counter (a heuristic counter if None)
+            token_budget: Maximum tokens for the history
+        """
+        self.counter = counter or TokenCounter()
+        self.token_budget = token_budget
+        self.trimmed = 0
+        self.summarized = 0
+        self.generation = 0  # Bumped whenever the history is replaced or cleared
+        self._system: List[Entry] = []
+        self._dialogue: Deque[Entry] = deque()
+        self._system_tokens = 0
+        self._dialogue_tokens = 0
+        self._content_bytes = 0
+
+    def _entry(self, role: str, content: str) -> Entry:
+        """Build a stored message with its token count, sharing role strings."""
+        tokens = self.counter.count(content) + MESSAGE_TOKEN_OVERHEAD
+        return (ROLES.get(role) or sys.intern(role), content, tokens)
+
+    def _account(self, entry: Entry, pinned: bool, sign: int = 1) -> None:
+        """Add (or with sign=-1 remove) an entry's tokens and size from the totals."""
+        if pinned:
+            self._system_tokens += sign * entry[2]
+        else:
+            self._dialogue_tokens += sign * entry[2]
+        self._content_bytes += sign * len(entry[1])
+
+    def _trim(self) -> None:
+        """Drop the oldest dialogue messages while the history is over budget."""
+        while len(self._dialogue) > 1 and self._system_tokens + self._dialogue_tokens > self.token_budget:
+            self._account(self._dialogue.popleft(), False, -1)
+            self.trimmed += 1
+
+    def _locate(self, index: int) -> Tuple[bool, int]:
+        """Map a position in the whole history to (is system, index in that part)."""
+        if index < 0:
+            index += len(self)
+        if index < len(self._system):
+            return True, index
+        return False, index - len(self._system)
+
+    def __len__(self) -> int:
+        return len(self._system) + len(self._dialogue)
+
+    def __getitem__(self, index: int) -> Dict[str, str]:
+        is_system, position = self._locate(index)
+        role, content, _ = (self._system if is_system else self._dialogue)[position]
+        return {"role": role, "content": content}
+
+    @property
+    def tokens(self) -> int:
+        """Tokens in the history."""
+        return self._system_tokens + self._dialogue_tokens
+
+    def add(self, role: str, content: str, pinned: bool = True) -> None:
+        """
+        Append a message, trimming the oldest dialogue over the budget.
+
+        Args:
+            role: Message role ('system', 'user', or 'assistant')
+            content: Message content
+            pinned: Whether a system message is pinned at the front (otherwise
+                it is appended to the dialogue and can be trimmed)
+        """
+        entry = self._entry(role, content)
+        pinned = pinned and entry[0] == "system"
+        (self._system if pinned else self._dialogue).append(entry)
+        self._account(entry, pinned)
+        self._trim()
+
+    def insert(self, index: int, role: str, content: str) -> None:
+        """
+        Insert a message at a position (system messages stay in front of the dialogue).
+
+        Args:
+            index: Position to insert at
+            role: Message role
+            content: Message content
+        """
+        entry = self._entry(role, content)
+        if entry[0] == "system":
+            self._system.insert(min(max(index, 0), len(self._system)), entry)
+        else:
+            self._dialogue.insert(max(index - len(self._system), 0), entry)
+        self._account(entry, entry[0] == "system")
+        self._trim()
+
+    def replace(self, index: int, role: str, content: str) -> None:
+        """
+        Replace the message at a position.
+
+        Args:
+            index: Position of the message
+            role: Message role
+            content: Message content
+        """
+        is_system, position = self._locate(index)
+        part = self._system if is_system else self._dialogue
+        self._account(part[position], is_system, -1)
+        del part[position]
+        self.insert(index, role, content)
+
+    def messages(self) -> List[Dict[str, str]]:
+        """
+        Get the history in chat API form.
+
+        Returns:
+            List of {"role", "content"} dicts, system messages first
+        """
+        return [{"role": role, "content": content} for role, content, _ in (*self._system, *self._dialogue)]
+
+    def entries(self) -> List[Entry]:
+        """
+        Get the history with each message's token count.
+
+        Returns:
+            List of (role, content, tokens), system messages first
+        """
+        return [*self._system, *self._dialogue]
+
+    def load(self, messages: List[Dict[str, str]]) -> None:
+        """
+        Replace the history (e.g. with a saved session).
+
+        System messages before the first dialogue message are pinned, later
+        ones keep their place in the dialogue.
+
+        Args:
+            messages: List of {"role", "content"} dicts
+        """
+        self.clear(keep_system_prompt=False)
+        for message in messages:
+            self.add(message["role"], message["content"], pinned=not self._dialogue)
+
+    def clear(self, keep_system_prompt: bool = True) -> None:
+        """
+        Clear the history.
+
+        Args:
+            keep_system_prompt: Whether to keep the first system message if it exists
+        """
+        system = self._system[:1] if keep_system_prompt else []
+        self.generation += 1
+        self.summarized = 0
+        self._system, self._dialogue = [], deque()
+        self._system_tokens = self._dialogue_tokens = self._content_bytes = 0
+        for entry in system:
+            self._system.append(entry)
+            self._account(entry, True)
+
+    def oldest_dialogue(self, keep: int) -> List[Entry]:
+        """
+        Snapshot the dialogue except for the latest messages.
+
+        Args:
+            keep: Number of latest dialogue messages to leave out
+
+        Returns:
+            The older dialogue entries, oldest first
+        """
+        return list(self._dialogue)[:max(0, len(self._dialogue) - keep)]
+
+    def compact(self, entries: List[Entry], content: str, prefix: str) -> int:
+        """
+        Replace older dialogue with a pinned system message (e.g. a summary).
+
+        Entries still at the front of the dialogue are removed (ones the
+        budget already trimmed are simply gone), and the system message
+        starting with prefix is replaced or added.
+
+        Args:
+            entries: Dialogue entries from oldest_dialogue() that the message replaces
+            content: Content of the replacement system message
+            prefix: Marker identifying the replacement message
+
+        Returns:
+            Tokens saved by the replacement (negative if the history grew)
+        """
+        saved = 0
+        for entry in entries:
+            if self._dialogue and self._dialogue[0] is entry:
+                self._account(self._dialogue.popleft(), False, -1)
+                saved += entry[2]
+                self.summarized += 1
+
+        new = self._entry("system", content)
+        for i, old in enumerate(self._system):
+            if old[1].startswith(prefix):
+                self._account(old, True, -1)
+                saved += old[2]
+                self._system[i] = new
+                break
+        else:
+            self._system.append(new)
+        self._account(new, True)
+        return saved - new[2]
+
+    def copy_recent(self, target: "ContextWindow", count: int) -> None:
+        """
+        Fill another window with the system messages and the latest dialogue.
+
+        Args:
+            target: Empty window to fill
+            count: Number of dialogue messages to copy
+        """
+        for entry in self._system:
+            target._system.append(entry)
+            target._account(entry, True)
+        for entry in list(self._dialogue)[-count:] if count > 0 else []:
+            target._dialogue.append(entry)
+            target._account(entry, False)
+        target._trim()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the window's token usage.
+
+        Returns:
+            Dict containing message and token counts
+        """
+        return {
+            "messages": len(self),
+            "tokens": self.tokens,
+            "system_tokens": self._system_tokens,
+            "token_budget": self.token_budget,
+            "trimmed": self.trimmed,
+            "summarized": self.summarized,
+            "tokenizer": self.counter.name
+        }
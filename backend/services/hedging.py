@@ -0,0 +1,209 @@
+"""
+Request Hedging Service
+
+Tail-latency control for streamed LLM replies. When the first token of a
+reply is later than a deadline derived from recent first-token times, a
+duplicate request is sent to an alternate backend and whichever starts
+answering first is used; the other request is cancelled.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, AsyncGenerator
+
+from .metrics import LatencyStats
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def has_content(chunk: Dict[str, Any]) -> bool:
+    """Check whether a chat completions stream chunk carries reply text."""
+    choice = (chunk.get("choices") or [{}])[0]
+    return bool((choice.get("delta") or {}).get("content"))
+
+class StreamAttempt:
+    """
+    One streamed request of a possibly hedged reply.
+
+    The stream is read by a task of its own into a buffer, so attempts can
+    race for the first token without the caller reading either. The
+    backends list is the one the stream appends to as it picks backends
+    (empty for alternates that are not LLM backends).
+    """
+
+    def __init__(self, chunks: AsyncGenerator[Dict[str, Any], None], backends: Optional[List[Any]] = None):
+        """
+        Start reading the stream.
+
+        Args:
+            chunks: Chat completions stream chunks
+            backends: Backends the stream was sent to, last one current
+        """
+        self.backends = backends if backends is not None else []
+        self.failed = False
+        self.first_token = asyncio.Event()  # Also set when the stream ends or fails
+        self._chunks: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(chunks))
+
+    async def _run(self, chunks: AsyncGenerator[Dict[str, Any], None]) -> None:
+        """Buffer the stream's chunks, then None, or the exception it raised."""
+        try:
+            async for chunk in chunks:
+                if has_content(chunk):
+                    self.first_token.set()
+                self._chunks.put_nowait(chunk)
+            self._chunks.put_nowait(None)
+        except Exception as e:
+            self.failed = True
+            self._chunks.put_nowait(e)
+        finally:
+            self.first_token.set()
+
+    @property
+    def backend(self) -> Optional[Any]:
+        """Backend currently serving the stream, if any."""
+        return self.backends[-1] if self.backends else None
+
+    @property
+    def started(self) -> bool:
+        """Whether the stream has produced reply text (or ended)."""
+        return self.first_token.is_set() and not self.failed
+
+    async def wait_first_token(self, timeout: float) -> bool:
+        """
+        Wait for the first token (or the end of the stream).
+
+        Args:
+            timeout: Seconds to wait
+
+        Returns:
+            True if the stream produced a token, ended or failed in time
+        """
+        try:
+            await asyncio.wait_for(self.first_token.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def chunks(self) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Yield the stream's chunks, starting with those already buffered.
+
+        Yields:
+            Chat completions stream chunks (the stream's exception is re-raised)
+        """
+        while True:
+            item = await self._chunks.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def cancel(self) -> None:
+        """Cancel the request, closing its stream."""
+        self._task.cancel()
+
+    @staticmethod
+    async def first(attempts: List["StreamAttempt"]) -> "StreamAttempt":
+        """
+        Wait for the first attempt that starts answering.
+
+        Args:
+            attempts: Racing attempts, the primary first
+
+        Returns:
+            The first attempt with a token, or the primary if all of them failed
+        """
+        waiting = list(attempts)
+        while waiting:
+            waits = {asyncio.create_task(attempt.first_token.wait()): attempt for attempt in waiting}
+            try:
+                done, _ = await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for wait in waits:
+                    wait.cancel()
+            for wait in done:
+                attempt = waits[wait]
+                if attempt.started:
+                    return attempt
+                waiting.remove(attempt)
+        return attempts[0]
+
+class HedgePolicy:
+    """
+    When to send a duplicate request, and how often it paid off.
+
+    The deadline is a percentile of recent first-token times, clamped to
+    [min_delay, max_delay]; max_delay is used until min_samples first
+    tokens have been seen. A request that fails before its first token
+    gets its alternate right away.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        min_delay: float = 0.5,
+        max_delay: float = 3.0,
+        min_samples: int = 20
+    ):
+        """
+        Initialize the hedging policy.
+
+        Args:
+            percentile: First-token time percentile used as the deadline (0 to disable hedging)
+            min_delay: Shortest deadline in seconds
+            max_delay: Longest deadline in seconds
+            min_samples: First-token samples needed before the percentile is used
+        """
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+
+        # Statistics
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self.deadline_stats = LatencyStats()
+
+        logger.info(f"Initialized Hedge Policy with percentile={percentile}, "
+                   f"delay={min_delay}-{max_delay}s")
+
+    @property
+    def enabled(self) -> bool:
+        """Whether duplicate requests are sent at all."""
+        return self.percentile > 0
+
+    def deadline(self, time_to_first_token: LatencyStats) -> float:
+        """
+        Get the current hedging deadline.
+
+        Args:
+            time_to_first_token: Recent first-token times
+
+        Returns:
+            Seconds to wait for a first token before sending a duplicate request
+        """
+        if time_to_first_token.count < self.min_samples:
+            deadline = self.max_delay
+        else:
+            deadline = min(max(time_to_first_token.percentile(self.percentile), self.min_delay), self.max_delay)
+        self.deadline_stats.record(deadline)
+        return deadline
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the hedging statistics.
+
+        Returns:
+            Dict containing duplicate request counts, how often they won and the deadlines used
+        """
+        return {
+            "percentile": self.percentile,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "deadline": self.deadline_stats.summary()
+        }
@@ -0,0 +1,175 @@
+"""
+HTTP Connection Pool Service
+
+Shared async HTTP client with a keep-alive connection pool for the local
+LLM and TTS APIs, so turns reuse warm connections instead of paying for a
+new TCP connection on every request.
+"""
+
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, AsyncIterator
+
+import httpx
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class HTTPConnectionPool:
+    """
+    Keep-alive connection pool shared by the HTTP service clients.
+
+    Wraps a single httpx.AsyncClient with explicit pool limits and separate
+    connect and read timeouts, and tracks requests in flight so the pool's
+    in-use, idle and waiting counts can be reported.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0
+    ):
+        """
+        Initialize the connection pool.
+
+        Args:
+            max_connections: Maximum open connections across all hosts
+            max_keepalive_connections: Maximum idle connections kept open
+            keepalive_expiry: Seconds an idle connection is kept open
+            connect_timeout: Seconds allowed to establish a connection
+            read_timeout: Seconds allowed between bytes of a response (also used
+                for writes and for waiting on a free connection)
+        """
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        self._transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry
+            )
+        )
+        self.client = httpx.AsyncClient(
+            transport=self._transport,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+        )
+
+        # Statistics
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+
+        logger.info(f"Initialized HTTP Connection Pool with max_connections={max_connections}, "
+                   f"max_keepalive={max_keepalive_connections}, connect_timeout={connect_timeout}s, "
+                   f"read_timeout={read_timeout}s")
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request and read the whole response.
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            **kwargs: Arguments passed to httpx.AsyncClient.request
+
+        Returns:
+            The response
+        """
+        self.in_flight += 1
+        self.requests += 1
+        try:
+            return await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """
+        Send a request and stream the response body.
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            **kwargs: Arguments passed to httpx.AsyncClient.stream
+
+        Yields:
+            The response, with the body not yet read
+        """
+        self.in_flight += 1
+        self.requests += 1
+        try:
+            async with self.client.stream(method, url, **kwargs) as response:
+                yield response
+        except httpx.HTTPError:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def prewarm(self, urls: List[str], connections: int = 1) -> None:
+        """
+        Open keep-alive connections to the given services ahead of the first turn.
+
+        Any HTTP response counts as success (the request only has to establish
+        the connection); services that are not reachable yet are logged and skipped.
+
+        Args:
+            urls: Service URLs (only their scheme, host and port are used)
+            connections: Connections to open per service
+        """
+        origins = list(dict.fromkeys(str(httpx.URL(url).copy_with(path="/", query=None)) for url in urls))
+
+        async def warm(origin: str) -> bool:
+            try:
+                await self.client.get(origin)
+                return True
+            except httpx.HTTPError as e:
+                logger.warning(f"Could not pre-warm connection to {origin}: {e}")
+                return False
+
+        start_time = time.perf_counter()
+        results = await asyncio.gather(*(warm(origin) for origin in origins for _ in range(connections)))
+        logger.info(f"Pre-warmed {sum(results)}/{len(results)} connections to {', '.join(origins)} "
+                   f"in {time.perf_counter() - start_time:.2f}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the current pool statistics.
+
+        Returns:
+            Dict containing connections in use, idle connections, requests
+            waiting for a connection and request counters
+        """
+        # httpcore exposes the open connections on the transport's pool
+        pool = getattr(self._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        idle = sum(1 for connection in connections if connection.is_idle())
+        in_use = len(connections) - idle
+
+        return {
+            "in_use": in_use,
+            "idle": idle,
+            "waiters": max(0, self.in_flight - in_use),
+            "in_flight": self.in_flight,
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections,
+            "requests": self.requests,
+            "errors": self.errors
+        }
+
+    async def close(self) -> None:
+        """Close all pooled connections."""
+        await self.client.aclose()
@@ -1,45 +1,84 @@
 """
 LLM Service
 
-Handles communication with the local LLM API endpoint.
+Handles communication with the local LLM API endpoint(s).
 """
 
 import json
-import requests
+import time
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional
+import httpx
+from typing import Dict, Any, List, Optional, AsyncGenerator, Tuple, Union
+
+from .metrics import LatencyStats
+from .http_pool import HTTPConnectionPool
+from .session_store import ConversationState
+from .llm_router import LLMRouter, LLMBackend
+from .hedging import HedgePolicy, StreamAttempt, has_content
+from .prompt_cache import PromptCache, server_cached_tokens
+from .context_window import TokenCounter, Entry, MESSAGE_TOKEN_OVERHEAD
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Failures where the request never reached the server, so another backend can take it
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
 class LLMClient:
     """
     Client for communicating with a local LLM API.
     
     This class handles requests to a locally hosted LLM API that follows
-    the OpenAI API format.
+    the OpenAI API format. The client is stateless and shared by all
+    sessions; each request is given the session's conversation. With
+    several endpoints, requests are balanced over them by an LLMRouter.
     """
     
     def __init__(
         self,
-        api_endpoint: str = "http://127.0.0.1:1234/v1/chat/completions",
+        api_endpoint: Union[str, List[str]] = "http://127.0.0.1:1234/v1/chat/completions",
         model: str = "default",
         temperature: float = 0.7,
         max_tokens: int = 2048,
-        timeout: int = 60
+        timeout: int = 60,
+        http_pool: Optional[HTTPConnectionPool] = None,
+        token_counter: Optional[TokenCounter] = None,
+        cache_prompt: bool = True,
+        cache_slots: int = 0,
+        probe_interval: float = 10.0,
+        probe_timeout: float = 2.0,
+        breaker_failures: int = 3,
+        breaker_cooldown: float = 30.0,
+        breaker_slow: float = 10.0,
+        hedging: Optional[HedgePolicy] = None,
+        hedge_fallback: Optional[Any] = None
     ):
         """
         Initialize the LLM client.
         
         Args:
-            api_endpoint: URL of the local LLM API
+            api_endpoint: URL of the local LLM API, or a list of interchangeable servers
             model: Model name to use (or 'default' for API default)
             temperature: Sampling temperature (0.0 to 1.0)
             max_tokens: Maximum tokens to generate
-            timeout: Request timeout in seconds
+            timeout: Read timeout in seconds (when the client creates its own pool)
+            http_pool: Shared keep-alive connection pool, if None a private one is created
+            token_counter: Token counter for prompt size reporting (heuristic if None)
+            cache_prompt: Whether to ask the server to reuse its KV cache for unchanged prompt prefixes
+            cache_slots: Server slots to pin conversations to (0 to let the server choose)
+            probe_interval: Seconds between health probes of multiple endpoints (0 to disable)
+            probe_timeout: Seconds an endpoint has to answer a health probe
+            breaker_failures: Consecutive failures that stop traffic to an endpoint
+            breaker_cooldown: Seconds an endpoint gets no traffic after its breaker opens
+            breaker_slow: First-token time counted as a failure (0 to ignore slowness)
+            hedging: When to duplicate streamed requests whose first token is late (None to never)
+            hedge_fallback: Agent taking duplicate requests when no other endpoint is
+                available (e.g. OpenAIAgent; anything with complete(messages, temperature, max_tokens))
         """
-        self.api_endpoint = api_endpoint
+        api_endpoints = [api_endpoint] if isinstance(api_endpoint, str) else list(api_endpoint)
+        self.api_endpoint = api_endpoints[0]
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
@@ -47,111 +86,326 @@ class LLMClient:
         
         # State tracking
         self.is_processing = False
-        self.conversation_history = []
         
-        logger.info(f"Initialized LLM Client with endpoint={api_endpoint}")
+        # Keep-alive connection pool (shared with the other HTTP services when given)
+        self._owns_pool = http_pool is None
+        self.http_pool = http_pool or HTTPConnectionPool(read_timeout=timeout)
+        self.token_counter = token_counter or TokenCounter()
+        self.prompt_cache = PromptCache(cache_prompt, cache_slots)
+        self.router = LLMRouter(api_endpoints, self.http_pool, probe_interval, probe_timeout,
+                                breaker_failures, breaker_cooldown, breaker_slow)
+        self.hedging = hedging
+        self.hedge_fallback = hedge_fallback
+        
+        # Latency statistics (time to first token only applies to streamed responses)
+        self.time_to_first_token = LatencyStats()
+        self.response_time = LatencyStats()
         
-    def add_to_history(self, role: str, content: str) -> None:
+        logger.info(f"Initialized LLM Client with endpoint(s)={', '.join(self.router.api_endpoints)}")
+    
+    def start(self) -> None:
+        """Start the health probes of the LLM endpoints."""
+        self.router.start()
+    
+    async def _post(self, payload: Dict[str, Any],
+                    conversation: Optional[ConversationState]) -> httpx.Response:
         """
-        Add a message to the conversation history.
+        Send a chat completions request to the selected backend.
+        
+        A request that cannot connect is sent to the next backend.
         
         Args:
-            role: Message role ('system', 'user', or 'assistant')
-            content: Message content
-        """
-        self.conversation_history.append({
-            "role": role,
-            "content": content
-        })
-        
-        # Allow deeper history for models with large context windows
-        if len(self.conversation_history) > 50:
-            # Always keep the system message if it exists
-            if self.conversation_history[0]["role"] == "system":
-                self.conversation_history = (
-                    [self.conversation_history[0]] + 
-                    self.conversation_history[-49:]
-                )
-            else:
-                self.conversation_history = self.conversation_history[-50:]
-    
-    def get_response(self, user_input: str, system_prompt: Optional[str] = None, 
-                    add_to_history: bool = True, temperature: Optional[float] = None) -> Dict[str, Any]:
+            payload: Request payload
+            conversation: Conversation the request belongs to (for backend pinning)
+            
+        Returns:
+            The response, with a successful status
         """
-        Get a response from the LLM for the given user input.
+        tried: List[LLMBackend] = []
+        while True:
+            backend = self.router.select(conversation, exclude=tried)
+            tried.append(backend)
+            try:
+                async with self.router.track(backend):
+                    response = await self.http_pool.request("POST", backend.api_endpoint, json=payload)
+                    response.raise_for_status()
+                    self.router.record_success(backend)
+                    return response
+            except CONNECT_ERRORS:
+                if len(tried) >= len(self.router.backends):
+                    raise
+                logger.warning(f"Could not reach {backend.api_endpoint}, trying another backend")
+    
+    async def _backend_chunks(self, payload: Dict[str, Any], conversation: Optional[ConversationState],
+                              tried: List[LLMBackend]) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Stream a chat completions request from the selected backend.
+        
+        A request that cannot connect is sent to the next backend; once the
+        stream is open, errors are raised to the caller.
         
         Args:
-            user_input: User's text input
-            system_prompt: Optional system prompt to set context
-            add_to_history: Whether to add this exchange to conversation history
+            payload: Request payload
+            conversation: Conversation the request belongs to (for backend pinning)
+            tried: Backends to skip; each backend the request is sent to is appended
+            
+        Yields:
+            Parsed server-sent event chunks
+        """
+        while True:
+            backend = self.router.select(conversation, exclude=tried)
+            tried.append(backend)
+            start_time = time.perf_counter()
+            first_token = True
+            opened = False
+            try:
+                async with self.router.track(backend), \
+                        self.http_pool.stream("POST", backend.api_endpoint, json=payload) as response:
+                    response.raise_for_status()
+                    opened = True
+                    
+                    async for line in response.aiter_lines():
+                        # SSE: only "data:" lines carry chunks; the stream ends with [DONE]
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        
+                        chunk = json.loads(data)
+                        if first_token and has_content(chunk):
+                            first_token = False
+                            self.router.record_first_token(backend, time.perf_counter() - start_time)
+                        yield chunk
+                    return
+            except CONNECT_ERRORS:
+                if opened or len(tried) >= len(self.router.backends):
+                    raise
+                logger.warning(f"Could not reach {backend.api_endpoint}, trying another backend")
+    
+    async def _fallback_chunks(self, messages: List[Dict[str, str]],
+                               temperature: Optional[float]) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Stream the reply from the hedge fallback.
+        
+        Args:
+            messages: Chat messages to send
             temperature: Optional temperature override (0.0 to 1.0)
             
+        Yields:
+            Stream chunks of the fallback's reply as they arrive
+        """
+        chunks = self.hedge_fallback.stream_chunks(messages, temperature, self.max_tokens)
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            # Stops generation if the other request wins
+            await chunks.aclose()
+    
+    def _start_alternate(self, payload: Dict[str, Any], messages: List[Dict[str, str]],
+                         temperature: Optional[float], tried: List[LLMBackend]) -> Optional[StreamAttempt]:
+        """
+        Send a duplicate request to another backend, or to the fallback agent.
+        
+        Args:
+            payload: Request payload
+            messages: Chat messages of the payload
+            temperature: Optional temperature override (0.0 to 1.0)
+            tried: Backends the original request was sent to
+            
         Returns:
-            Dictionary containing the LLM response and metadata
+            The duplicate request, or None if there is nowhere to send it
         """
-        self.is_processing = True
-        start_time = logging.Formatter.converter()
+        if self.router.available(tried):
+            # Not pinned: the conversation only moves if the duplicate wins
+            alternate_tried = list(tried)
+            return StreamAttempt(self._backend_chunks(payload, None, alternate_tried), alternate_tried)
+        if self.hedge_fallback is not None:
+            return StreamAttempt(self._fallback_chunks(messages, temperature))
+        return None
+    
+    async def _hedged_chunks(self, payload: Dict[str, Any], messages: List[Dict[str, str]],
+                             temperature: Optional[float],
+                             conversation: Optional[ConversationState]) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Stream a request, hedging it if its first token is late.
+        
+        If the first token does not arrive within the hedging deadline, or
+        the request fails before it, a duplicate request is sent to another
+        backend (or the fallback agent). The first to produce a token is
+        streamed and the other one is cancelled.
         
+        Args:
+            payload: Request payload
+            messages: Chat messages of the payload
+            temperature: Optional temperature override (0.0 to 1.0)
+            conversation: Conversation the request belongs to (for backend pinning)
+            
+        Yields:
+            Parsed server-sent event chunks of the winning request
+        """
+        tried: List[LLMBackend] = []
+        primary = StreamAttempt(self._backend_chunks(payload, conversation, tried), tried)
+        attempts = [primary]
         try:
-            # Prepare messages
-            messages = []
+            winner = primary
+            if self.hedging is not None and self.hedging.enabled:
+                answered = await primary.wait_first_token(self.hedging.deadline(self.time_to_first_token))
+                if not answered or primary.failed:
+                    alternate = self._start_alternate(payload, messages, temperature, tried)
+                    if alternate is not None:
+                        attempts.append(alternate)
+                        if primary.failed:
+                            self.hedging.failovers += 1
+                            logger.warning("LLM request failed, sending it to an alternate backend")
+                        else:
+                            self.hedging.hedges += 1
+                            logger.info("No first LLM token before the hedging deadline, sending a duplicate request")
+                        winner = await StreamAttempt.first(attempts)
+            
+            for attempt in attempts:
+                if attempt is winner:
+                    continue
+                attempt.cancel()
+                # Losing the race without a token counts as slow for the breaker
+                if not attempt.first_token.is_set() and attempt.backend is not None:
+                    self.router.record_failure(attempt.backend, "lost hedged request")
+            if winner is not primary:
+                self.hedging.hedge_wins += 1
+                if conversation is not None and winner.backend is not None:
+                    conversation.backend = winner.backend.api_endpoint
+                    # The new backend has none of the conversation cached
+                    conversation.prompt_prefix = []
             
-            # Add system prompt if provided and not already in history
-            if system_prompt:
-                messages.append({
-                    "role": "system",
-                    "content": system_prompt
-                })
+            async for chunk in winner.chunks():
+                yield chunk
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+    
+    def _build_messages(self, user_input: str, system_prompt: Optional[str],
+                        add_to_history: bool,
+                        conversation: Optional[ConversationState]) -> Tuple[List[Dict[str, str]], List[Entry]]:
+        """
+        Assemble the message list for a request, updating history as needed.
+        
+        The layout is append-only so the server can reuse its cached prefix:
+        the system prompt, then the conversation's pinned system messages,
+        then the dialogue in order.
+        
+        Args:
+            user_input: User's text input
+            system_prompt: Optional system prompt to set context
+            add_to_history: Whether to add the user input to conversation history
+            conversation: Session conversation to include (None for no history)
             
+        Returns:
+            Tuple of the chat messages to send and the same messages as
+            (role, content, tokens) entries
+        """
+        entries: List[Entry] = []
+        
+        # Add system prompt if provided and not already in history
+        if system_prompt:
+            entries.append(("system", system_prompt, self.token_counter.count(system_prompt) + MESSAGE_TOKEN_OVERHEAD))
+        
+        if conversation is not None:
             # Add user input to history if it's not empty and add_to_history is True
             if user_input.strip() and add_to_history:
-                self.add_to_history("user", user_input)
+                conversation.add("user", user_input)
             
             # Add conversation history (which now includes the user input if add_to_history=True)
-            messages.extend(self.conversation_history)
-            
-            # Only add user input directly if not adding to history
-            # This ensures special cases (greetings/followups) work while preventing duplication for normal speech
-            if user_input.strip() and not add_to_history:
-                messages.append({
-                    "role": "user",
-                    "content": user_input
-                })
-            
-            # Prepare request payload with custom temperature if provided
-            payload = {
-                "model": self.model if self.model != "default" else None,
-                "messages": messages,
-                "temperature": temperature if temperature is not None else self.temperature,
-                "max_tokens": self.max_tokens
-            }
-            
-            # Remove None values
-            payload = {k: v for k, v in payload.items() if v is not None}
+            # Its token counts were computed once, when each message was added
+            entries.extend(conversation.entries())
+        
+        # Only add user input directly if not adding to history
+        # This ensures special cases (greetings/followups) work while preventing duplication for normal speech
+        if user_input.strip() and (conversation is None or not add_to_history):
+            entries.append(("user", user_input, self.token_counter.count(user_input) + MESSAGE_TOKEN_OVERHEAD))
+        
+        messages = [{"role": role, "content": content} for role, content, _ in entries]
+        logger.info(f"Prompt is ~{sum(tokens for _, _, tokens in entries)} tokens")
+        return messages, entries
+    
+    def _build_payload(self, messages: List[Dict[str, str]], temperature: Optional[float] = None,
+                       stream: bool = False, max_tokens: Optional[int] = None,
+                       cache_hints: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Build the chat completions request payload.
+        
+        Args:
+            messages: Chat messages to send
+            temperature: Optional temperature override (0.0 to 1.0)
+            stream: Whether to request a server-sent event stream
+            max_tokens: Optional override of the maximum tokens to generate
+            cache_hints: KV cache fields understood by the server (see PromptCache.hints)
             
-            # Log the full payload (truncated for readability)
-            payload_str = json.dumps(payload)
-            logger.info(f"Sending request to LLM API with {len(messages)} messages")
+        Returns:
+            Request payload
+        """
+        # Prepare request payload with custom temperature if provided
+        payload = {
+            "model": self.model if self.model != "default" else None,
+            "messages": messages,
+            "temperature": temperature if temperature is not None else self.temperature,
+            "max_tokens": max_tokens or self.max_tokens,
+            "stream": stream or None,
+            **(cache_hints or {})
+        }
+        
+        # Remove None values
+        payload = {k: v for k, v in payload.items() if v is not None}
+        
+        # Log the full payload (truncated for readability)
+        payload_str = json.dumps(payload)
+        logger.info(f"Sending request to LLM API with {len(messages)} messages")
+        
+        # Add more detailed logging to help debug message duplication
+        message_roles = [msg["role"] for msg in messages]
+        user_message_count = message_roles.count("user")
+        logger.info(f"Message roles: {message_roles}, user messages: {user_message_count}")
+        
+        if len(payload_str) > 500:
+            logger.debug(f"Payload (truncated): {payload_str[:500]}...")
+        else:
+            logger.debug(f"Payload: {payload_str}")
+        
+        return payload
+    
+    async def get_response(self, user_input: str, system_prompt: Optional[str] = None, 
+                           add_to_history: bool = True, temperature: Optional[float] = None,
+                           conversation: Optional[ConversationState] = None,
+                           max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Get a response from the LLM for the given user input.
+        
+        Args:
+            user_input: User's text input
+            system_prompt: Optional system prompt to set context
+            add_to_history: Whether to add this exchange to conversation history
+            temperature: Optional temperature override (0.0 to 1.0)
+            conversation: Session conversation to use and update (None for no history)
+            max_tokens: Optional override of the maximum tokens to generate
             
-            # Add more detailed logging to help debug message duplication
-            message_roles = [msg["role"] for msg in messages]
-            user_message_count = message_roles.count("user")
-            logger.info(f"Message roles: {message_roles}, user messages: {user_message_count}")
+        Returns:
+            Dictionary containing the LLM response and metadata
+        """
+        self.is_processing = True
+        start_time = time.perf_counter()
+        
+        try:
+            messages, entries = self._build_messages(user_input, system_prompt, add_to_history, conversation)
             
-            if len(payload_str) > 500:
-                logger.debug(f"Payload (truncated): {payload_str[:500]}...")
-            else:
-                logger.debug(f"Payload: {payload_str}")
+            # Only turns that extend the conversation keep its slot and prefix
+            cached_conversation = conversation if add_to_history else None
+            prefix = self.prompt_cache.fingerprint(entries)
+            cached_tokens = self.prompt_cache.measure(cached_conversation, prefix)
+            payload = self._build_payload(messages, temperature, max_tokens=max_tokens,
+                                          cache_hints=self.prompt_cache.hints(cached_conversation))
             
             # Send request to LLM API
-            response = requests.post(
-                self.api_endpoint,
-                json=payload,
-                timeout=self.timeout
-            )
-            
-            # Check if request was successful
-            response.raise_for_status()
+            response = await self._post(payload, conversation)
             
             # Parse response
             result = response.json()
@@ -160,12 +414,15 @@ class LLMClient:
             assistant_message = result.get("choices", [{}])[0].get("message", {}).get("content", "")
             
             # Add assistant response to history (only if we added the user input)
-            if assistant_message and add_to_history:
-                self.add_to_history("assistant", assistant_message)
+            if assistant_message and add_to_history and conversation is not None:
+                conversation.add("assistant", assistant_message)
+            
+            server_cached = server_cached_tokens(result)
+            self.prompt_cache.record(cached_conversation, prefix, self._reply_entry(assistant_message), server_cached)
             
             # Calculate processing time
-            end_time = logging.Formatter.converter()
-            processing_time = end_time[0] - start_time[0]
+            processing_time = time.perf_counter() - start_time
+            self.response_time.record(processing_time)
             
             logger.info(f"Received response from LLM API after {processing_time:.2f}s")
             
@@ -173,23 +430,26 @@ class LLMClient:
                 "text": assistant_message,
                 "processing_time": processing_time,
                 "finish_reason": result.get("choices", [{}])[0].get("finish_reason"),
-                "model": result.get("model", "unknown")
+                "model": result.get("model", "unknown"),
+                "prompt_tokens": sum(tokens for _, _, tokens in entries),
+                "cached_prompt_tokens": cached_tokens,
+                "server_cached_tokens": server_cached
             }
             
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"LLM API request error: {e}")
             error_response = f"I'm sorry, I encountered a problem connecting to my language model. {str(e)}"
             
             # Add the error to history if requested and clear history on 400 errors
             # to prevent the same error from happening repeatedly
-            if add_to_history:
-                self.add_to_history("assistant", error_response)
+            if add_to_history and conversation is not None:
+                conversation.add("assistant", error_response)
                 
                 # If we get a 400 Bad Request, the context might be corrupt
-                if isinstance(e, requests.exceptions.HTTPError) and e.response.status_code == 400:
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 400:
                     logger.warning("Received 400 error, clearing conversation history to recover")
                     # Keep only system prompt if it exists
-                    self.clear_history(keep_system_prompt=True)
+                    conversation.clear(keep_system_prompt=True)
             
             return {
                 "text": error_response,
@@ -198,7 +458,8 @@ class LLMClient:
         except Exception as e:
             logger.error(f"LLM processing error: {e}")
             error_response = "I'm sorry, I encountered an unexpected error. Please try again."
-            self.add_to_history("assistant", error_response)
+            if conversation is not None:
+                conversation.add("assistant", error_response)
             return {
                 "text": error_response,
                 "error": str(e)
@@ -206,17 +467,163 @@ class LLMClient:
         finally:
             self.is_processing = False
     
-    def clear_history(self, keep_system_prompt: bool = True) -> None:
+    async def stream_response(self, user_input: str, system_prompt: Optional[str] = None,
+                              add_to_history: bool = True,
+                              temperature: Optional[float] = None,
+                              conversation: Optional[ConversationState] = None) -> AsyncGenerator[Dict[str, Any], None]:
         """
-        Clear conversation history.
+        Stream a response from the LLM as it is generated.
+        
+        Requests a server-sent event stream and yields each content delta as
+        soon as it arrives. The last item is the complete response in the same
+        shape get_response returns, with "done" set and the time to first token.
         
         Args:
-            keep_system_prompt: Whether to keep the system prompt if it exists
+            user_input: User's text input
+            system_prompt: Optional system prompt to set context
+            add_to_history: Whether to add this exchange to conversation history
+            temperature: Optional temperature override (0.0 to 1.0)
+            conversation: Session conversation to use and update (None for no history)
+            
+        Yields:
+            {"delta": str} items, then the final response dictionary
         """
-        if keep_system_prompt and self.conversation_history and self.conversation_history[0]["role"] == "system":
-            self.conversation_history = [self.conversation_history[0]]
-        else:
-            self.conversation_history = []
+        self.is_processing = True
+        start_time = time.perf_counter()
+        first_token_time = None
+        parts: List[str] = []
+        finish_reason = None
+        model = "unknown"
+        server_cached = None
+        completed = False
+        
+        try:
+            messages, entries = self._build_messages(user_input, system_prompt, add_to_history, conversation)
+            
+            # Only turns that extend the conversation keep its slot and prefix
+            cached_conversation = conversation if add_to_history else None
+            prefix = self.prompt_cache.fingerprint(entries)
+            cached_tokens = self.prompt_cache.measure(cached_conversation, prefix)
+            payload = self._build_payload(messages, temperature, stream=True,
+                                          cache_hints=self.prompt_cache.hints(cached_conversation))
+            measured_backend = conversation.backend if conversation is not None else None
+            
+            async for chunk in self._hedged_chunks(payload, messages, temperature, conversation):
+                model = chunk.get("model", model)
+                if "usage" in chunk or "timings" in chunk:
+                    server_cached = server_cached_tokens(chunk)
+                choice = (chunk.get("choices") or [{}])[0]
+                finish_reason = choice.get("finish_reason") or finish_reason
+                delta = (choice.get("delta") or {}).get("content")
+                if not delta:
+                    continue
+                
+                if first_token_time is None:
+                    first_token_time = time.perf_counter() - start_time
+                    self.time_to_first_token.record(first_token_time)
+                    logger.info(f"First LLM token after {first_token_time:.2f}s")
+                parts.append(delta)
+                yield {"delta": delta}
+            
+            assistant_message = "".join(parts)
+            completed = True
+            
+            # A request that moved to another backend (failover or hedge) reused nothing
+            if cached_conversation is not None and conversation.backend != measured_backend:
+                self.prompt_cache.discard(cached_tokens)
+                cached_tokens = 0
+            
+            # Add assistant response to history (only if we added the user input)
+            if assistant_message and add_to_history and conversation is not None:
+                conversation.add("assistant", assistant_message)
+            
+            self.prompt_cache.record(cached_conversation, prefix, self._reply_entry(assistant_message), server_cached)
+            
+            processing_time = time.perf_counter() - start_time
+            self.response_time.record(processing_time)
+            logger.info(f"Received streamed response from LLM API after {processing_time:.2f}s")
+            
+            yield {
+                "text": assistant_message,
+                "done": True,
+                "processing_time": processing_time,
+                "time_to_first_token": first_token_time,
+                "finish_reason": finish_reason,
+                "model": model,
+                "prompt_tokens": sum(tokens for _, _, tokens in entries),
+                "cached_prompt_tokens": cached_tokens,
+                "server_cached_tokens": server_cached
+            }
+            
+        except (asyncio.CancelledError, GeneratorExit):
+            # Interrupted (barge-in) or closed early: leaving the stream closes the
+            # response, which stops generation on the server. Keep what was said so
+            # far so the history stays user/assistant alternating.
+            if not completed:
+                logger.info("LLM stream cancelled")
+                if parts and add_to_history and conversation is not None:
+                    conversation.add("assistant", "".join(parts))
+            raise
+        except httpx.HTTPError as e:
+            logger.error(f"LLM API streaming request error: {e}")
+            error_response = f"I'm sorry, I encountered a problem connecting to my language model. {str(e)}"
+            
+            # Add the error to history if requested and clear history on 400 errors
+            # to prevent the same error from happening repeatedly
+            if add_to_history and conversation is not None:
+                conversation.add("assistant", error_response)
+                
+                # If we get a 400 Bad Request, the context might be corrupt
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 400:
+                    logger.warning("Received 400 error, clearing conversation history to recover")
+                    # Keep only system prompt if it exists
+                    conversation.clear(keep_system_prompt=True)
+            
+            yield {
+                "text": error_response,
+                "done": True,
+                "error": str(e)
+            }
+        except Exception as e:
+            logger.error(f"LLM streaming error: {e}")
+            error_response = "I'm sorry, I encountered an unexpected error. Please try again."
+            if conversation is not None:
+                conversation.add("assistant", error_response)
+            yield {
+                "text": error_response,
+                "done": True,
+                "error": str(e)
+            }
+        finally:
+            self.is_processing = False
+    
+    def _reply_entry(self, assistant_message: str) -> Optional[Entry]:
+        """Build the (role, content, tokens) entry of a reply, for prefix tracking."""
+        if not assistant_message:
+            return None
+        return ("assistant", assistant_message, self.token_counter.count(assistant_message) + MESSAGE_TOKEN_OVERHEAD)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the streaming latency and prompt cache statistics.
+        
+        Returns:
+            Dict containing time to first token and total response time
+            summaries, prompt prefix reuse, per-backend and hedging statistics
+        """
+        return {
+            "time_to_first_token": self.time_to_first_token.summary(),
+            "response_time": self.response_time.summary(),
+            "prompt_cache": self.prompt_cache.get_stats(),
+            "routing": self.router.get_stats(),
+            "hedging": self.hedging.get_stats() if self.hedging else None
+        }
+    
+    async def close(self) -> None:
+        """Stop the health probes and close the connection pool if this client created it."""
+        await self.router.close()
+        if self._owns_pool:
+            await self.http_pool.close()
     
     def get_config(self) -> Dict[str, Any]:
         """
@@ -227,10 +634,10 @@ class LLMClient:
         """
         return {
             "api_endpoint": self.api_endpoint,
+            "api_endpoints": self.router.api_endpoints,
             "model": self.model,
             "temperature": self.temperature,
             "max_tokens": self.max_tokens,
             "timeout": self.timeout,
-            "is_processing": self.is_processing,
-            "history_length": len(self.conversation_history)
+            "is_processing": self.is_processing
         }
@@ -0,0 +1,347 @@
+"""
+LLM Router Service
+
+Spreads LLM requests over several OpenAI-compatible backends (e.g. a few
+llama.cpp servers). Each turn goes to the healthy backend with the fewest
+requests in flight, conversations stay on the backend that holds their KV
+cache, and background probes take unreachable backends out of rotation
+until they answer again. A circuit breaker per backend stops traffic to
+backends that keep failing or answering slowly.
+"""
+
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional, Sequence, AsyncIterator
+
+import httpx
+
+from .metrics import LatencyStats
+from .http_pool import HTTPConnectionPool
+from .session_store import ConversationState
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class NoBackendAvailable(httpx.HTTPError):
+    """Raised when every LLM backend is unhealthy or has its circuit breaker open."""
+
+def probe_url(api_endpoint: str) -> str:
+    """
+    Get the URL probed to check a backend's health.
+
+    Args:
+        api_endpoint: Chat completions URL of the backend
+
+    Returns:
+        The backend's models listing URL (served by llama.cpp, LM Studio and vLLM)
+    """
+    url = httpx.URL(api_endpoint)
+    path = url.path.rstrip("/")
+    if path.endswith("/chat/completions"):
+        path = path[:-len("/chat/completions")]
+    return str(url.copy_with(path=f"{path}/models", query=None))
+
+class LLMBackend:
+    """
+    One OpenAI-compatible LLM server, its circuit breaker and its request statistics.
+    """
+
+    def __init__(self, api_endpoint: str):
+        """
+        Initialize the backend.
+
+        Args:
+            api_endpoint: Chat completions URL of the server
+        """
+        self.api_endpoint = api_endpoint
+        self.healthy = True
+        self.in_flight = 0
+
+        # Circuit breaker
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial = False  # A half-open backend admits one request at a time
+
+        # Statistics
+        self.requests = 0
+        self.errors = 0
+        self.response_time = LatencyStats()
+        self.time_to_first_token = LatencyStats()
+        self.last_error: Optional[str] = None
+        self.breaker_trips = 0
+
+    def breaker_state(self, cooldown: float) -> str:
+        """
+        Get the circuit breaker state.
+
+        Args:
+            cooldown: Seconds an open breaker stays open
+
+        Returns:
+            "closed", "open", or "half_open" once the cooldown has passed
+        """
+        if self.opened_at is None:
+            return "closed"
+        return "open" if time.monotonic() - self.opened_at < cooldown else "half_open"
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the backend's statistics.
+
+        Returns:
+            Dict containing health, requests in flight, request and error
+            counts and latency summaries
+        """
+        return {
+            "api_endpoint": self.api_endpoint,
+            "healthy": self.healthy,
+            "breaker_open": self.opened_at is not None,
+            "breaker_trips": self.breaker_trips,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.errors / self.requests if self.requests else None,
+            "last_error": self.last_error,
+            "time_to_first_token": self.time_to_first_token.summary(),
+            "response_time": self.response_time.summary()
+        }
+
+class LLMRouter:
+    """
+    Least-outstanding-requests balancer over LLM backends.
+
+    select() keeps a conversation on the backend it was last served by
+    while that backend is healthy, since only that server has the
+    conversation's prompt cached. New conversations and one-off requests
+    go to the healthy backend with the fewest requests in flight. A
+    backend is marked unhealthy when it cannot be reached, and healthy
+    again once its probe succeeds; conversations pinned to it fail over
+    to another backend. With a single backend no probes are sent.
+
+    The circuit breaker opens after failure_threshold consecutive failures
+    (server or connection errors, or a first token later than slow_s).
+    An open backend gets no requests for cooldown seconds, then admits a
+    single trial request: success closes the breaker, failure reopens it.
+    """
+
+    def __init__(
+        self,
+        api_endpoints: Sequence[str],
+        http_pool: HTTPConnectionPool,
+        probe_interval: float = 10.0,
+        probe_timeout: float = 2.0,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        slow_s: float = 10.0
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            api_endpoints: Chat completions URLs of the backends
+            http_pool: Connection pool used for probes
+            probe_interval: Seconds between health probes (0 to disable)
+            probe_timeout: Seconds a backend has to answer a probe
+            failure_threshold: Consecutive failures that open a backend's circuit breaker
+            cooldown: Seconds an open breaker blocks traffic before a trial request
+            slow_s: First-token time counted as a failure (0 to ignore slowness)
+        """
+        if not api_endpoints:
+            raise ValueError("At least one LLM API endpoint is required")
+
+        self.backends = [LLMBackend(url) for url in dict.fromkeys(api_endpoints)]
+        self.http_pool = http_pool
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.slow_s = slow_s
+        self._by_endpoint = {backend.api_endpoint: backend for backend in self.backends}
+        self._probe_task: Optional[asyncio.Task] = None
+
+        # Statistics
+        self.failovers = 0
+
+        logger.info(f"Initialized LLM Router with {len(self.backends)} backend(s): "
+                   f"{', '.join(self._by_endpoint)}")
+
+    def available(self, exclude: Sequence[LLMBackend] = ()) -> List[LLMBackend]:
+        """
+        Get the backends that can take a request now.
+
+        Args:
+            exclude: Backends already tried for the request
+
+        Returns:
+            Healthy backends whose circuit breaker admits a request
+        """
+        usable = []
+        for backend in self.backends:
+            if backend in exclude or not backend.healthy:
+                continue
+            state = backend.breaker_state(self.cooldown)
+            if state == "closed" or (state == "half_open" and not backend.trial):
+                usable.append(backend)
+        return usable
+
+    def select(self, conversation: Optional[ConversationState] = None,
+               exclude: Sequence[LLMBackend] = ()) -> LLMBackend:
+        """
+        Choose the backend for a request.
+
+        Args:
+            conversation: Conversation the request belongs to (None for one-off requests)
+            exclude: Backends already tried for this request
+
+        Returns:
+            The backend to send the request to
+
+        Raises:
+            NoBackendAvailable: If no backend can take the request
+        """
+        candidates = self.available(exclude)
+        if not candidates:
+            raise NoBackendAvailable("No LLM backend is available")
+
+        pinned = self._by_endpoint.get(conversation.backend) if conversation is not None else None
+        backend = pinned if pinned in candidates else min(candidates, key=lambda b: b.in_flight)
+        if backend.opened_at is not None:
+            backend.trial = True
+            logger.info(f"Sending trial request to LLM backend {backend.api_endpoint}")
+
+        if conversation is not None and backend is not pinned:
+            if pinned is not None:
+                self.failovers += 1
+                logger.warning(f"Moving session {conversation.session_id} from {pinned.api_endpoint} "
+                              f"to {backend.api_endpoint}")
+                # The new backend has none of the conversation cached
+                conversation.prompt_prefix = []
+            conversation.backend = backend.api_endpoint
+        return backend
+
+    def record_success(self, backend: LLMBackend) -> None:
+        """
+        Record a successful request, closing the backend's circuit breaker.
+
+        Args:
+            backend: Backend that answered
+        """
+        backend.consecutive_failures = 0
+        if backend.opened_at is not None:
+            backend.opened_at = None
+            logger.info(f"Circuit breaker of LLM backend {backend.api_endpoint} closed")
+
+    def record_failure(self, backend: LLMBackend, reason: str) -> None:
+        """
+        Record a failed or slow request, opening the circuit breaker if needed.
+
+        Args:
+            backend: Backend that failed
+            reason: What went wrong, for the log
+        """
+        backend.consecutive_failures += 1
+        half_open = backend.opened_at is not None
+        if half_open or backend.consecutive_failures >= self.failure_threshold:
+            backend.opened_at = time.monotonic()
+            backend.breaker_trips += 1
+            logger.warning(f"Circuit breaker of LLM backend {backend.api_endpoint} opened for "
+                          f"{self.cooldown:.0f}s after {backend.consecutive_failures} failure(s): {reason}")
+
+    def record_first_token(self, backend: LLMBackend, seconds: float) -> None:
+        """
+        Record the first-token time of a streamed reply.
+
+        Args:
+            backend: Backend that streamed the reply
+            seconds: Time to the first token
+        """
+        backend.time_to_first_token.record(seconds)
+        if self.slow_s and seconds > self.slow_s:
+            self.record_failure(backend, f"first token after {seconds:.1f}s")
+        else:
+            self.record_success(backend)
+
+    @asynccontextmanager
+    async def track(self, backend: LLMBackend) -> AsyncIterator[LLMBackend]:
+        """
+        Count a request as in flight on a backend and record its outcome.
+
+        Connection failures mark the backend unhealthy; HTTP errors count
+        against its error rate, and server and connection errors against its
+        circuit breaker. Cancelled requests are not counted as errors.
+
+        Args:
+            backend: Backend the request is sent to
+
+        Yields:
+            The backend
+        """
+        backend.in_flight += 1
+        backend.requests += 1
+        start_time = time.perf_counter()
+        try:
+            yield backend
+        except httpx.HTTPError as e:
+            backend.errors += 1
+            backend.last_error = str(e) or type(e).__name__
+            if isinstance(e, httpx.TransportError) and backend.healthy and len(self.backends) > 1:
+                backend.healthy = False
+                logger.warning(f"LLM backend {backend.api_endpoint} marked unhealthy: {backend.last_error}")
+            if not isinstance(e, httpx.HTTPStatusError) or e.response.status_code >= 500:
+                self.record_failure(backend, backend.last_error)
+            raise
+        else:
+            backend.response_time.record(time.perf_counter() - start_time)
+        finally:
+            backend.in_flight -= 1
+            backend.trial = False
+
+    async def _probe(self, backend: LLMBackend) -> None:
+        """Check whether a backend answers and update its health."""
+        try:
+            response = await self.http_pool.client.get(probe_url(backend.api_endpoint), timeout=self.probe_timeout)
+            healthy = response.status_code < 500
+        except httpx.HTTPError:
+            healthy = False
+
+        if healthy != backend.healthy:
+            backend.healthy = healthy
+            logger.info(f"LLM backend {backend.api_endpoint} is {'healthy' if healthy else 'unhealthy'}")
+
+    async def _probe_loop(self) -> None:
+        """Probe all backends every probe_interval seconds."""
+        while True:
+            await asyncio.gather(*(self._probe(backend) for backend in self.backends))
+            await asyncio.sleep(self.probe_interval)
+
+    def start(self) -> None:
+        """Start the background health probes (only with more than one backend)."""
+        if self._probe_task is None and self.probe_interval > 0 and len(self.backends) > 1:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def close(self) -> None:
+        """Stop the health probes."""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            await asyncio.gather(self._probe_task, return_exceptions=True)
+            self._probe_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the routing statistics.
+
+        Returns:
+            Dict containing per-backend statistics and the number of session failovers
+        """
+        return {
+            "backends": [backend.get_stats() for backend in self.backends],
+            "failovers": self.failovers
+        }
+
+    @property
+    def api_endpoints(self) -> List[str]:
+        """Chat completions URLs of all backends."""
+        return list(self._by_endpoint)
@@ -0,0 +1,80 @@
+"""
+Metrics Utilities
+
+Lightweight rolling latency statistics shared by the backend services.
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+class LatencyStats:
+    """
+    Rolling window of latency samples with percentile summaries.
+
+    Thread-safe, since samples are recorded from worker threads as well as
+    the event loop.
+    """
+
+    def __init__(self, window: int = 500):
+        """
+        Initialize the latency statistics.
+
+        Args:
+            window: Number of most recent samples kept for percentiles
+        """
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds: float) -> None:
+        """
+        Record one latency sample.
+
+        Args:
+            seconds: Observed latency in seconds
+        """
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Latency percentile over the current window.
+
+        Args:
+            q: Percentile between 0 and 100
+
+        Returns:
+            Latency in seconds, or None if nothing was recorded yet
+        """
+        with self._lock:
+            if not self._samples:
+                return None
+            return float(np.percentile(self._samples, q))
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize the recorded latencies.
+
+        Returns:
+            Dict with count, mean, p50, p95 and p99 (in seconds)
+        """
+        with self._lock:
+            samples = np.array(self._samples)
+            count, total = self.count, self.total
+
+        if not len(samples):
+            return {"count": 0}
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        return {
+            "count": count,
+            "mean": total / count,
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99)
+        }
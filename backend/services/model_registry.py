@@ -0,0 +1,375 @@
+"""
+Whisper Model Registry Service
+
+Keeps one transcription worker pool per Whisper model size, loads extra
+sizes in the background, switches the active model without dropping live
+sessions, and evicts the least recently used models to stay within a
+memory budget.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from .transcription_executor import TranscriptionExecutor
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Approximate parameter counts per Whisper family, used for memory estimates
+MODEL_PARAMETERS = {
+    "tiny": 39e6,
+    "base": 74e6,
+    "small": 244e6,
+    "medium": 769e6,
+    "large": 1550e6
+}
+
+BYTES_PER_PARAMETER = {
+    "int8": 1,
+    "int8_float32": 1,
+    "int8_float16": 1,
+    "int8_bfloat16": 1,
+    "int16": 2,
+    "float16": 2,
+    "bfloat16": 2,
+    "float32": 4
+}
+
+def estimate_model_memory_mb(model_size: str, compute_type: str, workers: int = 1) -> float:
+    """
+    Estimate the resident memory of a transcription pool.
+
+    Args:
+        model_size: Whisper model size (e.g. tiny.en, small.en, large-v3)
+        compute_type: CTranslate2 compute type the weights are loaded as
+        workers: Number of model instances in the pool
+
+    Returns:
+        Estimated memory in megabytes (weights plus ~20% runtime overhead)
+    """
+    family = next((name for name in MODEL_PARAMETERS if name in model_size), "large")
+    weights = MODEL_PARAMETERS[family] * BYTES_PER_PARAMETER.get(compute_type, 4)
+    return weights * 1.2 * workers / 2**20
+
+class WhisperModelRegistry:
+    """
+    Registry of transcription pools, one per Whisper model size.
+
+    The active model serves sessions that did not ask for a specific tier.
+    Switching it is a single reference assignment: requests already running
+    keep the pool they started on. An evicted pool takes no new requests
+    and is shut down once those already submitted to it have finished.
+    Callers that decode repeatedly (e.g. a streaming session) go through
+    the registry for every decode instead of holding on to a pool.
+
+    Exposes the same transcription API as TranscriptionExecutor (plus an
+    optional model argument), so callers can use either.
+    """
+
+    def __init__(
+        self,
+        default_model: str,
+        tiers: Optional[List[str]] = None,
+        memory_budget_mb: float = 0,
+        load_fallback_model: Optional[str] = None,
+        load_fallback_queue_depth: int = 4,
+        **executor_options
+    ):
+        """
+        Initialize the model registry and load the default model.
+
+        Args:
+            default_model: Whisper model size that is active at startup
+            tiers: Model sizes sessions may request (the default model is always allowed)
+            memory_budget_mb: Estimated memory allowed for loaded models (0 for no limit)
+            load_fallback_model: Smaller model to route to while the requested one is backed up
+            load_fallback_queue_depth: Queue depth at which requests fall back
+            **executor_options: Arguments passed to every TranscriptionExecutor
+        """
+        self.tiers = list(dict.fromkeys([default_model] + list(tiers or [])))
+        if load_fallback_model and load_fallback_model not in self.tiers:
+            self.tiers.append(load_fallback_model)
+        self.memory_budget_mb = memory_budget_mb
+        self.load_fallback_model = load_fallback_model
+        self.load_fallback_queue_depth = load_fallback_queue_depth
+        self.executor_options = executor_options
+
+        # Loaded pools in least-recently-used order, and loads in progress
+        self._pools: "OrderedDict[str, TranscriptionExecutor]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Task] = {}
+        self._closing: List[asyncio.Task] = []
+
+        # Statistics
+        self.loads = 0
+        self.evictions = 0
+        self.swaps = 0
+        self.fallbacks = 0
+
+        self.active_model = default_model
+        self._add(default_model, self._create(default_model))
+
+        logger.info(f"Initialized Whisper Model Registry with active={default_model}, "
+                   f"tiers={self.tiers}, memory_budget_mb={memory_budget_mb or 'unlimited'}")
+
+    def _create(self, model_size: str) -> TranscriptionExecutor:
+        """Build a transcription pool for a model size (blocking)."""
+        start_time = time.time()
+        executor = TranscriptionExecutor(model_size=model_size, **self.executor_options)
+        self.loads += 1
+        logger.info(f"Loaded Whisper model {model_size} in {time.time() - start_time:.1f}s")
+        return executor
+
+    def _memory_mb(self, model_size: str, executor: TranscriptionExecutor) -> float:
+        """Estimated memory of a loaded pool."""
+        config = executor.get_config()
+        return estimate_model_memory_mb(model_size, config["compute_type"], config["workers"])
+
+    @property
+    def memory_mb(self) -> float:
+        """Estimated memory of all loaded pools."""
+        return sum(self._memory_mb(model_size, executor) for model_size, executor in self._pools.items())
+
+    def _add(self, model_size: str, executor: TranscriptionExecutor) -> None:
+        """
+        Register a loaded pool, evicting least recently used pools over the budget.
+
+        Args:
+            model_size: Whisper model size
+            executor: Loaded transcription pool
+        """
+        self._pools[model_size] = executor
+        self._enforce_budget(keep=model_size)
+
+    def _enforce_budget(self, keep: Optional[str] = None) -> None:
+        """
+        Evict least recently used pools until the estimate fits the memory budget.
+
+        The active model, the load fallback model and `keep` are never evicted.
+
+        Args:
+            keep: Model size that must stay loaded (e.g. one just loaded)
+        """
+        if not self.memory_budget_mb:
+            return
+
+        protected = {keep, self.active_model, self.load_fallback_model}
+        for candidate in list(self._pools):
+            if self.memory_mb <= self.memory_budget_mb:
+                break
+            if candidate not in protected:
+                self._evict(candidate)
+
+        if self.memory_mb > self.memory_budget_mb:
+            logger.warning(f"Loaded models use ~{self.memory_mb:.0f} MB, "
+                           f"over the {self.memory_budget_mb:.0f} MB budget")
+
+    def _evict(self, model_size: str) -> None:
+        """Remove a pool and shut it down once its in-flight requests finish."""
+        executor = self._pools.pop(model_size)
+        self.evictions += 1
+        logger.info(f"Evicting Whisper model {model_size} (least recently used)")
+        try:
+            self._closing = [task for task in self._closing if not task.done()]
+            self._closing.append(asyncio.get_running_loop().create_task(executor.close()))
+        except RuntimeError:
+            executor.shutdown()
+
+    async def load(self, model_size: str) -> TranscriptionExecutor:
+        """
+        Load a model size in the background if it is not loaded yet.
+
+        Args:
+            model_size: Whisper model size
+
+        Returns:
+            The loaded transcription pool
+        """
+        if model_size in self._pools:
+            return self._pools[model_size]
+        if model_size not in self.tiers:
+            raise ValueError(f"Model {model_size} is not an allowed tier ({', '.join(self.tiers)})")
+
+        # Concurrent requests for the same model share one load
+        task = self._loading.get(model_size)
+        if task is None:
+            task = asyncio.create_task(asyncio.to_thread(self._create, model_size))
+            self._loading[model_size] = task
+            try:
+                executor = await task
+            finally:
+                del self._loading[model_size]
+            self._add(model_size, executor)
+            return executor
+        return await task
+
+    def request(self, model_size: str) -> bool:
+        """
+        Start loading a model size without waiting for it.
+
+        Args:
+            model_size: Whisper model size
+
+        Returns:
+            True if the model is already loaded
+        """
+        if model_size in self._pools:
+            return True
+        if model_size in self.tiers and model_size not in self._loading:
+            task = asyncio.create_task(self.load(model_size))
+            task.add_done_callback(self._log_load_failure)
+        return False
+
+    @staticmethod
+    def _log_load_failure(task: asyncio.Task) -> None:
+        """Log errors from background loads that nobody awaits."""
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Failed to load Whisper model: {task.exception()}")
+
+    async def activate(self, model_size: str) -> None:
+        """
+        Load a model size if needed and make it the active model.
+
+        Args:
+            model_size: Whisper model size
+        """
+        await self.load(model_size)
+        if model_size != self.active_model:
+            previous, self.active_model = self.active_model, model_size
+            self.swaps += 1
+            logger.info(f"Switched active Whisper model from {previous} to {model_size}")
+            # The previous model is no longer protected from eviction
+            self._enforce_budget()
+
+    def get(self, model_size: Optional[str] = None) -> TranscriptionExecutor:
+        """
+        Pick the pool to serve a request.
+
+        Uses the requested model if it is loaded (starting a background load
+        if it is not) and otherwise the active model. While the chosen pool
+        is backed up, requests go to the load fallback model instead.
+
+        Args:
+            model_size: Requested model size, if None the active model is used
+
+        Returns:
+            Transcription pool to run the request on
+        """
+        chosen = self.active_model
+        if model_size and model_size != chosen and self.request(model_size):
+            chosen = model_size
+
+        fallback = self.load_fallback_model
+        if (fallback and fallback != chosen and fallback in self._pools and
+                self._pools[chosen].queue_depth >= self.load_fallback_queue_depth):
+            self.fallbacks += 1
+            chosen = fallback
+
+        self._pools.move_to_end(chosen)
+        return self._pools[chosen]
+
+    @property
+    def is_processing(self) -> bool:
+        """Whether any loaded model is currently transcribing."""
+        return any(executor.is_processing for executor in self._pools.values())
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting on the active model."""
+        return self._pools[self.active_model].queue_depth
+
+    def transcribe(self, audio: np.ndarray, profile: Optional[str] = None,
+                   model: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Transcribe audio synchronously on the calling thread.
+
+        Args:
+            audio: Audio data as numpy array
+            profile: Decoding profile name, if None the default profile is used
+            model: Requested model size, if None the active model is used
+
+        Returns:
+            Tuple of transcribed text and metadata
+        """
+        return self.get(model).transcribe(audio, profile)
+
+    async def transcribe_async(self, audio: np.ndarray, profile: Optional[str] = None,
+                               model: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Transcribe audio on the chosen model's worker pool.
+
+        Args:
+            audio: Audio data as numpy array
+            profile: Decoding profile name, if None the default profile is used
+            model: Requested model size, if None the active model is used
+
+        Returns:
+            Tuple of transcribed text and metadata
+        """
+        executor = self.get(model)
+        text, metadata = await executor.transcribe_async(audio, profile)
+        metadata["model"] = executor.model_size
+        return text, metadata
+
+    async def transcribe_segments_async(self, audio: np.ndarray, profile: Optional[str] = None,
+                                        model: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Decode 16 kHz float32 audio into timestamped segments on the chosen model's pool.
+
+        Args:
+            audio: Float32 audio samples at 16 kHz
+            profile: Decoding profile name, if None the default profile is used
+            model: Requested model size, if None the active model is used
+
+        Returns:
+            Tuple of segment list and metadata
+        """
+        executor = self.get(model)
+        segments, metadata = await executor.transcribe_segments_async(audio, profile)
+        metadata["model"] = executor.model_size
+        return segments, metadata
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the registry and per-model pool statistics.
+
+        Returns:
+            Dict containing the active model, memory use and each pool's stats
+        """
+        return {
+            "active_model": self.active_model,
+            "tiers": self.tiers,
+            "loading": list(self._loading),
+            "memory_mb": round(self.memory_mb),
+            "memory_budget_mb": self.memory_budget_mb,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "swaps": self.swaps,
+            "fallbacks": self.fallbacks,
+            "models": {model_size: executor.get_stats() for model_size, executor in self._pools.items()}
+        }
+
+    def get_config(self) -> Dict[str, Any]:
+        """
+        Get the current configuration.
+
+        Returns:
+            Dict containing the active model's configuration and registry stats
+        """
+        config = self._pools[self.active_model].get_config()
+        config["registry"] = self.get_stats()
+        return config
+
+    async def close(self) -> None:
+        """Shut down every loaded model and wait for pending evictions."""
+        for task in list(self._loading.values()):
+            task.cancel()
+        pools = list(self._pools.values())
+        self._pools.clear()
+        await asyncio.gather(*(executor.close() for executor in pools), *self._closing,
+                             return_exceptions=True)
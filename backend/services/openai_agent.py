@@ -2,27 +2,41 @@
 OpenAI Agent Service
 
 Handles communication with OpenAI's Agent SDK for speech-to-speech capabilities.
+All requests go through the async client, so they never block the event
+loop: chat replies and speech are streamed as they are generated, and
+utterances are uploaded for transcription straight from memory.
 """
 
-import os
-import json
-import logging
-import base64
+import time
 import asyncio
+import logging
 from typing import Dict, Any, List, Optional, AsyncGenerator
-from openai import OpenAI
-from openai.types.chat import ChatCompletion
+
+import httpx
+from openai import AsyncOpenAI, APIError, APIStatusError
+
+from .metrics import LatencyStats
+from .session_store import ConversationState
+from .audio_processing import WavStreamSplitter, wav_header
+from .tts import AudioChunk
+from .tts_cache import TTSCache, cache_key
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Raw PCM returned by the speech API for response_format="pcm"
+SPEECH_PCM_SAMPLE_RATE = 24000
+SPEECH_PCM_HEADER = wav_header(SPEECH_PCM_SAMPLE_RATE, 1, 16)
+
 class OpenAIAgent:
     """
     Client for communicating with OpenAI's Agent SDK.
     
     This class handles speech-to-speech interactions using OpenAI's
-    native audio capabilities and agent functionality.
+    native audio capabilities and agent functionality. It works with any
+    OpenAI-compatible server given its base_url, and can share the
+    keep-alive connections of an HTTPConnectionPool's client.
     """
     
     def __init__(
@@ -31,7 +45,13 @@ class OpenAIAgent:
         model: str = "gpt-4o",
         temperature: float = 0.7,
         max_tokens: int = 2048,
-        timeout: int = 60
+        timeout: int = 60,
+        tts_cache: Optional[TTSCache] = None,
+        base_url: Optional[str] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        tts_voice: str = "alloy",
+        tts_model: str = "tts-1",
+        stream_chunk_ms: float = 250.0
     ):
         """
         Initialize the OpenAI Agent client.
@@ -42,48 +62,112 @@ class OpenAIAgent:
             temperature: Sampling temperature (0.0 to 1.0)
             max_tokens: Maximum tokens to generate
             timeout: Request timeout in seconds
+            tts_cache: Cache of synthesized audio for repeated texts, if any
+            base_url: API base URL (None for OpenAI, or e.g. http://localhost:8000/v1)
+            http_client: Shared HTTP client to send requests with (None to create one)
+            tts_voice: Default voice (alloy, echo, fable, onyx, nova, shimmer)
+            tts_model: Default TTS model (tts-1, tts-1-hd)
+            stream_chunk_ms: Audio per piece of streamed speech in milliseconds
         """
         self.api_key = api_key
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.timeout = timeout
+        self.tts_cache = tts_cache
+        self.base_url = base_url
+        self.tts_voice = tts_voice
+        self.tts_model = tts_model
+        self.stream_chunk_ms = stream_chunk_ms
         
-        # Initialize OpenAI client
-        self.client = OpenAI(api_key=api_key)
+        # Initialize OpenAI client (closing it closes its HTTP client, so only close our own)
+        self._owns_http_client = http_client is None
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout, http_client=http_client)
         
-        # State tracking
+        # State tracking (conversation history is kept per session, see SessionStore)
         self.is_processing = False
-        self.conversation_history = []
         
-        logger.info(f"Initialized OpenAI Agent with model={model}")
+        # Statistics
+        self.time_to_first_token = LatencyStats()
+        self.response_time = LatencyStats()
+        self.speech_first_byte = LatencyStats()
+        self.transcription_time = LatencyStats()
+        
+        logger.info(f"Initialized OpenAI Agent with model={model}, base_url={base_url or 'default'}")
     
-    def add_to_history(self, role: str, content: str) -> None:
+    def _build_messages(self, user_input: str, system_prompt: Optional[str], add_to_history: bool,
+                        conversation: Optional[ConversationState]) -> List[Dict[str, str]]:
         """
-        Add a message to the conversation history.
+        Build the message list of a request, adding the user input to the conversation if requested.
         
         Args:
-            role: Message role ('system', 'user', or 'assistant')
-            content: Message content
+            user_input: User's text input
+            system_prompt: Optional system prompt to set context
+            add_to_history: Whether to add this exchange to conversation history
+            conversation: Session conversation to use and update (None for no history)
+        
+        Returns:
+            Chat messages to send
         """
-        self.conversation_history.append({
-            "role": role,
-            "content": content
-        })
-        
-        # Allow deeper history for models with large context windows
-        if len(self.conversation_history) > 50:
-            # Always keep the system message if it exists
-            if self.conversation_history[0]["role"] == "system":
-                self.conversation_history = (
-                    [self.conversation_history[0]] + 
-                    self.conversation_history[-49:]
-                )
-            else:
-                self.conversation_history = self.conversation_history[-50:]
+        messages = []
+        
+        # Add system prompt if provided and not already in history
+        if system_prompt:
+            messages.append({
+                "role": "system",
+                "content": system_prompt
+            })
+        
+        if conversation is not None:
+            # Add user input to history if it's not empty and add_to_history is True
+            if user_input.strip() and add_to_history:
+                conversation.add("user", user_input)
+            
+            # Add conversation history (which now includes the user input if add_to_history=True)
+            messages.extend(conversation.messages())
+        
+        # Only add user input directly if not adding to history
+        if user_input.strip() and (conversation is None or not add_to_history):
+            messages.append({
+                "role": "user",
+                "content": user_input
+            })
+        
+        return messages
     
-    def get_response(self, user_input: str, system_prompt: Optional[str] = None, 
-                    add_to_history: bool = True, temperature: Optional[float] = None) -> Dict[str, Any]:
+    def _error_response(self, e: Exception, add_to_history: bool,
+                        conversation: Optional[ConversationState]) -> Dict[str, Any]:
+        """
+        Build the reply spoken when a request fails, adding it to the conversation if requested.
+        
+        Args:
+            e: The request error
+            add_to_history: Whether this exchange is added to conversation history
+            conversation: Session conversation of the request
+        
+        Returns:
+            Dictionary containing the error message and the error
+        """
+        error_response = f"I'm sorry, I encountered a problem connecting to OpenAI. {str(e)}"
+        
+        # Add the error to history if requested and clear history on 400 errors
+        # to prevent the same error from happening repeatedly
+        if add_to_history and conversation is not None:
+            conversation.add("assistant", error_response)
+            
+            # If we get a 400 Bad Request, the context might be corrupt
+            if isinstance(e, APIStatusError) and e.status_code == 400:
+                logger.warning("Received 400 error, clearing conversation history to recover")
+                conversation.clear(keep_system_prompt=True)
+        
+        return {
+            "text": error_response,
+            "error": str(e)
+        }
+    
+    async def get_response(self, user_input: str, system_prompt: Optional[str] = None,
+                           add_to_history: bool = True, temperature: Optional[float] = None,
+                           conversation: Optional[ConversationState] = None) -> Dict[str, Any]:
         """
         Get a response from the OpenAI model for the given user input.
         
@@ -92,152 +176,335 @@ class OpenAIAgent:
             system_prompt: Optional system prompt to set context
             add_to_history: Whether to add this exchange to conversation history
             temperature: Optional temperature override (0.0 to 1.0)
-            
+            conversation: Session conversation to use and update (None for no history)
+        
         Returns:
             Dictionary containing the OpenAI response and metadata
         """
         self.is_processing = True
+        start_time = time.perf_counter()
         
         try:
-            # Prepare messages
-            messages = []
-            
-            # Add system prompt if provided and not already in history
-            if system_prompt:
-                messages.append({
-                    "role": "system",
-                    "content": system_prompt
-                })
-            
-            # Add user input to history if it's not empty and add_to_history is True
-            if user_input.strip() and add_to_history:
-                self.add_to_history("user", user_input)
-            
-            # Add conversation history (which now includes the user input if add_to_history=True)
-            messages.extend(self.conversation_history)
-            
-            # Only add user input directly if not adding to history
-            if user_input.strip() and not add_to_history:
-                messages.append({
-                    "role": "user",
-                    "content": user_input
-                })
+            messages = self._build_messages(user_input, system_prompt, add_to_history, conversation)
             
             # Call OpenAI API
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature if temperature is not None else self.temperature,
-                max_tokens=self.max_tokens
-            )
+            result = await self.complete(messages, temperature)
             
             # Extract assistant response
-            assistant_message = response.choices[0].message.content
+            assistant_message = result["text"]
             
             # Add assistant response to history (only if we added the user input)
-            if assistant_message and add_to_history:
-                self.add_to_history("assistant", assistant_message)
+            if assistant_message and add_to_history and conversation is not None:
+                conversation.add("assistant", assistant_message)
             
-            logger.info(f"Received response from OpenAI API")
+            processing_time = time.perf_counter() - start_time
+            self.response_time.record(processing_time)
+            logger.info(f"Received response from OpenAI API after {processing_time:.2f}s")
             
             return {
+                **result,
                 "text": assistant_message,
-                "processing_time": None,  # OpenAI doesn't provide this directly
-                "finish_reason": response.choices[0].finish_reason,
-                "model": response.model
+                "processing_time": processing_time
             }
-            
+        
         except Exception as e:
             logger.error(f"OpenAI API request error: {e}")
-            error_response = f"I'm sorry, I encountered a problem connecting to OpenAI. {str(e)}"
+            return self._error_response(e, add_to_history, conversation)
+        finally:
+            self.is_processing = False
+    
+    async def complete(self, messages: List[Dict[str, str]], temperature: Optional[float] = None,
+                       max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Get a chat completion for a prepared message list.
+        
+        Does not touch any conversation history.
+        
+        Args:
+            messages: Chat messages to send
+            temperature: Optional temperature override (0.0 to 1.0)
+            max_tokens: Optional override of the maximum tokens to generate
+        
+        Returns:
+            Dictionary containing the text, finish reason, model and prompt tokens
+        """
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature if temperature is not None else self.temperature,
+            max_tokens=max_tokens or self.max_tokens
+        )
+        
+        return {
+            "text": response.choices[0].message.content,
+            "finish_reason": response.choices[0].finish_reason,
+            "model": response.model,
+            "prompt_tokens": response.usage.prompt_tokens if response.usage else None
+        }
+    
+    async def stream_chunks(self, messages: List[Dict[str, str]], temperature: Optional[float] = None,
+                            max_tokens: Optional[int] = None) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Stream a chat completion for a prepared message list.
+        
+        Does not touch any conversation history, so the local LLM client can
+        use it to hedge slow requests. Closing the generator closes the
+        response, which stops generation.
+        
+        Args:
+            messages: Chat messages to send
+            temperature: Optional temperature override (0.0 to 1.0)
+            max_tokens: Optional override of the maximum tokens to generate
+        
+        Yields:
+            Stream chunks as dictionaries, in the server-sent event format
+        """
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature if temperature is not None else self.temperature,
+            max_tokens=max_tokens or self.max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        try:
+            async for chunk in stream:
+                yield chunk.model_dump(exclude_none=True)
+        finally:
+            await stream.close()
+    
+    async def stream_response(self, user_input: str, system_prompt: Optional[str] = None,
+                              add_to_history: bool = True,
+                              temperature: Optional[float] = None,
+                              conversation: Optional[ConversationState] = None) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Stream a response from the OpenAI model as it is generated.
+        
+        Yields items in the same shape as LLMClient.stream_response: each
+        content delta as soon as it arrives, then the complete response with
+        "done" set and the time to first token.
+        
+        Args:
+            user_input: User's text input
+            system_prompt: Optional system prompt to set context
+            add_to_history: Whether to add this exchange to conversation history
+            temperature: Optional temperature override (0.0 to 1.0)
+            conversation: Session conversation to use and update (None for no history)
+        
+        Yields:
+            {"delta": str} items, then the final response dictionary
+        """
+        self.is_processing = True
+        start_time = time.perf_counter()
+        first_token_time = None
+        parts: List[str] = []
+        finish_reason = None
+        model = self.model
+        prompt_tokens = None
+        completed = False
+        
+        try:
+            messages = self._build_messages(user_input, system_prompt, add_to_history, conversation)
+            
+            async for chunk in self.stream_chunks(messages, temperature):
+                model = chunk.get("model", model)
+                if chunk.get("usage"):
+                    prompt_tokens = chunk["usage"].get("prompt_tokens")
+                choice = (chunk.get("choices") or [{}])[0]
+                finish_reason = choice.get("finish_reason") or finish_reason
+                delta = (choice.get("delta") or {}).get("content")
+                if not delta:
+                    continue
+                
+                if first_token_time is None:
+                    first_token_time = time.perf_counter() - start_time
+                    self.time_to_first_token.record(first_token_time)
+                    logger.info(f"First OpenAI token after {first_token_time:.2f}s")
+                parts.append(delta)
+                yield {"delta": delta}
             
-            # Add the error to history if requested
-            if add_to_history:
-                self.add_to_history("assistant", error_response)
+            assistant_message = "".join(parts)
+            completed = True
             
-            return {
-                "text": error_response,
-                "error": str(e)
+            # Add assistant response to history (only if we added the user input)
+            if assistant_message and add_to_history and conversation is not None:
+                conversation.add("assistant", assistant_message)
+            
+            processing_time = time.perf_counter() - start_time
+            self.response_time.record(processing_time)
+            logger.info(f"Received streamed response from OpenAI API after {processing_time:.2f}s")
+            
+            yield {
+                "text": assistant_message,
+                "done": True,
+                "processing_time": processing_time,
+                "time_to_first_token": first_token_time,
+                "finish_reason": finish_reason,
+                "model": model,
+                "prompt_tokens": prompt_tokens
             }
+        
+        except (asyncio.CancelledError, GeneratorExit):
+            # Interrupted (barge-in) or closed early: keep what was said so far so the
+            # history stays user/assistant alternating
+            if not completed:
+                logger.info("OpenAI stream cancelled")
+                if parts and add_to_history and conversation is not None:
+                    conversation.add("assistant", "".join(parts))
+            raise
+        except Exception as e:
+            logger.error(f"OpenAI API streaming request error: {e}")
+            yield {"done": True, **self._error_response(e, add_to_history, conversation)}
         finally:
             self.is_processing = False
     
-    async def text_to_speech(self, text: str, voice: str = "alloy", model: str = "tts-1") -> bytes:
+    async def stream_speech(self, text: str, voice: Optional[str] = None, model: Optional[str] = None,
+                            response_format: str = "mp3") -> AsyncGenerator[bytes, None]:
         """
-        Convert text to speech using OpenAI's TTS API.
+        Stream speech from OpenAI's TTS API as it is synthesized.
+        
+        Cached audio is yielded whole without a request; streamed audio is
+        cached once it is complete.
         
         Args:
             text: Text to convert to speech
-            voice: Voice to use (alloy, echo, fable, onyx, nova, shimmer)
-            model: TTS model to use (tts-1, tts-1-hd)
-            
-        Returns:
-            bytes: Audio data in MP3 format
+            voice: Voice to use (defaults to tts_voice)
+            model: TTS model to use (defaults to tts_model)
+            response_format: Audio format (mp3, opus, aac, flac, wav or pcm)
+        
+        Yields:
+            Chunks of audio data
         """
+        voice = voice or self.tts_voice
+        model = model or self.tts_model
+        
+        key = None
+        if self.tts_cache is not None and self.tts_cache.cacheable(text):
+            key = cache_key(text, voice, model, 1.0, response_format)
+            audio_data = self.tts_cache.get(key)
+            if audio_data is not None:
+                logger.info(f"Using cached TTS audio for {len(text)} characters")
+                yield audio_data
+                return
+        
+        start_time = time.perf_counter()
+        complete = bytearray() if key is not None else None  # Audio to cache
         try:
-            response = self.client.audio.speech.create(
+            async with self.client.audio.speech.with_streaming_response.create(
                 model=model,
                 voice=voice,
-                input=text
-            )
-            
-            # Get the audio data as bytes
-            audio_data = response.content
-            
-            logger.info(f"Generated TTS audio for {len(text)} characters")
-            return audio_data
-            
-        except Exception as e:
+                input=text,
+                response_format=response_format
+            ) as response:
+                first_byte = True
+                async for chunk in response.iter_bytes():
+                    if not chunk:
+                        continue
+                    if first_byte:
+                        first_byte = False
+                        self.speech_first_byte.record(time.perf_counter() - start_time)
+                    if complete is not None:
+                        complete += chunk
+                    yield chunk
+        except APIError as e:
             logger.error(f"OpenAI TTS error: {e}")
-            raise e
+            raise
+        
+        logger.info(f"Generated TTS audio for {len(text)} characters after {time.perf_counter() - start_time:.2f}s")
+        if complete is not None:
+            self.tts_cache.put(key, bytes(complete))
+    
+    async def text_to_speech(self, text: str, voice: Optional[str] = None, model: Optional[str] = None) -> bytes:
+        """
+        Convert text to speech using OpenAI's TTS API.
+        
+        Args:
+            text: Text to convert to speech
+            voice: Voice to use (defaults to tts_voice)
+            model: TTS model to use (defaults to tts_model)
+        
+        Returns:
+            bytes: Audio data in MP3 format
+        """
+        return b"".join([chunk async for chunk in self.stream_speech(text, voice, model)])
+    
+    async def stream_audio(self, text: str) -> AsyncGenerator[AudioChunk, None]:
+        """
+        Stream speech as pieces the client can play as soon as each arrives.
+        
+        Requests raw PCM, the lowest latency format, and splits it into
+        pieces of stream_chunk_ms like TTSClient.stream_audio does with
+        WAV, with a WAV header on the first piece. With stream_chunk_ms of
+        0 the speech is sent as one piece once it is complete.
+        
+        Args:
+            text: Text to convert to speech
+        
+        Yields:
+            Audio pieces in playback order
+        """
+        if self.stream_chunk_ms <= 0:
+            pcm = b"".join([data async for data in self.stream_speech(text, response_format="pcm")])
+            yield AudioChunk(pcm, "pcm", SPEECH_PCM_HEADER)
+            return
+        
+        splitter = WavStreamSplitter(self.stream_chunk_ms)
+        splitter.feed(SPEECH_PCM_HEADER)
+        header_sent = False
+        async for data in self.stream_speech(text, response_format="pcm"):
+            for piece in splitter.feed(data):
+                yield AudioChunk(piece, "pcm", None if header_sent else splitter.header)
+                header_sent = True
+        for piece in splitter.flush():
+            yield AudioChunk(piece, "pcm", None if header_sent else splitter.header)
+            header_sent = True
     
     async def speech_to_text(self, audio_data: bytes, model: str = "whisper-1") -> str:
         """
         Convert speech to text using OpenAI's Whisper API.
         
         Args:
-            audio_data: Audio data bytes
+            audio_data: WAV audio data bytes
             model: Whisper model to use
-            
+        
         Returns:
             str: Transcribed text
         """
+        start_time = time.perf_counter()
         try:
-            # Save audio data to a temporary file for OpenAI API
-            import tempfile
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                temp_file.write(audio_data)
-                temp_file.flush()
-                
-                # Transcribe using OpenAI Whisper
-                with open(temp_file.name, "rb") as audio_file:
-                    transcript = self.client.audio.transcriptions.create(
-                        model=model,
-                        file=audio_file,
-                        response_format="text"
-                    )
-                
-                # Clean up temp file
-                os.unlink(temp_file.name)
+            # Upload from memory; the file name tells the API the audio format
+            transcript = await self.client.audio.transcriptions.create(
+                model=model,
+                file=("audio.wav", audio_data, "audio/wav"),
+                response_format="text"
+            )
             
+            self.transcription_time.record(time.perf_counter() - start_time)
             logger.info(f"Transcribed audio to text: {len(transcript)} characters")
             return transcript
-            
+        
         except Exception as e:
             logger.error(f"OpenAI speech-to-text error: {e}")
             raise e
     
-    def clear_history(self, keep_system_prompt: bool = True) -> None:
+    def get_stats(self) -> Dict[str, Any]:
         """
-        Clear conversation history.
+        Get the request latency statistics.
         
-        Args:
-            keep_system_prompt: Whether to keep the system prompt if it exists
+        Returns:
+            Dict containing time to first token, response, first speech byte and transcription summaries
         """
-        if keep_system_prompt and self.conversation_history and self.conversation_history[0]["role"] == "system":
-            self.conversation_history = [self.conversation_history[0]]
-        else:
-            self.conversation_history = []
+        return {
+            "time_to_first_token": self.time_to_first_token.summary(),
+            "response_time": self.response_time.summary(),
+            "speech_first_byte": self.speech_first_byte.summary(),
+            "transcription_time": self.transcription_time.summary()
+        }
+    
+    async def close(self) -> None:
+        """Close the HTTP client if this agent created it."""
+        if self._owns_http_client:
+            await self.client.close()
     
     def get_config(self) -> Dict[str, Any]:
         """
@@ -248,9 +515,11 @@ class OpenAIAgent:
         """
         return {
             "model": self.model,
+            "base_url": self.base_url,
             "temperature": self.temperature,
             "max_tokens": self.max_tokens,
             "timeout": self.timeout,
-            "is_processing": self.is_processing,
-            "history_length": len(self.conversation_history)
+            "tts_voice": self.tts_voice,
+            "tts_model": self.tts_model,
+            "is_processing": self.is_processing
         }
@@ -0,0 +1,237 @@
+"""
+Opus Transcoder Service
+
+Re-encodes streamed TTS audio as Opus for clients on slow or metered
+connections. WAV from the TTS server is several hundred KB per sentence;
+the same speech in Opus at voice bitrates is a few percent of that. Each
+stream is piped through an ffmpeg process as it arrives and the Ogg or
+WebM pages ffmpeg writes are forwarded as soon as they are flushed, so
+audio is never buffered whole and encoding overlaps synthesis.
+"""
+
+import time
+import shutil
+import asyncio
+import logging
+import subprocess
+from typing import Dict, Any, List, Optional, Sequence, AsyncGenerator
+
+import ffmpeg
+
+from .metrics import LatencyStats
+from .tts import AudioChunk
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Audio format name sent to clients -> ffmpeg muxer
+OPUS_FORMATS = {
+    "opus": "ogg",
+    "webm": "webm"
+}
+
+# Bytes read from ffmpeg's output at a time
+READ_SIZE = 64 * 1024
+
+def ffmpeg_has_libopus(ffmpeg_cmd: str = "ffmpeg") -> bool:
+    """
+    Check whether ffmpeg is installed with the libopus encoder.
+
+    Args:
+        ffmpeg_cmd: ffmpeg executable
+
+    Returns:
+        True if Opus encoding is available
+    """
+    if shutil.which(ffmpeg_cmd) is None:
+        return False
+    try:
+        result = subprocess.run([ffmpeg_cmd, "-hide_banner", "-encoders"],
+                                capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return "libopus" in result.stdout
+
+class OpusTranscoder:
+    """
+    Streaming WAV-to-Opus encoder shared by all connections.
+
+    transcode() wraps a TTSClient.stream_audio() stream: the WAV header
+    and PCM pieces (or a whole WAV file) are written to ffmpeg's stdin as
+    they arrive while its Ogg/WebM output is read back in pages of about
+    page_ms. The pieces it yields are parts of one encoded stream, with
+    stream_end set on the last, since a client can only decode the
+    stream from its beginning. Audio that is not WAV is passed through.
+    """
+
+    def __init__(
+        self,
+        bitrate: str = "24k",
+        preferred_format: str = "opus",
+        page_ms: float = 250.0,
+        ffmpeg_cmd: str = "ffmpeg"
+    ):
+        """
+        Initialize the transcoder.
+
+        Args:
+            bitrate: Opus bitrate (e.g. 24k; 16k-32k suits speech)
+            preferred_format: Container used when a client can decode both ("opus" for Ogg, or "webm")
+            page_ms: Longest audio ffmpeg holds back before flushing a page
+            ffmpeg_cmd: ffmpeg executable
+        """
+        if preferred_format not in OPUS_FORMATS:
+            raise ValueError(f"Unknown Opus container {preferred_format!r}, expected one of {list(OPUS_FORMATS)}")
+
+        self.bitrate = bitrate
+        self.preferred_format = preferred_format
+        self.page_ms = page_ms
+        self.ffmpeg_cmd = ffmpeg_cmd
+
+        # Statistics
+        self.streams = 0
+        self.failures = 0
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.time_to_first_page = LatencyStats()  # First input byte to first output byte
+        self.flush_latency = LatencyStats()  # End of input to end of output
+
+        logger.info(f"Initialized Opus Transcoder with bitrate={bitrate}, preferred format={preferred_format}")
+
+    def choose_format(self, client_formats: Sequence[str]) -> Optional[str]:
+        """
+        Choose the Opus container for a client.
+
+        Args:
+            client_formats: Audio formats the client can decode
+
+        Returns:
+            The preferred container the client supports, the other one, or None
+        """
+        candidates = [self.preferred_format] + [f for f in OPUS_FORMATS if f != self.preferred_format]
+        for audio_format in candidates:
+            if audio_format in client_formats:
+                return audio_format
+        return None
+
+    def _command(self, audio_format: str) -> List[str]:
+        """Build the ffmpeg command line encoding WAV on stdin to audio_format on stdout."""
+        muxer = OPUS_FORMATS[audio_format]
+        if muxer == "ogg":
+            muxer_options = {"page_duration": int(self.page_ms * 1000)}
+        else:
+            muxer_options = {"cluster_time_limit": int(self.page_ms), "live": 1}
+
+        # Without probing limits ffmpeg reads megabytes of input before it starts encoding
+        stream = ffmpeg.input("pipe:", format="wav", probesize=32, analyzeduration=0).output(
+            "pipe:",
+            format=muxer,
+            acodec="libopus",
+            audio_bitrate=self.bitrate,
+            application="voip",
+            frame_duration=20,
+            flush_packets=1,
+            **muxer_options
+        )
+        return stream.global_args("-hide_banner", "-loglevel", "error").compile(cmd=self.ffmpeg_cmd)
+
+    async def transcode(self, audio: AsyncGenerator[AudioChunk, None], audio_format: str) -> AsyncGenerator[AudioChunk, None]:
+        """
+        Encode a stream of speech as Opus while it is being synthesized.
+
+        Args:
+            audio: Pieces from TTSClient.stream_audio (or a whole WAV file)
+            audio_format: Container to encode to ("opus" or "webm")
+
+        Yields:
+            Parts of the encoded stream, the last with stream_end=True
+            (or the input unchanged if it is not WAV)
+        """
+        first = await anext(audio, None)
+        if first is None:
+            return
+        if first.format not in ("pcm", "wav"):
+            yield first
+            async for piece in audio:
+                yield piece
+            return
+
+        self.streams += 1
+        process = await asyncio.create_subprocess_exec(
+            *self._command(audio_format),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        start_time = time.perf_counter()
+        input_end: Optional[float] = None
+        written = 0
+
+        async def write_input():
+            nonlocal input_end, written
+            try:
+                piece: Optional[AudioChunk] = first
+                while piece is not None:
+                    data = (piece.header or b"") + piece.data
+                    process.stdin.write(data)
+                    await process.stdin.drain()
+                    written += len(data)
+                    piece = await anext(audio, None)
+            finally:
+                input_end = time.perf_counter()
+                process.stdin.close()
+
+        writer = asyncio.create_task(write_input())
+        pending: Optional[bytes] = None  # Held back one read so the last part can be marked
+        read = 0
+        try:
+            while True:
+                data = await process.stdout.read(READ_SIZE)
+                if not data:
+                    break
+                if read == 0:
+                    self.time_to_first_page.record(time.perf_counter() - start_time)
+                read += len(data)
+                if pending is not None:
+                    yield AudioChunk(pending, audio_format, stream_end=False)
+                pending = data
+
+            await writer  # Re-raises errors of the input stream
+            returncode = await process.wait()
+            if returncode != 0 or pending is None:
+                error = (await process.stderr.read()).decode("utf-8", "replace").strip()
+                raise RuntimeError(f"ffmpeg exited with code {returncode}: {error or 'no output'}")
+
+            self.flush_latency.record(time.perf_counter() - input_end)
+            self.input_bytes += written
+            self.output_bytes += read
+            yield AudioChunk(pending, audio_format, stream_end=True)
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            # Stop synthesis and encoding if the client stopped reading (e.g. on interrupt)
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+            await audio.aclose()
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the transcoding statistics.
+
+        Returns:
+            Dict containing stream counts, compression ratio and encoding latencies
+        """
+        return {
+            "streams": self.streams,
+            "failures": self.failures,
+            "input_bytes": self.input_bytes,
+            "output_bytes": self.output_bytes,
+            "compression_ratio": self.input_bytes / self.output_bytes if self.output_bytes else None,
+            "time_to_first_page": self.time_to_first_page.summary(),
+            "flush_latency": self.flush_latency.summary()
+        }
@@ -0,0 +1,172 @@
+"""
+Prompt Cache Service
+
+Helps local LLM servers (llama.cpp, LM Studio) reuse their KV cache across
+turns. Servers skip evaluating the part of a prompt that matches the
+previous one, so prompts are kept append-only: the system prompt and
+pinned system messages come first and each turn only adds messages at the
+end. This module adds the cache hints those servers understand and
+measures how much of each prompt is an unchanged prefix.
+"""
+
+import zlib
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+from .context_window import Entry
+from .session_store import ConversationState
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# (message fingerprint, tokens)
+PrefixEntry = Tuple[int, int]
+
+def server_cached_tokens(data: Dict[str, Any]) -> Optional[int]:
+    """
+    Read the number of cached prompt tokens a server reported, if any.
+
+    Args:
+        data: Response body or final stream chunk
+
+    Returns:
+        Cached prompt tokens (OpenAI-style usage details or llama.cpp timings), or None
+    """
+    details = (data.get("usage") or {}).get("prompt_tokens_details") or {}
+    if details.get("cached_tokens") is not None:
+        return details["cached_tokens"]
+    timings = data.get("timings") or {}
+    return timings.get("cache_n")
+
+class PromptCache:
+    """
+    KV cache hints and prefix reuse tracking for conversation prompts.
+
+    Each conversation remembers the fingerprints of its last prompt plus
+    the reply generated for it, which is what the server has cached. The
+    next prompt's reused tokens are those of its leading messages that
+    match. With slots configured, every conversation is pinned to one
+    llama.cpp slot so other sessions do not overwrite its cache.
+    """
+
+    def __init__(self, cache_prompt: bool = True, slots: int = 0):
+        """
+        Initialize the prompt cache tracker.
+
+        Args:
+            cache_prompt: Whether to ask the server to reuse its cached prefix
+            slots: Server slots to spread conversations over (0 to let the server choose)
+        """
+        self.cache_prompt = cache_prompt
+        self.slots = slots
+
+        # Statistics
+        self.prompts = 0
+        self.reused_tokens = 0
+        self.prompt_tokens = 0
+        self.server_cached_tokens = 0
+
+        logger.info(f"Initialized Prompt Cache with cache_prompt={cache_prompt}, slots={slots or 'server default'}")
+
+    def hints(self, conversation: Optional[ConversationState]) -> Dict[str, Any]:
+        """
+        Get the cache hints to add to a request payload.
+
+        Args:
+            conversation: Conversation the request belongs to (None for one-off requests)
+
+        Returns:
+            Payload fields (cache_prompt, and id_slot for conversations)
+        """
+        hints: Dict[str, Any] = {}
+        if self.cache_prompt:
+            hints["cache_prompt"] = True
+            # One-off requests (greetings, summaries) use whichever slot is free
+            if self.slots and conversation is not None:
+                hints["id_slot"] = zlib.crc32(conversation.session_id.encode()) % self.slots
+        return hints
+
+    @staticmethod
+    def fingerprint(entries: List[Entry]) -> List[PrefixEntry]:
+        """
+        Fingerprint prompt messages for prefix comparison.
+
+        Args:
+            entries: Prompt messages as (role, content, tokens)
+
+        Returns:
+            List of (fingerprint, tokens)
+        """
+        return [(hash((role, content)), tokens) for role, content, tokens in entries]
+
+    def measure(self, conversation: Optional[ConversationState], prefix: List[PrefixEntry]) -> int:
+        """
+        Count the prompt tokens the server can take from its cache.
+
+        Args:
+            conversation: Conversation the prompt belongs to
+            prefix: Fingerprint of the prompt being sent
+
+        Returns:
+            Tokens of the leading messages unchanged since the previous turn
+        """
+        if conversation is None:
+            return 0
+
+        reused = 0
+        for previous, current in zip(conversation.prompt_prefix, prefix):
+            if previous != current:
+                break
+            reused += current[1]
+
+        total = sum(tokens for _, tokens in prefix)
+        self.prompts += 1
+        self.reused_tokens += reused
+        self.prompt_tokens += total
+        logger.info(f"Prompt prefix reuse: ~{reused}/{total} tokens")
+        return reused
+
+    def discard(self, reused: int) -> None:
+        """
+        Take back reuse counted by measure() for a prompt that was sent to a
+        different server than the one holding its prefix.
+
+        Args:
+            reused: Tokens measure() returned for the prompt
+        """
+        self.reused_tokens -= reused
+
+    def record(self, conversation: Optional[ConversationState], prefix: List[PrefixEntry],
+               reply: Optional[Entry] = None, server_cached: Optional[int] = None) -> None:
+        """
+        Remember what the server has cached after a turn.
+
+        Args:
+            conversation: Conversation the prompt belongs to
+            prefix: Fingerprint of the prompt that was sent
+            reply: The generated reply as (role, content, tokens), if any
+            server_cached: Cached prompt tokens reported by the server, if any
+        """
+        if server_cached is not None:
+            self.server_cached_tokens += server_cached
+        if conversation is None:
+            return
+        conversation.prompt_prefix = prefix + self.fingerprint([reply]) if reply else prefix
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the prefix reuse statistics.
+
+        Returns:
+            Dict containing prompt counts, reused and total prompt tokens and the reuse ratio
+        """
+        return {
+            "prompts": self.prompts,
+            "reused_tokens": self.reused_tokens,
+            "prompt_tokens": self.prompt_tokens,
+            "reuse_ratio": self.reused_tokens / self.prompt_tokens if self.prompt_tokens else None,
+            "server_cached_tokens": self.server_cached_tokens,
+            "cache_prompt": self.cache_prompt,
+            "slots": self.slots
+        }
@@ -0,0 +1,219 @@
+"""
+Session Store Service
+
+Keeps each connection's conversation history separate, so the shared LLM
+clients stay stateless and one backend process can serve many concurrent
+calls. Idle sessions expire and the least recently used ones are evicted
+to stay within a memory cap.
+"""
+
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from .context_window import ContextWindow, TokenCounter
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Approximate per-message overhead (tuple plus string headers) for the memory estimate
+MESSAGE_OVERHEAD_BYTES = 150
+
+class ConversationState(ContextWindow):
+    """
+    Conversation history of one session.
+
+    A token-budgeted ContextWindow (messages are stored as compact tuples
+    with interned role strings and cached token counts) that also tracks
+    when the session was last active and which LLM server has cached what
+    of its last prompt.
+    """
+
+    __slots__ = ("session_id", "last_active", "prompt_prefix", "backend")
+
+    def __init__(self, session_id: str, counter: Optional[TokenCounter] = None, token_budget: int = 6000):
+        """
+        Initialize an empty conversation.
+
+        Args:
+            session_id: Session the conversation belongs to
+            counter: Token counter shared by all sessions
+            token_budget: Maximum tokens for the history
+        """
+        super().__init__(counter, token_budget)
+        self.session_id = session_id
+        self.last_active = time.monotonic()
+        self.prompt_prefix: List[Tuple[int, int]] = []  # Fingerprints of the last prompt, see PromptCache
+        self.backend: Optional[str] = None  # LLM backend holding that prompt, see LLMRouter
+
+    @property
+    def size_bytes(self) -> int:
+        """Approximate memory used by the conversation."""
+        return self._content_bytes + MESSAGE_OVERHEAD_BYTES * len(self)
+
+    def touch(self) -> None:
+        """Mark the conversation as active now."""
+        self.last_active = time.monotonic()
+
+    def recent(self, count: int) -> "ConversationState":
+        """
+        Detached copy of the latest messages, keeping the system messages.
+
+        Args:
+            count: Number of dialogue messages to keep
+
+        Returns:
+            New conversation that does not affect this one
+        """
+        copy = ConversationState(self.session_id, self.counter, self.token_budget)
+        self.copy_recent(copy, count)
+        return copy
+
+class SessionStore:
+    """
+    Session-scoped conversation states.
+
+    Sessions are kept in least-recently-used order. Sessions idle for longer
+    than the TTL are dropped, and the least recently used sessions are
+    evicted while the total estimated size is over the memory cap. A client
+    that reconnects with its session ID within the TTL resumes its
+    conversation.
+    """
+
+    def __init__(
+        self,
+        idle_ttl_s: float = 1800.0,
+        memory_cap_mb: float = 256.0,
+        token_budget: int = 6000,
+        token_counter: Optional[TokenCounter] = None
+    ):
+        """
+        Initialize the session store.
+
+        Args:
+            idle_ttl_s: Seconds of inactivity after which a session is dropped
+            memory_cap_mb: Estimated memory allowed for all conversations (0 for no limit)
+            token_budget: Maximum history tokens per conversation
+            token_counter: Token counter shared by all conversations (heuristic if None)
+        """
+        self.idle_ttl_s = idle_ttl_s
+        self.memory_cap_bytes = int(memory_cap_mb * 2**20)
+        self.token_budget = token_budget
+        self.token_counter = token_counter or TokenCounter()
+        self._sessions: "OrderedDict[str, ConversationState]" = OrderedDict()
+
+        # Statistics
+        self.created = 0
+        self.resumed = 0
+        self.expired = 0
+        self.evicted = 0
+
+        logger.info(f"Initialized Session Store with idle_ttl_s={idle_ttl_s}, "
+                   f"memory_cap_mb={memory_cap_mb or 'unlimited'}, token_budget={token_budget}, "
+                   f"tokenizer={self.token_counter.name}")
+
+    @staticmethod
+    def new_session_id() -> str:
+        """Generate a new session ID."""
+        return uuid.uuid4().hex
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def get(self, session_id: str) -> ConversationState:
+        """
+        Get a session's conversation, creating it if needed, and mark it active.
+
+        Args:
+            session_id: Session ID
+
+        Returns:
+            The session's conversation state
+        """
+        self.evict(keep=session_id)
+
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = ConversationState(session_id, self.token_counter, self.token_budget)
+            self._sessions[session_id] = state
+            self.created += 1
+        else:
+            self._sessions.move_to_end(session_id)
+        state.touch()
+        return state
+
+    def resume(self, session_id: str) -> bool:
+        """
+        Check whether a session can be resumed, counting it if so.
+
+        Args:
+            session_id: Session ID sent by a reconnecting client
+
+        Returns:
+            True if the session still exists
+        """
+        self.evict()
+        if session_id in self._sessions:
+            self.resumed += 1
+            return True
+        return False
+
+    def discard(self, session_id: str) -> None:
+        """
+        Drop a session.
+
+        Args:
+            session_id: Session ID
+        """
+        self._sessions.pop(session_id, None)
+
+    @property
+    def size_bytes(self) -> int:
+        """Approximate memory used by all conversations."""
+        return sum(state.size_bytes for state in self._sessions.values())
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """
+        Drop idle sessions, then least recently used ones over the memory cap.
+
+        Args:
+            keep: Session that is about to be used and must not be evicted for memory
+        """
+        now = time.monotonic()
+        while self._sessions:
+            session_id, state = next(iter(self._sessions.items()))
+            if now - state.last_active <= self.idle_ttl_s:
+                break
+            del self._sessions[session_id]
+            self.expired += 1
+
+        if self.memory_cap_bytes:
+            size = self.size_bytes
+            for session_id in list(self._sessions):
+                if size <= self.memory_cap_bytes:
+                    break
+                if session_id == keep:
+                    continue
+                size -= self._sessions.pop(session_id).size_bytes
+                self.evicted += 1
+                logger.warning(f"Evicted conversation {session_id} to stay within the session memory cap")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the current store statistics.
+
+        Returns:
+            Dict containing session counts, memory use and eviction counters
+        """
+        return {
+            "sessions": len(self._sessions),
+            "size_bytes": self.size_bytes,
+            "memory_cap_bytes": self.memory_cap_bytes,
+            "created": self.created,
+            "resumed": self.resumed,
+            "expired": self.expired,
+            "evicted": self.evicted
+        }
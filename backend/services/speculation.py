@@ -0,0 +1,236 @@
+"""
+Speculation Service
+
+Starts the LLM reply before an utterance has been finalized. When a
+streamed utterance has gone quiet and its partial transcript has stopped
+changing, the reply is requested from the partial transcript while the
+client is still waiting out its silence timeout and the final decode runs.
+If the final transcript matches, the reply is already underway; otherwise
+the speculative request is cancelled and the turn starts over as usual.
+"""
+
+import re
+import time
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, AsyncGenerator
+
+from .llm import LLMClient
+from .metrics import LatencyStats
+from .session_store import ConversationState
+from .streaming_transcription import StreamingSession
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[^\w\s]")
+
+def normalize_transcript(text: str) -> str:
+    """Lowercase a transcript and drop punctuation, so decodes differing only in those match."""
+    return " ".join(_NON_WORD.sub("", text.lower()).split())
+
+class SpeculativeResponse:
+    """
+    An LLM reply started from a partial transcript.
+
+    The request runs against a detached copy of the conversation and its
+    events are buffered until the turn claims them, so nothing reaches the
+    client or the session history unless the speculation is used.
+    """
+
+    def __init__(self, llm_client: LLMClient, transcript: str, system_prompt: str,
+                 conversation: ConversationState):
+        """
+        Start the speculative request.
+
+        Args:
+            llm_client: LLM client to stream the reply from
+            transcript: Partial transcript used as the user input
+            system_prompt: System prompt of the session
+            conversation: Session conversation (not modified)
+        """
+        self.transcript = transcript
+        self.normalized = normalize_transcript(transcript)
+        self.started_at = time.perf_counter()
+        self.parts: List[str] = []
+        self.response: Optional[Dict[str, Any]] = None
+
+        # The session history must not change while the speculation is pending
+        self._generation = conversation.generation
+        self._length = len(conversation)
+
+        self.context = conversation.recent(len(conversation))
+        self.context.prompt_prefix = conversation.prompt_prefix
+        self.context.backend = conversation.backend
+        self._events: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(llm_client, system_prompt))
+
+    async def _run(self, llm_client: LLMClient, system_prompt: str) -> None:
+        """Stream the reply into the event buffer."""
+        async for event in llm_client.stream_response(self.transcript, system_prompt, conversation=self.context):
+            if "delta" in event:
+                self.parts.append(event["delta"])
+            else:
+                self.response = event
+            self._events.put_nowait(event)
+
+    def matches(self, transcript: str, conversation: ConversationState) -> bool:
+        """
+        Check whether the speculation answers a transcript.
+
+        Args:
+            transcript: Final (or newer partial) transcript
+            conversation: Session conversation
+
+        Returns:
+            True if the transcripts match and the history is unchanged
+        """
+        return (normalize_transcript(transcript) == self.normalized
+                and conversation.generation == self._generation
+                and len(conversation) == self._length)
+
+    async def events(self) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Yield the reply's events, starting with those already buffered.
+
+        Yields:
+            {"delta": str} items, then the final response dictionary
+        """
+        while True:
+            event = await self._events.get()
+            yield event
+            if event.get("done"):
+                return
+
+    def commit(self, conversation: ConversationState) -> None:
+        """
+        Add the exchange to the session history.
+
+        A reply that was cut short (e.g. by an interrupt) is added as far as
+        it was generated.
+
+        Args:
+            conversation: Session conversation
+        """
+        text = self.response["text"] if self.response else "".join(self.parts)
+        conversation.add("user", self.transcript)
+        if text:
+            conversation.add("assistant", text)
+        conversation.prompt_prefix = self.context.prompt_prefix
+        conversation.backend = self.context.backend
+
+    def cancel(self) -> None:
+        """Cancel the request, closing its stream to the LLM server."""
+        self._task.cancel()
+
+class Speculator:
+    """
+    Decides when to start speculative replies and tracks how they pay off.
+
+    A speculation starts once a streamed utterance has been quiet for
+    silence_ms and its partial transcript has not changed for stable_ms.
+    It is used if the final transcript matches and wasted if the partial
+    changes again, the final transcript differs, or the utterance is
+    abandoned.
+    """
+
+    def __init__(self, llm_client: LLMClient, stable_ms: float = 300.0, silence_ms: float = 250.0):
+        """
+        Initialize the speculator.
+
+        Args:
+            llm_client: LLM client used for speculative replies
+            stable_ms: How long the partial transcript must be unchanged
+            silence_ms: How long the utterance must have been quiet
+        """
+        self.llm_client = llm_client
+        self.stable_ms = stable_ms
+        self.silence_ms = silence_ms
+
+        # Statistics
+        self.started = 0
+        self.used = 0
+        self.wasted = 0
+        self.head_start = LatencyStats()
+
+        logger.info(f"Initialized Speculator with stable_ms={stable_ms}, silence_ms={silence_ms}")
+
+    def should_start(self, session: StreamingSession) -> bool:
+        """
+        Check whether an utterance looks finished enough to start its reply.
+
+        Args:
+            session: Streaming session of the utterance
+
+        Returns:
+            True if the partial transcript is stable and the audio has gone quiet
+        """
+        return (bool(session.partial_text.strip())
+                and session.partial_stable_ms >= self.stable_ms
+                and session.trailing_silence_ms >= self.silence_ms)
+
+    def start(self, transcript: str, system_prompt: str, conversation: ConversationState) -> SpeculativeResponse:
+        """
+        Start a speculative reply.
+
+        Args:
+            transcript: Partial transcript
+            system_prompt: System prompt of the session
+            conversation: Session conversation
+
+        Returns:
+            The pending speculative reply
+        """
+        self.started += 1
+        logger.info(f"Starting speculative reply to: {transcript[:50]}")
+        return SpeculativeResponse(self.llm_client, transcript, system_prompt, conversation)
+
+    def claim(self, speculation: SpeculativeResponse, transcript: str,
+              conversation: ConversationState) -> bool:
+        """
+        Use a speculation for the final transcript, or cancel it if it does not match.
+
+        Args:
+            speculation: Pending speculative reply
+            transcript: Final transcript
+            conversation: Session conversation
+
+        Returns:
+            True if the speculation answers the final transcript
+        """
+        if speculation.matches(transcript, conversation):
+            self.used += 1
+            head_start = time.perf_counter() - speculation.started_at
+            self.head_start.record(head_start)
+            logger.info(f"Using speculative reply started {head_start:.2f}s before the final transcript")
+            return True
+
+        self.discard(speculation)
+        return False
+
+    def discard(self, speculation: SpeculativeResponse) -> None:
+        """
+        Cancel a speculation that will not be used.
+
+        Args:
+            speculation: Pending speculative reply
+        """
+        speculation.cancel()
+        self.wasted += 1
+        logger.info("Discarded speculative reply")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the speculation statistics.
+
+        Returns:
+            Dict containing started, used and wasted counts and how far ahead used replies started
+        """
+        return {
+            "started": self.started,
+            "used": self.used,
+            "wasted": self.wasted,
+            "hit_rate": self.used / self.started if self.started else None,
+            "head_start": self.head_start.summary()
+        }
@@ -0,0 +1,307 @@
+"""
+Speech Pipeline Service
+
+Splits a streaming LLM reply into sentences and synthesizes each one as soon
+as it is complete, so the first audio plays after one sentence of generation
+and the first piece of its synthesis instead of after the whole reply.
+"""
+
+import re
+import time
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Callable, Awaitable, AsyncIterator
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SENTENCE_END = ".!?"
+CLAUSE_END = ",;:"
+CLOSING = "\"')]}”’"
+OPENING = "\"'([{“‘"
+
+# Words whose trailing period does not end a sentence
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "vs", "etc", "approx",
+    "inc", "ltd", "co", "corp", "dept", "est", "fig", "min", "max", "ave", "blvd",
+    "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec"
+}
+
+# Dotted initialisms such as "e.g", "i.e" or "U.S" (the final period is checked separately)
+INITIALISM = re.compile(r"^(?:[a-z]\.)+[a-z]$", re.IGNORECASE)
+
+class SentenceSplitter:
+    """
+    Incremental splitter for streamed text.
+
+    Text is split after sentence punctuation followed by whitespace, unless
+    the period belongs to an abbreviation, an initial or a list number
+    (decimals such as "3.14" never split because no whitespace follows the
+    period). Long sentences are also split at clause punctuation, and text
+    without any punctuation is cut at a word boundary once it gets too long.
+    A boundary is only decided once the character after it has arrived.
+    """
+
+    def __init__(self, clause_chars: int = 80, max_chars: int = 250):
+        """
+        Initialize the sentence splitter.
+
+        Args:
+            clause_chars: Minimum chunk length before splitting at , ; or :
+            max_chars: Chunk length at which text is cut at the last space
+        """
+        self.clause_chars = clause_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+        self._scan = 0
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Add streamed text and return the chunks it completed.
+
+        Args:
+            text: Next piece of the reply
+
+        Returns:
+            Complete chunks, in order (possibly empty)
+        """
+        self._buffer += text
+        chunks = []
+        while True:
+            end = self._find_boundary()
+            if end is None:
+                break
+            chunk = self._buffer[:end].strip()
+            self._buffer = self._buffer[end:]
+            self._scan = 0
+            if chunk:
+                chunks.append(chunk)
+        return chunks
+
+    def flush(self) -> List[str]:
+        """
+        Return whatever text is left once the reply is complete.
+
+        Returns:
+            The remaining chunk, if any
+        """
+        chunk = self._buffer.strip()
+        self._buffer = ""
+        self._scan = 0
+        return [chunk] if chunk else []
+
+    def _find_boundary(self) -> Optional[int]:
+        """
+        Find the end of the first complete chunk in the buffer.
+
+        Returns:
+            Index just past the chunk, or None if no chunk is complete yet
+        """
+        text = self._buffer
+        i = self._scan
+        while i < len(text):
+            char = text[i]
+            if char == "\n" and text[:i].strip():
+                return i + 1
+
+            if char in SENTENCE_END or char in CLAUSE_END:
+                # Include runs like "?!" or "..." and closing quotes or brackets
+                end = i + 1
+                while end < len(text) and (text[end] in CLOSING or text[end] in SENTENCE_END):
+                    end += 1
+                if end == len(text):
+                    # Undecided until the next character arrives
+                    break
+                if text[end].isspace() and self._is_boundary(text, i):
+                    return end
+                i = end
+                continue
+            i += 1
+
+        # Resume from the first undecided character on the next feed
+        self._scan = i
+
+        if len(text) > self.max_chars:
+            cut = text.rfind(" ", 0, self.max_chars)
+            return cut if cut > 0 else self.max_chars
+        return None
+
+    def _is_boundary(self, text: str, i: int) -> bool:
+        """
+        Check whether punctuation followed by whitespace ends a chunk.
+
+        Args:
+            text: Buffered text
+            i: Index of the punctuation mark
+
+        Returns:
+            True if the chunk should end here
+        """
+        if text[i] in CLAUSE_END:
+            return len(text[:i].strip()) >= self.clause_chars
+        if text[i] != ".":
+            return True
+
+        before = text[:i].rstrip(".")
+        words = before.split()
+        if not words:
+            return False
+        token = words[-1].lstrip(OPENING)
+
+        if token.lower() in ABBREVIATIONS or INITIALISM.match(token):
+            return False
+        # Initials like "J. R. R." (but "I." ends sentences)
+        if len(token) == 1 and token.isupper() and token != "I":
+            return False
+        # List markers like "1." at the start of a chunk
+        if token.isdigit() and len(words) == 1:
+            return False
+        return True
+
+class SpeechPipeline:
+    """
+    Streams reply text through TTS one chunk at a time.
+
+    Chunks are synthesized concurrently (at most max_parallel at once) as
+    soon as the splitter completes them, and their audio is emitted strictly
+    in reply order. The synthesizer streams each chunk's audio in pieces;
+    the pieces of the chunk being played are emitted as they arrive, while
+    those of later chunks are buffered until it is their turn. Feed text
+    with feed(), call finish() when the reply is complete, and run drain()
+    to receive the audio.
+    """
+
+    def __init__(
+        self,
+        synthesize: Callable[[str], AsyncIterator[Any]],
+        max_parallel: int = 2,
+        splitter: Optional[SentenceSplitter] = None
+    ):
+        """
+        Initialize the speech pipeline.
+
+        Args:
+            synthesize: Function streaming the audio pieces of one chunk of text
+            max_parallel: Maximum number of chunks synthesized at once
+            splitter: Sentence splitter to use (a default one if None)
+        """
+        self.synthesize = synthesize
+        self.splitter = splitter or SentenceSplitter()
+        self._semaphore = asyncio.Semaphore(max(1, max_parallel))
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._finished = False
+        self._cancelled = False
+
+        # Statistics
+        self.start_time = time.perf_counter()
+        self.time_to_first_audio: Optional[float] = None
+        self.time_to_last_audio: Optional[float] = None
+        self.chunks = 0
+        self.emitted = 0
+        self.errors: List[str] = []
+
+    def feed(self, text: str) -> None:
+        """
+        Add streamed reply text, starting synthesis of any completed chunks.
+
+        Args:
+            text: Next piece of the reply
+        """
+        if self._finished:
+            return
+        for chunk in self.splitter.feed(text):
+            self._schedule(chunk)
+
+    def finish(self) -> None:
+        """Mark the reply as complete and synthesize the remaining text."""
+        if self._finished:
+            return
+        for chunk in self.splitter.flush():
+            self._schedule(chunk)
+        self._finished = True
+        self._queue.put_nowait(None)
+
+    def cancel(self) -> None:
+        """Stop synthesis and emission (e.g. when the user interrupts playback)."""
+        self._cancelled = True
+        for task in self._tasks:
+            task.cancel()
+        if not self._finished:
+            self._finished = True
+            self._queue.put_nowait(None)
+
+    def _schedule(self, chunk: str) -> None:
+        """Start synthesizing a chunk and queue it for in-order emission."""
+        pieces: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(self._synthesize(chunk, pieces))
+        self._tasks.append(task)
+        self._queue.put_nowait((chunk, pieces))
+        self.chunks += 1
+
+    async def _synthesize(self, chunk: str, pieces: asyncio.Queue) -> None:
+        """Stream one chunk's audio into its queue within the parallelism limit, then None."""
+        try:
+            async with self._semaphore:
+                async for piece in self.synthesize(chunk):
+                    pieces.put_nowait(piece)
+        except Exception as e:
+            pieces.put_nowait(e)
+        finally:
+            pieces.put_nowait(None)
+
+    async def drain(self, emit: Callable[[str, Any], Awaitable[None]]) -> None:
+        """
+        Emit synthesized audio in reply order until the reply is finished.
+
+        A chunk that fails to synthesize is logged and the rest of it skipped.
+
+        Args:
+            emit: Coroutine function called with each chunk's text and each audio piece
+        """
+        try:
+            while not self._cancelled:
+                item = await self._queue.get()
+                if item is None:
+                    break
+                chunk, pieces = item
+                emitted = False
+                while not self._cancelled:
+                    piece = await pieces.get()
+                    if piece is None:
+                        break
+                    if isinstance(piece, Exception):
+                        logger.error(f"TTS failed for chunk {chunk[:40]!r}: {piece}")
+                        self.errors.append(str(piece))
+                        continue
+
+                    if self.time_to_first_audio is None:
+                        self.time_to_first_audio = time.perf_counter() - self.start_time
+                        logger.info(f"First audio ready after {self.time_to_first_audio:.2f}s")
+                    await emit(chunk, piece)
+                    emitted = True
+                if emitted:
+                    self.emitted += 1
+            if self.emitted and not self._cancelled:
+                self.time_to_last_audio = time.perf_counter() - self.start_time
+        finally:
+            # Nothing will consume audio that is still being synthesized
+            for task in self._tasks:
+                task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the pipeline statistics for this reply.
+
+        Returns:
+            Dict containing chunk counts, errors and time to first and last audio
+        """
+        return {
+            "chunks": self.chunks,
+            "emitted": self.emitted,
+            "errors": len(self.errors),
+            "time_to_first_audio": self.time_to_first_audio,
+            "time_to_last_audio": self.time_to_last_audio,
+            "cancelled": self._cancelled
+        }
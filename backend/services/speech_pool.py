@@ -0,0 +1,237 @@
+"""
+Speech Pool Service
+
+Keeps greetings and silence follow-ups ready to play. Each variant (new or
+returning user greeting, follow-up tier) has a small pool of responses
+whose text and audio were generated in the background, so pressing the
+call button or going quiet does not wait for an LLM call and a TTS
+synthesis. Pools are refilled after use and regenerated when the system
+prompt or the user's name changes.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Any, Deque, Optional, Tuple
+
+from .llm import LLMClient
+from .tts import TTSClient
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# (text, audio)
+PregeneratedSpeech = Tuple[str, bytes]
+
+FOLLOWUP_TIERS = 3
+
+def greeting_instruction(user_name: str, is_returning_user: bool) -> str:
+    """
+    Get the instruction for generating a greeting.
+
+    Args:
+        user_name: User's name, or empty string if not set
+        is_returning_user: Whether this is a returning user
+
+    Returns:
+        str: The greeting prompt
+    """
+    who = user_name or "someone"
+    manner = "like you've met them before" if is_returning_user else "like you're meeting them for the first time"
+    return (f"Create a friendly greeting for {who} who just activated their microphone. "
+            f"Be brief and conversational, but treat it {manner}. Do not do anything else.")
+
+def followup_instruction(user_name: str, tier: int) -> str:
+    """
+    Get the instruction for generating a follow-up.
+
+    Args:
+        user_name: User's name, or empty string if not set
+        tier: The follow-up tier (0-2)
+
+    Returns:
+        str: The follow-up prompt
+    """
+    # Adjust approach based on tier
+    approach = ("gentle check-in", "casual follow-up", "friendly reminder")[min(max(tier, 0), 2)]
+    who = user_name or "someone"
+    return (f"Create a {approach} for {who} who hasn't responded to your last message. "
+            f"Be brief and conversational. Do not do anything else.")
+
+def greeting_key(is_returning_user: bool) -> str:
+    """Pool key of a greeting variant."""
+    return "greeting_returning" if is_returning_user else "greeting_new"
+
+def followup_key(tier: int) -> str:
+    """Pool key of a follow-up tier."""
+    return f"followup_{tier}"
+
+class SpeechPool:
+    """
+    Pools of pre-generated greetings and follow-ups.
+
+    Shared by all connections. configure() sets the system prompt and user
+    name the responses are generated for; when either changes, the pools
+    are cleared and refilled. take() returns a ready response, if any, and
+    starts refilling that variant in the background (one refill task per
+    variant at a time). Responses generated for an outdated configuration
+    are dropped.
+    """
+
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        tts_client: TTSClient,
+        size: int = 2,
+        temperature: float = 0.9
+    ):
+        """
+        Initialize the speech pool.
+
+        Args:
+            llm_client: LLM client used to write the responses
+            tts_client: TTS client used to synthesize them
+            size: Ready responses kept per variant
+            temperature: Sampling temperature, high enough that pooled responses vary
+        """
+        self.llm_client = llm_client
+        self.tts_client = tts_client
+        self.size = size
+        self.temperature = temperature
+
+        self.system_prompt: Optional[str] = None
+        self.user_name: Optional[str] = None
+        self.generation = 0  # Bumped whenever the configuration changes
+        self._pools: Dict[str, Deque[PregeneratedSpeech]] = {}
+        self._instructions: Dict[str, str] = {}
+        self._refills: Dict[str, asyncio.Task] = {}
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.failures = 0
+        self.invalidations = 0
+
+        logger.info(f"Initialized Speech Pool with size={size}")
+
+    def configure(self, system_prompt: str, user_name: str) -> None:
+        """
+        Set the system prompt and user name, regenerating the pools if they changed.
+
+        Args:
+            system_prompt: System prompt the responses are generated with
+            user_name: User's name, or empty string if not set
+        """
+        if (system_prompt, user_name) == (self.system_prompt, self.user_name):
+            return
+
+        if self.system_prompt is not None:
+            self.invalidations += 1
+            logger.info("System prompt or user name changed, regenerating pre-generated speech")
+        self.system_prompt = system_prompt
+        self.user_name = user_name
+        self.generation += 1
+        for task in self._refills.values():
+            task.cancel()
+        self._refills.clear()
+
+        self._instructions = {
+            greeting_key(False): greeting_instruction(user_name, False),
+            greeting_key(True): greeting_instruction(user_name, True),
+        }
+        for tier in range(FOLLOWUP_TIERS):
+            self._instructions[followup_key(tier)] = followup_instruction(user_name, tier)
+        self._pools = {key: deque() for key in self._instructions}
+
+        for key in self._instructions:
+            self._refill(key)
+
+    def take(self, key: str) -> Optional[PregeneratedSpeech]:
+        """
+        Take a ready response and start refilling its pool.
+
+        Args:
+            key: Variant key (see greeting_key and followup_key)
+
+        Returns:
+            (text, audio), or None if none is ready
+        """
+        pool = self._pools.get(key)
+        speech = pool.popleft() if pool else None
+        if speech:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self._refill(key)
+        return speech
+
+    def _refill(self, key: str) -> None:
+        """Start a background task filling a variant's pool, unless one is running."""
+        if key not in self._instructions or key in self._refills or self.size <= 0:
+            return
+        task = asyncio.create_task(self._fill(key, self.generation))
+        self._refills[key] = task
+        task.add_done_callback(lambda done: self._refills.pop(key, None)
+                               if self._refills.get(key) is done else None)
+
+    async def _fill(self, key: str, generation: int) -> None:
+        """
+        Generate responses for a variant until its pool is full.
+
+        Args:
+            key: Variant key
+            generation: Configuration the responses are generated for
+        """
+        while generation == self.generation and len(self._pools[key]) < self.size:
+            try:
+                response = await self.llm_client.get_response(
+                    self._instructions[key],
+                    self.system_prompt,
+                    add_to_history=False,
+                    temperature=self.temperature
+                )
+                text = (response.get("text") or "").strip()
+                if "error" in response or not text:
+                    raise RuntimeError(response.get("error", "empty response"))
+                audio = await self.tts_client.async_text_to_speech(text)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Retried on the next take() or configuration change
+                self.failures += 1
+                logger.warning(f"Could not pre-generate {key}: {e}")
+                return
+
+            if generation != self.generation:
+                return
+            self._pools[key].append((text, audio))
+            self.generated += 1
+            logger.info(f"Pre-generated {key} ({len(self._pools[key])}/{self.size} ready)")
+
+    async def close(self) -> None:
+        """Cancel all refills in progress."""
+        tasks = list(self._refills.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the current pool statistics.
+
+        Returns:
+            Dict containing ready responses per variant, hit and miss counts
+            and generation counters
+        """
+        return {
+            "ready": {key: len(pool) for key, pool in self._pools.items()},
+            "size": self.size,
+            "refilling": len(self._refills),
+            "hits": self.hits,
+            "misses": self.misses,
+            "generated": self.generated,
+            "failures": self.failures,
+            "invalidations": self.invalidations
+        }
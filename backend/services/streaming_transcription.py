@@ -0,0 +1,260 @@
+"""
+Streaming Transcription Service
+
+Incrementally transcribes an utterance while the user is still speaking by
+repeatedly decoding a rolling audio window and committing the text that
+consecutive decodes agree on.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from .audio_processing import StreamResampler, WHISPER_SAMPLE_RATE
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class RollingTranscript:
+    """
+    Tracks a rolling audio window and the text decoded from it.
+
+    After each decode, the leading segments that match the previous decode
+    are committed: their text is final and their audio is dropped from the
+    window. Only the uncommitted tail is decoded again, so the window stays
+    short and the final decode at the end of the utterance is cheap.
+    """
+
+    def __init__(self, max_window_s: float = 20.0):
+        """
+        Initialize the rolling transcript.
+
+        Args:
+            max_window_s: Window length after which segments are committed without agreement
+        """
+        self.max_window_samples = int(max_window_s * WHISPER_SAMPLE_RATE)
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.committed: List[str] = []
+        self.tentative: List[Dict[str, Any]] = []
+        self.total_samples = 0
+
+    def append(self, samples: np.ndarray) -> None:
+        """
+        Add 16 kHz float32 samples to the window.
+
+        Args:
+            samples: Audio samples to append
+        """
+        self.buffer = np.concatenate((self.buffer, samples))
+        self.total_samples += len(samples)
+
+    def _commit(self, segments: List[Dict[str, Any]]) -> None:
+        """Commit segments and drop their audio from the window."""
+        self.committed.extend(segment["text"].strip() for segment in segments)
+        cut = int(segments[-1]["end"] * WHISPER_SAMPLE_RATE)
+        self.buffer = self.buffer[min(cut, len(self.buffer)):]
+
+    def update(self, segments: List[Dict[str, Any]]) -> str:
+        """
+        Apply a new decode of the current window.
+
+        Args:
+            segments: Decoded segments with text and start/end times relative to the window
+
+        Returns:
+            The current best transcript (committed plus tentative text)
+        """
+        # Commit the leading segments both decodes agree on (never the last one,
+        # which may still change as more audio arrives)
+        agreed = 0
+        for previous, current in zip(self.tentative, segments[:-1]):
+            if previous["text"].strip() != current["text"].strip():
+                break
+            agreed += 1
+
+        # Force a commit when the window grows too long to decode cheaply
+        if not agreed and len(self.buffer) > self.max_window_samples:
+            agreed = max(1, len(segments) - 1) if segments else 0
+
+        if agreed:
+            self._commit(segments[:agreed])
+        self.tentative = segments[agreed:]
+
+        return self.text
+
+    def finalize(self, segments: List[Dict[str, Any]]) -> str:
+        """
+        Commit the final decode of the remaining window.
+
+        Args:
+            segments: Decoded segments for the remaining audio
+
+        Returns:
+            The final transcript
+        """
+        self.committed.extend(segment["text"].strip() for segment in segments)
+        self.tentative = []
+        self.buffer = np.zeros(0, dtype=np.float32)
+        return self.text
+
+    @property
+    def text(self) -> str:
+        """The committed text followed by the tentative text."""
+        parts = self.committed + [segment["text"].strip() for segment in self.tentative]
+        return " ".join(part for part in parts if part)
+
+class StreamingSession:
+    """
+    A single streamed utterance on a WebSocket connection.
+
+    Audio frames are appended as they arrive; partial decodes run on the
+    transcription worker pool, one at a time per session.
+    """
+
+    def __init__(
+        self,
+        transcriber,
+        input_sample_rate: int,
+        partial_interval_ms: float = 500.0,
+        max_window_s: float = 20.0,
+        profile: Optional[str] = None,
+        silence_db: float = -45.0,
+        model: Optional[str] = None
+    ):
+        """
+        Initialize the streaming session.
+
+        Args:
+            transcriber: WhisperModelRegistry used to run decodes (the pool is chosen per
+                decode, so a model evicted mid-utterance is never used after shutdown)
+            input_sample_rate: Sample rate of the incoming PCM frames in Hz
+            partial_interval_ms: Minimum new audio between partial decodes
+            max_window_s: Window length after which text is committed without agreement
+            profile: Decoding profile name, if None the default profile is used
+            silence_db: Frames quieter than this (dBFS) count as trailing silence
+            model: Requested model size, if None the active model is used
+        """
+        self.transcriber = transcriber
+        self.profile = profile
+        self.model = model
+        self.decoded_model: Optional[str] = None  # Model size of the latest decode
+        self.input_sample_rate = input_sample_rate
+        self.resampler = StreamResampler(input_sample_rate)
+        self.partial_interval_samples = int(partial_interval_ms / 1000 * WHISPER_SAMPLE_RATE)
+        self.transcript = RollingTranscript(max_window_s=max_window_s)
+
+        self._decode_lock = asyncio.Lock()
+        self._decoded_at = 0
+        self._last_partial = ""
+        self._partial_changed_at = time.perf_counter()
+        self.silence_db = silence_db
+        self._voice_at = 0  # Sample position where sound was last heard
+        self.partial_decodes = 0
+        self.started_at = time.time()
+
+    def append_pcm(self, pcm: np.ndarray) -> None:
+        """
+        Add a frame of PCM audio.
+
+        Args:
+            pcm: Int16 or float32 samples at the session's input sample rate
+        """
+        if pcm.dtype == np.int16:
+            samples = pcm.astype(np.float32) / 32768.0
+        else:
+            samples = pcm.astype(np.float32, copy=False)
+        resampled = self.resampler.process(samples)
+        self.transcript.append(resampled)
+
+        # Track trailing silence as a hint that the utterance is ending
+        if len(resampled):
+            rms = float(np.sqrt(np.mean(resampled ** 2)))
+            if 20 * np.log10(rms + 1e-10) > self.silence_db:
+                self._voice_at = self.transcript.total_samples
+
+    @property
+    def trailing_silence_ms(self) -> float:
+        """Milliseconds of quiet audio since sound was last heard."""
+        return (self.transcript.total_samples - self._voice_at) / WHISPER_SAMPLE_RATE * 1000
+
+    @property
+    def partial_text(self) -> str:
+        """The latest partial transcript."""
+        return self._last_partial
+
+    @property
+    def partial_stable_ms(self) -> float:
+        """Milliseconds since the partial transcript last changed."""
+        return (time.perf_counter() - self._partial_changed_at) * 1000
+
+    def partial_due(self) -> bool:
+        """Whether enough new audio has arrived to run another partial decode."""
+        return (not self._decode_lock.locked() and
+                self.transcript.total_samples - self._decoded_at >= self.partial_interval_samples)
+
+    async def decode_partial(self) -> Optional[str]:
+        """
+        Decode the current window and update the rolling transcript.
+
+        Returns:
+            The new partial transcript, or None if it did not change
+        """
+        async with self._decode_lock:
+            self._decoded_at = self.transcript.total_samples
+            window = self.transcript.buffer
+            if len(window) == 0:
+                return None
+
+            segments, metadata = await self.transcriber.transcribe_segments_async(window, self.profile,
+                                                                                  model=self.model)
+            self.decoded_model = metadata.get("model", self.decoded_model)
+            if "error" in metadata:
+                return None
+
+            self.partial_decodes += 1
+            text = self.transcript.update(segments)
+            if text == self._last_partial:
+                return None
+            self._last_partial = text
+            self._partial_changed_at = time.perf_counter()
+            return text
+
+    async def finish(self) -> Tuple[str, Dict[str, Any]]:
+        """
+        Decode whatever audio has not been committed yet and return the final transcript.
+
+        Returns:
+            Tuple of final text and metadata
+        """
+        async with self._decode_lock:
+            start_time = time.time()
+            self.transcript.append(self.resampler.flush())
+            segments: List[Dict[str, Any]] = []
+            metadata: Dict[str, Any] = {}
+            if len(self.transcript.buffer):
+                segments, metadata = await self.transcriber.transcribe_segments_async(self.transcript.buffer, self.profile,
+                                                                                      model=self.model)
+                self.decoded_model = metadata.get("model", self.decoded_model)
+
+            text = self.transcript.finalize(segments)
+            final_decode_time = time.time() - start_time
+            logger.info(f"Streaming transcription finalized in {final_decode_time:.2f}s "
+                       f"after {self.partial_decodes} partial decodes: {text[:50]}...")
+
+            result = {
+                "streaming": True,
+                "language": "en",
+                "processing_time": final_decode_time,
+                "partial_decodes": self.partial_decodes,
+                "audio_duration": self.transcript.total_samples / WHISPER_SAMPLE_RATE,
+                "segments_count": len(self.transcript.committed),
+                "decoding_profile": metadata.get("decoding_profile", self.profile),
+                "model": self.decoded_model or self.model or self.transcriber.active_model
+            }
+            if "error" in metadata:
+                result["error"] = metadata["error"]
+            return text, result
@@ -8,14 +8,63 @@ import numpy as np
 import logging
 import io  # For BytesIO
 from typing import Dict, Any, List, Optional, Tuple
-from faster_whisper import WhisperModel
+from faster_whisper import WhisperModel, BatchedInferencePipeline, decode_audio
 import time
 import torch  # For CUDA availability check
 
+from .audio_processing import load_wav_pcm
+from .streaming_transcription import RollingTranscript, WHISPER_SAMPLE_RATE
+from .transcription_batcher import layout_batch_clips
+from .vad import SpeechDetector
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Named decoding profiles. Each pins every option that affects worst-case
+# latency: the beam, how many times a segment may be re-decoded at a higher
+# temperature, the thresholds that trigger those re-decodes, and timestamps.
+DECODING_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Greedy, at most one fallback decode, no timestamp tokens
+    "realtime": {
+        "beam_size": 1,
+        "best_of": 1,
+        "temperature": [0.0, 0.4],
+        "compression_ratio_threshold": 2.4,
+        "log_prob_threshold": -1.0,
+        "no_speech_threshold": 0.6,
+        "condition_on_previous_text": False,
+        "without_timestamps": True,
+        "max_initial_timestamp": 0.5
+    },
+    # Small beam, at most two fallback decodes
+    "balanced": {
+        "beam_size": 2,
+        "best_of": 2,
+        "temperature": [0.0, 0.2, 0.4],
+        "compression_ratio_threshold": 2.4,
+        "log_prob_threshold": -1.0,
+        "no_speech_threshold": 0.6,
+        "condition_on_previous_text": False,
+        "without_timestamps": True,
+        "max_initial_timestamp": 1.0
+    },
+    # faster-whisper's defaults: full beam and the complete fallback schedule
+    "accurate": {
+        "beam_size": 5,
+        "best_of": 5,
+        "temperature": [0.0, 0.2, 0.4, 0.6, 0.8, 1.0],
+        "compression_ratio_threshold": 2.4,
+        "log_prob_threshold": -1.0,
+        "no_speech_threshold": 0.6,
+        "condition_on_previous_text": True,
+        "without_timestamps": False,
+        "max_initial_timestamp": 1.0
+    }
+}
+
+DEFAULT_DECODING_PROFILE = "balanced"
+
 class WhisperTranscriber:
     """
     Speech-to-Text service using Faster Whisper.
@@ -28,8 +77,12 @@ class WhisperTranscriber:
         model_size: str = "base",
         device: str = None,
         compute_type: str = None,
-        beam_size: int = 2,
-        sample_rate: int = 44100
+        beam_size: Optional[int] = None,
+        sample_rate: int = 44100,
+        cpu_threads: int = 0,
+        num_workers: int = 1,
+        vad: Optional[SpeechDetector] = None,
+        decoding_profile: str = DEFAULT_DECODING_PROFILE
     ):
         """
         Initialize the transcription service.
@@ -38,8 +91,12 @@ class WhisperTranscriber:
             model_size: Whisper model size (tiny.en, base.en, small.en, medium.en, large)
             device: Device to run model on ('cpu' or 'cuda'), if None will auto-detect
             compute_type: Model computation type (int8, int16, float16, float32), if None will select based on device
-            beam_size: Beam size for decoding
+            beam_size: Beam size for decoding, if None the decoding profile's beam size is used
             sample_rate: Audio sample rate in Hz
+            cpu_threads: CTranslate2 threads per model on CPU (0 lets CTranslate2 decide)
+            num_workers: CTranslate2 workers per model (parallel transcriptions on one model)
+            vad: Optional server-side speech detector that trims silence before decoding
+            decoding_profile: Default decoding profile (realtime, balanced, accurate)
         """
         self.model_size = model_size
         
@@ -57,6 +114,14 @@ class WhisperTranscriber:
             
         self.beam_size = beam_size
         self.sample_rate = sample_rate
+        self.cpu_threads = cpu_threads
+        self.num_workers = num_workers
+        self.vad = vad
+        
+        if decoding_profile not in DECODING_PROFILES:
+            logger.warning(f"Unknown decoding profile '{decoding_profile}', using '{DEFAULT_DECODING_PROFILE}'")
+            decoding_profile = DEFAULT_DECODING_PROFILE
+        self.decoding_profile = decoding_profile
         
         # Initialize model
         self._initialize_model()
@@ -65,7 +130,8 @@ class WhisperTranscriber:
         self.is_processing = False
         
         logger.info(f"Initialized Whisper Transcriber with model={model_size}, "
-                   f"device={self.device}, compute_type={self.compute_type}")
+                   f"device={self.device}, compute_type={self.compute_type}, "
+                   f"decoding_profile={self.decoding_profile}")
     
     def _initialize_model(self):
         """Initialize Whisper model."""
@@ -74,19 +140,92 @@ class WhisperTranscriber:
             self.model = WhisperModel(
                 self.model_size,  # Pass as positional argument, not keyword
                 device=self.device,
-                compute_type=self.compute_type
+                compute_type=self.compute_type,
+                cpu_threads=self.cpu_threads,
+                num_workers=self.num_workers
             )
+            # Batched pipeline shares the model weights; used for cross-session batches
+            self.batched_pipeline = BatchedInferencePipeline(model=self.model)
             logger.info(f"Successfully loaded Whisper model: {self.model_size}")
         except Exception as e:
             logger.error(f"Failed to load Whisper model: {e}")
             raise
     
-    def transcribe(self, audio: np.ndarray) -> Tuple[str, Dict[str, Any]]:
+    def _decode_options(self, profile: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Resolve a decoding profile into faster-whisper transcribe options.
+        
+        Args:
+            profile: Profile name, if None (or unknown) the default profile is used
+            
+        Returns:
+            Tuple of the profile name actually used and its decoding options
+        """
+        if profile not in DECODING_PROFILES:
+            if profile is not None:
+                logger.warning(f"Unknown decoding profile '{profile}', using '{self.decoding_profile}'")
+            profile = self.decoding_profile
+        
+        options = dict(DECODING_PROFILES[profile])
+        if self.beam_size is not None:
+            options["beam_size"] = self.beam_size
+        return profile, options
+    
+    def _prepare_audio(self, audio: np.ndarray):
+        """
+        Convert incoming audio into a form the Whisper model accepts.
+        
+        Args:
+            audio: Audio data as numpy array (uint8 WAV bytes or raw samples)
+            
+        Returns:
+            16 kHz float32 samples for PCM WAV data, a file-like object for other
+            WAV data, otherwise normalized float32 samples
+        """
+        # Handle WAV data (if audio is in uint8 format, it contains WAV headers)
+        if audio.dtype == np.uint8:
+            # First check the RIFF header to confirm this is WAV data
+            header = bytes(audio[:44])
+            if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+                # Fast path: read PCM straight out of the buffer and resample in NumPy
+                samples = load_wav_pcm(audio)
+                if samples is not None:
+                    return samples
+                # Compressed or unusual WAV: let faster-whisper decode it through PyAV
+                audio_file = io.BytesIO(bytes(audio))
+                # The transcribe method expects a file-like object with read method
+                audio = audio_file
+            else:
+                # Not a proper WAV header
+                logger.warning("Received audio data with incorrect WAV header")
+                # Attempt to process as raw data
+                audio = audio.astype(np.float32) / np.max(np.abs(audio)) if np.max(np.abs(audio)) > 0 else audio
+        else:
+            # Normalize audio if it's raw float data
+            audio = audio.astype(np.float32) / np.max(np.abs(audio)) if np.max(np.abs(audio)) > 0 else audio
+        return audio
+    
+    def _detect_speech(self, audio) -> Tuple[Optional[np.ndarray], Dict[str, Any]]:
+        """
+        Trim silence from prepared audio with the server-side VAD.
+        
+        Args:
+            audio: Prepared audio (samples or a file-like object)
+            
+        Returns:
+            Tuple of trimmed 16 kHz samples (None if there is no speech) and VAD metadata
+        """
+        if not isinstance(audio, np.ndarray):
+            audio = decode_audio(audio, sampling_rate=WHISPER_SAMPLE_RATE)
+        return self.vad.trim(audio.astype(np.float32, copy=False))
+    
+    def transcribe(self, audio: np.ndarray, profile: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
         """
         Transcribe audio data to text.
         
         Args:
             audio: Audio data as numpy array
+            profile: Decoding profile name, if None the default profile is used
             
         Returns:
             Tuple[str, Dict[str, Any]]: 
@@ -97,30 +236,30 @@ class WhisperTranscriber:
         self.is_processing = True
         
         try:
-            # Handle WAV data (if audio is in uint8 format, it contains WAV headers)
-            if audio.dtype == np.uint8:
-                # First check the RIFF header to confirm this is WAV data
-                header = bytes(audio[:44])
-                if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
-                    # Create a file-like object that Whisper can read from
-                    audio_file = io.BytesIO(bytes(audio))
-                    # The transcribe method expects a file-like object with read method
-                    audio = audio_file
-                else:
-                    # Not a proper WAV header
-                    logger.warning("Received audio data with incorrect WAV header")
-                    # Attempt to process as raw data
-                    audio = audio.astype(np.float32) / np.max(np.abs(audio)) if np.max(np.abs(audio)) > 0 else audio
-            else:
-                # Normalize audio if it's raw float data
-                audio = audio.astype(np.float32) / np.max(np.abs(audio)) if np.max(np.abs(audio)) > 0 else audio
+            profile, options = self._decode_options(profile)
+            audio = self._prepare_audio(audio)
+            
+            # Trim silence and skip the decoder entirely when there is no speech
+            vad_metadata = {}
+            if self.vad is not None:
+                audio, vad_metadata = self._detect_speech(audio)
+                if audio is None:
+                    logger.info("No speech detected by VAD, skipping transcription")
+                    return "", {
+                        "no_speech": True,
+                        "decoding_profile": profile,
+                        "language": "en",
+                        "processing_time": time.time() - start_time,
+                        "segments_count": 0,
+                        **vad_metadata
+                    }
             
             # Transcribe
             segments, info = self.model.transcribe(
                 audio, 
-                beam_size=self.beam_size,
                 language="en",  # Force English language
-                vad_filter=False  # Disable VAD filter since we handle it in the frontend
+                vad_filter=False,  # Silence is trimmed by our own VAD (and the frontend's)
+                **options
             )
             
             # Collect all segment texts
@@ -135,7 +274,9 @@ class WhisperTranscriber:
                 "confidence": getattr(info, "avg_logprob", 0),
                 "language": getattr(info, "language", "en"),
                 "processing_time": processing_time,
-                "segments_count": len(text_segments)
+                "segments_count": len(text_segments),
+                "decoding_profile": profile,
+                **vad_metadata
             }
             
             return full_text, metadata
@@ -146,39 +287,190 @@ class WhisperTranscriber:
         finally:
             self.is_processing = False
     
-    def transcribe_streaming(self, audio_generator):
+    def transcribe_batch(self, audios: List[np.ndarray],
+                         profile: Optional[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Transcribe several independent audio segments in one batched decode.
+        
+        The segments are laid out back to back in a single buffer and handed to
+        faster-whisper's batched pipeline with one clip per segment, so the
+        encoder and decoder run once for the whole batch. Segments longer than
+        Whisper's 30 s window are split into several clips and re-joined.
+        
+        Args:
+            audios: List of audio data arrays (same formats as transcribe)
+            profile: Decoding profile name shared by the whole batch
+            
+        Returns:
+            List of (text, metadata) tuples in the same order as the input
+        """
+        start_time = time.time()
+        self.is_processing = True
+        
+        try:
+            profile, options = self._decode_options(profile)
+            sampling_rate = self.model.feature_extractor.sampling_rate
+            
+            segments: List[Tuple[int, np.ndarray]] = []
+            vad_metadata: List[Dict[str, Any]] = [{} for _ in audios]
+            
+            for index, audio in enumerate(audios):
+                prepared = self._prepare_audio(audio)
+                if self.vad is not None:
+                    # Segments without speech get no clip and come back empty
+                    prepared, vad_metadata[index] = self._detect_speech(prepared)
+                    if prepared is None:
+                        vad_metadata[index]["no_speech"] = True
+                        continue
+                elif not isinstance(prepared, np.ndarray):
+                    prepared = decode_audio(prepared, sampling_rate=sampling_rate)
+                segments.append((index, prepared.astype(np.float32, copy=False)))
+            
+            batch_audio, clip_timestamps, seek_to_index = layout_batch_clips(
+                segments,
+                sampling_rate,
+                self.model.feature_extractor.chunk_length * sampling_rate,
+                self.model.feature_extractor.hop_length,
+                self.model.frames_per_second
+            )
+            
+            texts: List[List[str]] = [[] for _ in audios]
+            confidences: List[List[float]] = [[] for _ in audios]
+            
+            if clip_timestamps:
+                decoded, info = self.batched_pipeline.transcribe(
+                    batch_audio,
+                    language="en",  # Force English language
+                    clip_timestamps=clip_timestamps,
+                    batch_size=len(clip_timestamps),
+                    vad_filter=False,
+                    **options
+                )
+                for segment in decoded:
+                    index = seek_to_index[segment.seek]
+                    texts[index].append(segment.text)
+                    confidences[index].append(segment.avg_logprob)
+            
+            processing_time = time.time() - start_time
+            logger.info(f"Batched transcription of {len(audios)} segments "
+                       f"({len(clip_timestamps)} clips) completed in {processing_time:.2f}s")
+            
+            results = []
+            for segment_texts, segment_confidences, segment_vad in zip(texts, confidences, vad_metadata):
+                results.append((" ".join(segment_texts).strip(), {
+                    "confidence": float(np.mean(segment_confidences)) if segment_confidences else 0,
+                    "language": "en",
+                    "processing_time": processing_time,
+                    "segments_count": len(segment_texts),
+                    "batch_size": len(audios),
+                    "decoding_profile": profile,
+                    **segment_vad
+                }))
+            return results
+            
+        except Exception as e:
+            logger.error(f"Batched transcription error: {e}")
+            return [("", {"error": str(e)}) for _ in audios]
+        finally:
+            self.is_processing = False
+    
+    def transcribe_segments(self, audio: np.ndarray, initial_prompt: Optional[str] = None,
+                            profile: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Transcribe 16 kHz float32 audio and return timestamped segments.
+        
+        Used by the streaming path, which needs segment boundaries to decide
+        which part of its rolling window is settled.
+        
+        Args:
+            audio: Float32 audio samples at 16 kHz
+            initial_prompt: Optional text to condition the decode on
+            profile: Decoding profile name, if None the default profile is used
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+                - Segments with text, start, end and confidence
+                - Dictionary with additional information
+        """
+        start_time = time.time()
+        self.is_processing = True
+        
+        try:
+            profile, options = self._decode_options(profile)
+            # The rolling window needs segment timestamps and is re-decoded from scratch each time
+            options.update(without_timestamps=False, condition_on_previous_text=False)
+            
+            segments, info = self.model.transcribe(
+                audio,
+                language="en",  # Force English language
+                initial_prompt=initial_prompt,
+                vad_filter=False,
+                **options
+            )
+            
+            results = [{
+                "text": segment.text,
+                "start": segment.start,
+                "end": segment.end,
+                "confidence": segment.avg_logprob
+            } for segment in segments]
+            
+            return results, {
+                "language": getattr(info, "language", "en"),
+                "processing_time": time.time() - start_time,
+                "segments_count": len(results),
+                "decoding_profile": profile
+            }
+            
+        except Exception as e:
+            logger.error(f"Segment transcription error: {e}")
+            return [], {"error": str(e)}
+        finally:
+            self.is_processing = False
+    
+    def transcribe_streaming(self, audio_generator, partial_interval_s: float = 0.5):
         """
         Stream transcription results from an audio generator.
         
+        Decodes a rolling window every partial_interval_s of new audio and
+        yields the current transcript, committing text that consecutive
+        decodes agree on. The last item yielded has "final" set.
+        
         Args:
-            audio_generator: Generator yielding audio chunks
+            audio_generator: Generator yielding float32 audio chunks at 16 kHz
+            partial_interval_s: Seconds of new audio between partial decodes
             
         Yields:
             Partial transcription results as they become available
         """
-        self.is_processing = True
+        transcript = RollingTranscript()
+        interval_samples = int(partial_interval_s * WHISPER_SAMPLE_RATE)
+        decoded_at = 0
         
         try:
-            # Process the streaming transcription
-            segments = self.model.transcribe_with_vad(
-                audio_generator,
-                language="en"
-            )
+            for chunk in audio_generator:
+                transcript.append(np.asarray(chunk, dtype=np.float32))
+                if transcript.total_samples - decoded_at < interval_samples:
+                    continue
+                
+                decoded_at = transcript.total_samples
+                segments, metadata = self.transcribe_segments(transcript.buffer)
+                if "error" in metadata:
+                    yield metadata
+                    return
+                yield {"text": transcript.update(segments), "final": False}
             
-            # Yield each segment as it's transcribed
-            for segment in segments:
-                yield {
-                    "text": segment.text,
-                    "start": segment.start,
-                    "end": segment.end,
-                    "confidence": segment.avg_logprob
-                }
+            segments, metadata = ([], {})
+            if len(transcript.buffer):
+                segments, metadata = self.transcribe_segments(transcript.buffer)
+            if "error" in metadata:
+                yield metadata
+                return
+            yield {"text": transcript.finalize(segments), "final": True}
                 
         except Exception as e:
             logger.error(f"Streaming transcription error: {e}")
             yield {"error": str(e)}
-        finally:
-            self.is_processing = False
     
     def get_config(self) -> Dict[str, Any]:
         """
@@ -192,6 +484,10 @@ class WhisperTranscriber:
             "device": self.device,
             "compute_type": self.compute_type,
             "beam_size": self.beam_size,
+            "decoding_profile": self.decoding_profile,
             "sample_rate": self.sample_rate,
+            "cpu_threads": self.cpu_threads,
+            "num_workers": self.num_workers,
+            "vad_backend": self.vad.backend if self.vad is not None else None,
             "is_processing": self.is_processing
         }
@@ -0,0 +1,273 @@
+"""
+Transcription Batching Service
+
+Collects speech segments from concurrent sessions and decodes them together
+with faster-whisper's batched inference pipeline.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Any, List, Optional, Set, Tuple, Callable, Awaitable
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BatchRunner = Callable[[List[np.ndarray], Optional[str]], Awaitable[List[Tuple[str, Dict[str, Any]]]]]
+
+def layout_batch_clips(
+    segments: List[Tuple[int, np.ndarray]],
+    sampling_rate: int,
+    chunk_samples: int,
+    frame_samples: int,
+    frames_per_second: int
+) -> Tuple[np.ndarray, List[Dict[str, int]], Dict[int, int]]:
+    """
+    Lay segments out back to back for one batched-pipeline decode.
+
+    Segments longer than chunk_samples are split into several clips. Clip
+    starts are aligned to feature frames (with a one-frame gap) so each clip
+    maps to a unique seek value in the pipeline output, computed the way
+    faster-whisper computes Segment.seek from the clip start.
+
+    Args:
+        segments: (request index, float32 samples) pairs
+        sampling_rate: Sample rate of the audio in Hz
+        chunk_samples: Longest clip the model decodes in one window
+        frame_samples: Samples per feature frame (the hop length)
+        frames_per_second: Feature frames per second of audio
+
+    Returns:
+        Tuple of the concatenated audio, the clip timestamps in samples and
+        a mapping from segment seek value to request index
+    """
+    buffers = []
+    clip_timestamps = []
+    seek_to_index: Dict[int, int] = {}
+    offset = 0
+
+    for index, samples in segments:
+        for start in range(0, len(samples), chunk_samples):
+            clip = samples[start:start + chunk_samples]
+            padded_length = (-(-len(clip) // frame_samples) + 1) * frame_samples
+            clip_timestamps.append({"start": offset, "end": offset + len(clip)})
+            seek_to_index[int(offset / sampling_rate * frames_per_second)] = index
+            buffers.append(clip)
+            buffers.append(np.zeros(padded_length - len(clip), dtype=np.float32))
+            offset += padded_length
+
+    audio = np.concatenate(buffers) if buffers else np.zeros(0, dtype=np.float32)
+    return audio, clip_timestamps, seek_to_index
+
+class BatchingScheduler:
+    """
+    Micro-batching scheduler for Whisper inference.
+
+    Segments that arrive within a short window are grouped into one batch.
+    While every worker is busy the current batch keeps growing (up to the
+    maximum size), so batches get larger exactly when throughput matters.
+    """
+
+    def __init__(
+        self,
+        run_batch: BatchRunner,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+        concurrency: int = 1
+    ):
+        """
+        Initialize the batching scheduler.
+
+        Args:
+            run_batch: Coroutine function that transcribes a list of segments with one decoding profile
+            max_batch_size: Maximum number of segments decoded together
+            max_wait_ms: How long to wait for more segments after the first arrives
+            concurrency: Number of batches allowed to run at the same time
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max_wait_ms
+        self.concurrency = max(1, concurrency)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._batch: list = []  # Batch the collector is building
+        self._dispatches: Set[asyncio.Task] = set()
+        self._closed = False
+
+        # Statistics
+        self.batches = 0
+        self.segments = 0
+        self.largest_batch = 0
+
+        logger.info(f"Initialized Batching Scheduler with max_batch_size={self.max_batch_size}, "
+                   f"max_wait_ms={max_wait_ms}")
+
+    @property
+    def pending(self) -> int:
+        """Number of segments waiting to be batched."""
+        return self._queue.qsize() if self._queue else 0
+
+    def _ensure_started(self) -> None:
+        """Start the collector task on the running event loop."""
+        if self._collector is None or self._collector.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._collector = asyncio.create_task(self._collect())
+
+    async def submit(self, audio: np.ndarray, profile: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Queue a segment for batched transcription and wait for its result.
+
+        Args:
+            audio: Audio data as numpy array
+            profile: Decoding profile name, if None the default profile is used
+
+        Returns:
+            Tuple of transcribed text and metadata
+            
+        Raises:
+            RuntimeError: If the scheduler has been closed
+        """
+        if self._closed:
+            raise RuntimeError("Batching scheduler is closed")
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((audio, profile, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> None:
+        """Group queued segments into batches and dispatch them."""
+        acquire: Optional[asyncio.Future] = None
+        get: Optional[asyncio.Future] = None
+        try:
+            while True:
+                self._batch = [await self._queue.get()]
+
+                # Wait up to max_wait for the batch to fill
+                deadline = time.perf_counter() + self.max_wait_ms / 1000
+                while len(self._batch) < self.max_batch_size:
+                    timeout = deadline - time.perf_counter()
+                    if timeout <= 0:
+                        break
+                    try:
+                        self._batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                # Keep filling the batch while all workers are busy
+                acquire = asyncio.ensure_future(self._slots.acquire())
+                while len(self._batch) < self.max_batch_size and not acquire.done():
+                    get = asyncio.ensure_future(self._queue.get())
+                    await asyncio.wait({acquire, get}, return_when=asyncio.FIRST_COMPLETED)
+                    if get.done():
+                        self._batch.append(get.result())
+                    else:
+                        get.cancel()
+                    get = None
+                await acquire
+                acquire = None
+
+                batch, self._batch = self._batch, []
+                self._start_dispatch(batch)
+        finally:
+            # Cancelled by close(): keep a segment taken off the queue and give back a slot
+            # acquired in the same instant, so close() can still dispatch them
+            if get is not None:
+                if get.done() and not get.cancelled():
+                    self._batch.append(get.result())
+                else:
+                    get.cancel()
+            if acquire is not None:
+                if acquire.done() and not acquire.cancelled():
+                    self._slots.release()
+                else:
+                    acquire.cancel()
+
+    def _start_dispatch(self, batch: list) -> None:
+        """Run a batch in the background, holding a reference until it finishes."""
+        task = asyncio.create_task(self._dispatch(batch))
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: List[Tuple[np.ndarray, Optional[str], asyncio.Future, float]]) -> None:
+        """
+        Run one batch and hand the results back to the waiting coroutines.
+
+        Segments that asked for different decoding profiles cannot share a
+        decode, so a mixed batch runs as one decode per profile within the
+        same worker slot.
+
+        Args:
+            batch: List of (audio, profile, future, enqueue time) tuples
+        """
+        try:
+            self.batches += 1
+            self.segments += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+            groups: Dict[Optional[str], list] = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+
+            for profile, group in groups.items():
+                dispatched_at = time.perf_counter()
+                results = await self.run_batch([audio for audio, _, _, _ in group], profile)
+
+                for (_, _, future, enqueued_at), (text, metadata) in zip(group, results):
+                    metadata["batch_wait_time"] = dispatched_at - enqueued_at
+                    if not future.done():
+                        future.set_result((text, metadata))
+        except Exception as e:
+            logger.error(f"Batch dispatch error: {e}")
+            for _, _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the current batching statistics.
+
+        Returns:
+            Dict containing batch counts and sizes
+        """
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "pending": self.pending,
+            "batches": self.batches,
+            "average_batch_size": self.segments / self.batches if self.batches else 0,
+            "largest_batch": self.largest_batch
+        }
+
+    async def close(self) -> None:
+        """
+        Stop accepting segments and finish the ones already submitted.
+
+        Segments still queued or in the batch being built are dispatched,
+        and running batches are awaited, so no caller of submit() is left
+        waiting on a result that never comes.
+        """
+        self._closed = True
+        if self._collector and not self._collector.done():
+            self._collector.cancel()
+            try:
+                await self._collector
+            except asyncio.CancelledError:
+                pass
+
+        remaining, self._batch = self._batch, []
+        while self._queue is not None and not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        for start in range(0, len(remaining), self.max_batch_size):
+            await self._slots.acquire()
+            self._start_dispatch(remaining[start:start + self.max_batch_size])
+
+        if self._dispatches:
+            await asyncio.gather(*self._dispatches, return_exceptions=True)
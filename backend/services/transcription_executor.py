@@ -0,0 +1,300 @@
+"""
+Transcription Executor Service
+
+Runs Whisper transcription on a dedicated worker pool so that ASR for one
+connection never blocks the event loop serving the others.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from .transcription import WhisperTranscriber
+from .transcription_batcher import BatchingScheduler
+from .vad import SpeechDetector
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class TranscriptionExecutor:
+    """
+    Worker pool that owns one or more WhisperTranscriber instances.
+
+    Each worker is a thread that checks out its own transcriber (and therefore
+    its own WhisperModel with its own CTranslate2 thread settings) for the
+    duration of a request. CTranslate2 releases the GIL while decoding, so
+    threads give real parallelism without the cost of copying audio between
+    processes.
+    """
+
+    def __init__(
+        self,
+        model_size: str = "base",
+        workers: int = 1,
+        device: str = None,
+        compute_type: str = None,
+        beam_size: Optional[int] = None,
+        sample_rate: int = 44100,
+        cpu_threads: int = 0,
+        num_workers: int = 1,
+        max_batch_size: int = 1,
+        max_batch_wait_ms: float = 5.0,
+        vad: Optional[SpeechDetector] = None,
+        decoding_profile: str = "balanced"
+    ):
+        """
+        Initialize the transcription executor.
+
+        Args:
+            model_size: Whisper model size (tiny.en, base.en, small.en, medium.en, large)
+            workers: Number of worker threads (each owns its own model instance)
+            device: Device to run models on ('cpu' or 'cuda'), if None will auto-detect
+            compute_type: Model computation type, if None will select based on device
+            beam_size: Beam size for decoding, if None the decoding profile's beam size is used
+            sample_rate: Audio sample rate in Hz
+            cpu_threads: CTranslate2 threads per worker model (0 lets CTranslate2 decide)
+            num_workers: CTranslate2 workers per worker model
+            max_batch_size: Segments decoded together across sessions (1 disables batching)
+            max_batch_wait_ms: How long a segment may wait for others to join its batch
+            vad: Optional speech detector shared by all workers to trim silence before decoding
+            decoding_profile: Default decoding profile (realtime, balanced, accurate)
+        """
+        self.model_size = model_size
+        self.workers = max(1, workers)
+        self.vad = vad
+
+        # Each worker gets its own transcriber; idle ones wait in this queue
+        self._transcribers: List[WhisperTranscriber] = []
+        self._idle: "queue.SimpleQueue[WhisperTranscriber]" = queue.SimpleQueue()
+        for _ in range(self.workers):
+            transcriber = WhisperTranscriber(
+                model_size=model_size,
+                device=device,
+                compute_type=compute_type,
+                beam_size=beam_size,
+                sample_rate=sample_rate,
+                cpu_threads=cpu_threads,
+                num_workers=num_workers,
+                vad=vad,
+                decoding_profile=decoding_profile
+            )
+            self._transcribers.append(transcriber)
+            self._idle.put(transcriber)
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="whisper-worker"
+        )
+
+        # Counters (guarded by the lock since workers update them from threads)
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+
+        # Cross-session micro-batching in front of the workers (optional)
+        self.batcher: Optional[BatchingScheduler] = None
+        if max_batch_size > 1:
+            self.batcher = BatchingScheduler(
+                self.transcribe_batch_async,
+                max_batch_size=max_batch_size,
+                max_wait_ms=max_batch_wait_ms,
+                concurrency=self.workers
+            )
+
+        logger.info(f"Initialized Transcription Executor with {self.workers} worker(s), "
+                   f"cpu_threads={cpu_threads}, num_workers={num_workers}")
+
+    @property
+    def is_processing(self) -> bool:
+        """Whether any worker is currently transcribing."""
+        return self._active > 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for a free worker (including unbatched segments)."""
+        with self._lock:
+            depth = self._submitted - self._active
+        return depth + (self.batcher.pending if self.batcher else 0)
+
+    def _run(self, audio: np.ndarray, profile: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Transcribe on the calling worker thread with a checked-out transcriber.
+
+        Args:
+            audio: Audio data as numpy array
+            profile: Decoding profile name, if None the default profile is used
+
+        Returns:
+            Tuple of transcribed text and metadata
+        """
+        return self._checkout(lambda transcriber: [transcriber.transcribe(audio, profile)])[0]
+
+    def _run_batch(self, audios: List[np.ndarray],
+                   profile: Optional[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Transcribe a batch on the calling worker thread with a checked-out transcriber.
+
+        Args:
+            audios: List of audio data arrays
+            profile: Decoding profile name shared by the whole batch
+
+        Returns:
+            List of (text, metadata) tuples in input order
+        """
+        return self._checkout(lambda transcriber: transcriber.transcribe_batch(audios, profile))
+
+    def _checkout(self, work) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Run work against an idle transcriber, updating the pool counters.
+
+        Args:
+            work: Callable taking a WhisperTranscriber and returning results
+
+        Returns:
+            The results produced by work
+        """
+        transcriber = self._idle.get()
+        with self._lock:
+            self._active += 1
+
+        try:
+            results = work(transcriber)
+            with self._lock:
+                for _, metadata in results:
+                    if "error" in metadata:
+                        self._failed += 1
+                    else:
+                        self._completed += 1
+            return results
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._submitted -= 1
+            self._idle.put(transcriber)
+
+    def transcribe(self, audio: np.ndarray, profile: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Transcribe audio synchronously on the calling thread.
+
+        Args:
+            audio: Audio data as numpy array
+            profile: Decoding profile name, if None the default profile is used
+
+        Returns:
+            Tuple of transcribed text and metadata
+        """
+        with self._lock:
+            self._submitted += 1
+        return self._run(audio, profile)
+
+    async def transcribe_async(self, audio: np.ndarray, profile: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Transcribe audio on the worker pool without blocking the event loop.
+
+        Args:
+            audio: Audio data as numpy array
+            profile: Decoding profile name, if None the default profile is used
+
+        Returns:
+            Tuple of transcribed text and metadata
+        """
+        if self.batcher is not None:
+            return await self.batcher.submit(audio, profile)
+
+        with self._lock:
+            self._submitted += 1
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._run, audio, profile)
+
+    async def transcribe_batch_async(self, audios: List[np.ndarray],
+                                     profile: Optional[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Transcribe a batch of segments in one decode on the worker pool.
+
+        Args:
+            audios: List of audio data arrays
+            profile: Decoding profile name shared by the whole batch
+
+        Returns:
+            List of (text, metadata) tuples in input order
+        """
+        with self._lock:
+            self._submitted += 1
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._run_batch, audios, profile)
+
+    async def transcribe_segments_async(self, audio: np.ndarray,
+                                        profile: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Decode 16 kHz float32 audio into timestamped segments on the worker pool.
+
+        Args:
+            audio: Float32 audio samples at 16 kHz
+            profile: Decoding profile name, if None the default profile is used
+
+        Returns:
+            Tuple of segment list and metadata
+        """
+        with self._lock:
+            self._submitted += 1
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            lambda: self._checkout(lambda transcriber: [transcriber.transcribe_segments(audio, profile=profile)])[0]
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the current pool statistics.
+
+        Returns:
+            Dict containing worker utilisation and queue depth
+        """
+        with self._lock:
+            stats = {
+                "workers": self.workers,
+                "active": self._active,
+                "queue_depth": self._submitted - self._active,
+                "completed": self._completed,
+                "failed": self._failed
+            }
+        if self.batcher is not None:
+            stats["queue_depth"] += self.batcher.pending
+            stats["batching"] = self.batcher.get_stats()
+        if self.vad is not None:
+            stats["vad"] = self.vad.get_stats()
+        return stats
+
+    def get_config(self) -> Dict[str, Any]:
+        """
+        Get the current configuration.
+
+        Returns:
+            Dict containing the current configuration
+        """
+        config = self._transcribers[0].get_config()
+        config["is_processing"] = self.is_processing
+        config.update(self.get_stats())
+        return config
+
+    async def close(self) -> None:
+        """Stop batching and wait for running transcriptions to finish."""
+        if self.batcher is not None:
+            await self.batcher.close()
+        await asyncio.to_thread(self.shutdown)
+
+    def shutdown(self) -> None:
+        """Stop accepting work and wait for running transcriptions to finish."""
+        self._executor.shutdown(wait=True)
+        logger.info("Transcription executor shut down")
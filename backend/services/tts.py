@@ -4,19 +4,28 @@ Text-to-Speech Service
 Handles communication with the local TTS API endpoint.
 """
 
-import json
-import requests
 import logging
-import io
 import time
-import base64
-import asyncio
-from typing import Dict, Any, List, Optional, BinaryIO, Generator, AsyncGenerator
+from typing import Dict, Any, Optional, AsyncGenerator, Iterable, NamedTuple
+
+import httpx
+
+from .metrics import LatencyStats
+from .http_pool import HTTPConnectionPool
+from .audio_processing import WavStreamSplitter
+from .tts_cache import TTSCache, cache_key
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class AudioChunk(NamedTuple):
+    """A piece of synthesized audio ready to send to the client."""
+    data: bytes
+    format: str  # "pcm" for pieces of a split WAV stream, otherwise the TTS output format
+    header: Optional[bytes] = None  # WAV header, on the first piece of a split stream
+    stream_end: Optional[bool] = None  # For parts of an encoded stream (see OpusTranscoder): whether it is the last
+
 class TTSClient:
     """
     Client for communicating with a local TTS API.
@@ -33,7 +42,10 @@ class TTSClient:
         output_format: str = "wav",
         speed: float = 1.0,
         timeout: int = 60,
-        chunk_size: int = 4096
+        chunk_size: int = 4096,
+        http_pool: Optional[HTTPConnectionPool] = None,
+        stream_chunk_ms: float = 250.0,
+        cache: Optional[TTSCache] = None
     ):
         """
         Initialize the TTS client.
@@ -44,8 +56,11 @@ class TTSClient:
             voice: Voice to use for synthesis
             output_format: Output audio format (mp3, opus, aac, flac)
             speed: Speech speed multiplier (0.25 to 4.0)
-            timeout: Request timeout in seconds
+            timeout: Read timeout in seconds (when the client creates its own pool)
             chunk_size: Size of audio chunks to stream in bytes
+            http_pool: Shared keep-alive connection pool, if None a private one is created
+            stream_chunk_ms: Audio per piece when splitting streamed WAV (0 to send whole files)
+            cache: Cache of synthesized audio for repeated texts, if any
         """
         self.api_endpoint = api_endpoint
         self.model = model
@@ -54,45 +69,96 @@ class TTSClient:
         self.speed = speed
         self.timeout = timeout
         self.chunk_size = chunk_size
+        self.stream_chunk_ms = stream_chunk_ms
+        self.cache = cache
+        
+        # Keep-alive connection pool (shared with the other HTTP services when given)
+        self._owns_pool = http_pool is None
+        self.http_pool = http_pool or HTTPConnectionPool(read_timeout=timeout)
         
         # State tracking
         self.is_processing = False
         self.last_processing_time = 0
         
+        # Latency statistics per synthesis request
+        self.time_to_first_byte = LatencyStats()
+        self.time_to_last_byte = LatencyStats()
+        
         logger.info(f"Initialized TTS Client with endpoint={api_endpoint}, "
                    f"model={model}, voice={voice}")
     
-    def text_to_speech(self, text: str) -> bytes:
+    def _build_payload(self, text: str) -> Dict[str, Any]:
+        """
+        Build the speech request payload.
+        
+        Args:
+            text: Text to convert to speech
+            
+        Returns:
+            Request payload for the TTS API
+        """
+        return {
+            "model": self.model,
+            "input": text,
+            "voice": self.voice,
+            "response_format": self.output_format,
+            "speed": self.speed
+        }
+    
+    def _cache_key(self, text: str) -> Optional[str]:
+        """
+        Get the cache key of a text with the current synthesis settings.
+        
+        Args:
+            text: Text to convert to speech
+            
+        Returns:
+            The cache key, or None if there is no cache or the text is not cached
+        """
+        if self.cache is None or not self.cache.cacheable(text):
+            return None
+        return cache_key(text, self.voice, self.model, self.speed, self.output_format)
+    
+    async def async_text_to_speech(self, text: str) -> bytes:
+        """
+        Convert text to speech audio, from the cache if it was synthesized before.
+        
+        Args:
+            text: Text to convert to speech
+            
+        Returns:
+            Complete audio data as bytes
+        """
+        key = self._cache_key(text)
+        if key is not None:
+            audio_data = self.cache.get(key)
+            if audio_data is not None:
+                logger.info(f"Using cached TTS audio for {len(text)} characters of text")
+                return audio_data
+        
+        audio_data = await self._synthesize(text)
+        if key is not None:
+            self.cache.put(key, audio_data)
+        return audio_data
+    
+    async def _synthesize(self, text: str) -> bytes:
         """
-        Convert text to speech audio.
+        Request the complete audio of a text from the TTS API.
         
         Args:
             text: Text to convert to speech
             
         Returns:
-            Audio data as bytes
+            Complete audio data as bytes
         """
         self.is_processing = True
         start_time = time.time()
         
         try:
-            # Prepare request payload
-            payload = {
-                "model": self.model,
-                "input": text,
-                "voice": self.voice,
-                "response_format": self.output_format,
-                "speed": self.speed
-            }
-            
             logger.info(f"Sending TTS request with {len(text)} characters of text")
             
-            # Send request to TTS API
-            response = requests.post(
-                self.api_endpoint,
-                json=payload,
-                timeout=self.timeout
-            )
+            # Send request to TTS API over a pooled keep-alive connection
+            response = await self.http_pool.request("POST", self.api_endpoint, json=self._build_payload(text))
             
             # Check if request was successful
             response.raise_for_status()
@@ -100,15 +166,16 @@ class TTSClient:
             # Get audio content
             audio_data = response.content
             
-            # Calculate processing time
+            # Calculate processing time (time to first byte is only measured on streamed requests)
             self.last_processing_time = time.time() - start_time
+            self.time_to_last_byte.record(self.last_processing_time)
             
             logger.info(f"Received TTS response after {self.last_processing_time:.2f}s, "
                        f"size: {len(audio_data)} bytes")
             
             return audio_data
             
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"TTS API request error: {e}")
             raise
         except Exception as e:
@@ -117,7 +184,7 @@ class TTSClient:
         finally:
             self.is_processing = False
     
-    def stream_text_to_speech(self, text: str) -> Generator[bytes, None, None]:
+    async def stream_text_to_speech(self, text: str) -> AsyncGenerator[bytes, None]:
         """
         Stream audio data from the TTS API.
         
@@ -131,50 +198,26 @@ class TTSClient:
         start_time = time.time()
         
         try:
-            # Prepare request payload
-            payload = {
-                "model": self.model,
-                "input": text,
-                "voice": self.voice,
-                "response_format": self.output_format,
-                "speed": self.speed
-            }
-            
             logger.info(f"Sending streaming TTS request with {len(text)} characters of text")
             
-            # Send request to TTS API
-            with requests.post(
-                self.api_endpoint,
-                json=payload,
-                timeout=self.timeout,
-                stream=True
-            ) as response:
+            async with self.http_pool.stream("POST", self.api_endpoint, json=self._build_payload(text)) as response:
                 response.raise_for_status()
                 
-                # Check if streaming is supported by the API
-                is_chunked = response.headers.get('transfer-encoding', '') == 'chunked'
-                
-                if is_chunked:
-                    # The API supports streaming
-                    for chunk in response.iter_content(chunk_size=self.chunk_size):
-                        if chunk:
-                            yield chunk
-                else:
-                    # The API doesn't support streaming, but we'll fake it by
-                    # splitting the response into chunks
-                    audio_data = response.content
-                    total_chunks = (len(audio_data) + self.chunk_size - 1) // self.chunk_size
-                    
-                    for i in range(total_chunks):
-                        start_idx = i * self.chunk_size
-                        end_idx = min(start_idx + self.chunk_size, len(audio_data))
-                        yield audio_data[start_idx:end_idx]
+                # Chunked responses arrive incrementally; others are re-chunked as they are read
+                first_byte = True
+                async for chunk in response.aiter_bytes(chunk_size=self.chunk_size):
+                    if chunk:
+                        if first_byte:
+                            first_byte = False
+                            self.time_to_first_byte.record(time.time() - start_time)
+                        yield chunk
                 
             # Calculate processing time
             self.last_processing_time = time.time() - start_time
+            self.time_to_last_byte.record(self.last_processing_time)
             logger.info(f"Completed TTS streaming after {self.last_processing_time:.2f}s")
             
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"TTS API streaming request error: {e}")
             raise
         except Exception as e:
@@ -183,30 +226,115 @@ class TTSClient:
         finally:
             self.is_processing = False
     
-    async def async_text_to_speech(self, text: str) -> bytes:
+    async def stream_audio(self, text: str) -> AsyncGenerator[AudioChunk, None]:
         """
-        Asynchronously generate audio data from the TTS API.
+        Stream speech as pieces the client can play as soon as each arrives.
         
-        This method provides asynchronous TTS capability by running
-        the synchronous method in a thread.
+        WAV output is split at sample frame boundaries into pieces of
+        stream_chunk_ms, with the header on the first piece only. Other
+        formats, and WAV the splitter cannot handle, are sent as one
+        complete file. Cached audio is split the same way without a TTS
+        request; streamed audio is cached once it is complete.
         
         Args:
             text: Text to convert to speech
             
+        Yields:
+            Audio pieces in playback order
+        """
+        if self.output_format != "wav" or self.stream_chunk_ms <= 0:
+            yield AudioChunk(await self.async_text_to_speech(text), self.output_format)
+            return
+        
+        key = self._cache_key(text)
+        cached = self.cache.get(key) if key is not None else None
+        if cached is not None:
+            logger.info(f"Streaming cached TTS audio for {len(text)} characters of text")
+            source = self._replay(cached)
+        else:
+            source = self.stream_text_to_speech(text)
+        complete = bytearray() if key is not None and cached is None else None  # Audio to cache
+        
+        splitter: Optional[WavStreamSplitter] = WavStreamSplitter(self.stream_chunk_ms)
+        received = bytearray()  # Kept until the header is parsed, in case the stream is not splittable
+        header_sent = False
+        async for data in source:
+            if complete is not None:
+                complete += data
+            if splitter is None:
+                received += data
+                continue
+            if splitter.header is None:
+                received += data
+            try:
+                pieces = splitter.feed(data)
+            except ValueError as e:
+                logger.warning(f"Cannot split TTS audio, sending it whole: {e}")
+                splitter = None
+                continue
+            if splitter.header is not None:
+                received = bytearray()
+            for piece in pieces:
+                yield AudioChunk(piece, "pcm", None if header_sent else splitter.header)
+                header_sent = True
+        
+        if complete is not None:
+            self.cache.put(key, bytes(complete))
+        
+        if splitter is None:
+            yield AudioChunk(bytes(received), self.output_format)
+            return
+        for piece in splitter.flush():
+            yield AudioChunk(piece, "pcm", None if header_sent else splitter.header)
+            header_sent = True
+    
+    @staticmethod
+    async def _replay(audio: bytes) -> AsyncGenerator[bytes, None]:
+        """Stream cached audio like a TTS response."""
+        yield audio
+    
+    async def preload(self, phrases: Iterable[str]) -> int:
+        """
+        Synthesize phrases that are not cached yet, so their first use is a cache hit.
+        
+        Args:
+            phrases: Texts to cache
+            
         Returns:
-            Complete audio data as bytes
+            Number of phrases synthesized
         """
-        self.is_processing = True
+        if self.cache is None:
+            return 0
         
-        try:
-            # Get complete audio data
-            audio_data = await asyncio.to_thread(self.text_to_speech, text)
-            return audio_data
-        except Exception as e:
-            logger.error(f"Async TTS error: {e}")
-            raise
-        finally:
-            self.is_processing = False
+        synthesized = 0
+        for phrase in phrases:
+            key = self._cache_key(phrase)
+            if key is None or self.cache.contains(key):
+                continue
+            try:
+                self.cache.put(key, await self._synthesize(phrase))
+                synthesized += 1
+            except Exception as e:
+                logger.error(f"Failed to preload TTS audio for {phrase[:40]!r}: {e}")
+        logger.info(f"Preloaded TTS cache with {synthesized} new phrase(s)")
+        return synthesized
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the synthesis latency statistics.
+        
+        Returns:
+            Dict containing time to first and last audio byte summaries
+        """
+        return {
+            "time_to_first_byte": self.time_to_first_byte.summary(),
+            "time_to_last_byte": self.time_to_last_byte.summary()
+        }
+    
+    async def close(self) -> None:
+        """Close the connection pool if this client created it."""
+        if self._owns_pool:
+            await self.http_pool.close()
     
     def get_config(self) -> Dict[str, Any]:
         """
@@ -223,6 +351,8 @@ class TTSClient:
             "speed": self.speed,
             "timeout": self.timeout,
             "chunk_size": self.chunk_size,
+            "stream_chunk_ms": self.stream_chunk_ms,
+            "cache": self.cache is not None,
             "is_processing": self.is_processing,
             "last_processing_time": self.last_processing_time
         }
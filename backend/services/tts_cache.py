@@ -0,0 +1,285 @@
+"""
+TTS Cache Service
+
+Content-addressed cache of synthesized speech. Greetings, follow-ups,
+apologies and other short replies recur across turns and sessions, so
+their audio is kept by a hash of the normalized text and the synthesis
+settings (voice, model, speed, format). Recent entries are held in memory
+within a byte budget; all entries are also written to disk, where they
+survive restarts and are read back through memory maps.
+"""
+
+import os
+import mmap
+import hashlib
+import logging
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Phrases the backend itself speaks, cached at startup in addition to any configured list
+DEFAULT_PHRASES = [
+    "I'm sorry, I encountered an unexpected error. Please try again.",
+]
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text so trivially different spellings share a cache entry.
+
+    Unicode is composed (NFC) and runs of whitespace collapse to one space.
+    Case and punctuation are kept, since they change the prosody.
+
+    Args:
+        text: Text to be synthesized
+
+    Returns:
+        The normalized text
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def cache_key(text: str, voice: str, model: str, speed: float, output_format: str) -> str:
+    """
+    Get the cache key of a synthesis request.
+
+    Args:
+        text: Text to be synthesized
+        voice: Voice used
+        model: TTS model used
+        speed: Speech speed multiplier
+        output_format: Audio format returned
+
+    Returns:
+        SHA-256 hex digest of the normalized text and the settings
+    """
+    identity = "\x1f".join([normalize_text(text), voice, model, f"{speed:g}", output_format])
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+def load_phrases(path: str) -> List[str]:
+    """
+    Read a phrase list (one phrase per line, blank lines and # comments skipped).
+
+    Args:
+        path: Text file with the phrases
+
+    Returns:
+        The phrases, or an empty list if the file cannot be read
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+    except OSError as e:
+        logger.error(f"Failed to read TTS cache phrase list {path}: {e}")
+        return []
+
+class TTSCache:
+    """
+    Two-tier cache of synthesized audio keyed by cache_key().
+
+    The memory tier is an LRU of audio bytes within memory_budget_bytes.
+    The disk tier keeps one file per entry under disk_dir (written
+    atomically, least recently used files removed beyond
+    disk_budget_bytes) and is read through memory maps; disk hits are
+    promoted to the memory tier. Either tier can be disabled with a zero
+    budget or an empty directory. Only texts up to max_chars characters
+    are cached, since long replies rarely repeat.
+    """
+
+    def __init__(
+        self,
+        memory_budget_bytes: int = 32 * 1024 * 1024,
+        disk_dir: Optional[str] = os.path.join("cache", "tts"),
+        disk_budget_bytes: int = 512 * 1024 * 1024,
+        max_chars: int = 200
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            memory_budget_bytes: Audio bytes kept in memory (0 to disable the memory tier)
+            disk_dir: Directory of the disk tier (None or empty to disable it)
+            disk_budget_bytes: Audio bytes kept on disk (0 for no limit)
+            max_chars: Longest text cached
+        """
+        self.memory_budget_bytes = memory_budget_bytes
+        self.disk_dir = disk_dir or None
+        self.disk_budget_bytes = disk_budget_bytes
+        self.max_chars = max_chars
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key -> file size, least recently used first
+        self._disk_bytes = 0
+
+        if self.disk_dir:
+            self._scan_disk()
+
+        # Statistics
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+        logger.info(f"Initialized TTS Cache with memory_budget={memory_budget_bytes / 1024 / 1024:.0f}MB, "
+                   f"disk_dir={self.disk_dir}, {len(self._disk)} entries on disk")
+
+    def cacheable(self, text: str) -> bool:
+        """Whether a text is short enough to be cached."""
+        return 0 < len(text.strip()) <= self.max_chars
+
+    def _path(self, key: str) -> str:
+        """Get the disk tier file of an entry."""
+        return os.path.join(self.disk_dir, key[:2], key)
+
+    def _scan_disk(self) -> None:
+        """Index the entries already on disk, oldest access first."""
+        entries = []
+        try:
+            for prefix in os.listdir(self.disk_dir):
+                directory = os.path.join(self.disk_dir, prefix)
+                if not os.path.isdir(directory):
+                    continue
+                for name in os.listdir(directory):
+                    if name.endswith(".tmp"):
+                        continue
+                    stat = os.stat(os.path.join(directory, name))
+                    entries.append((stat.st_mtime, name, stat.st_size))
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.error(f"Failed to scan TTS cache directory {self.disk_dir}: {e}")
+            return
+
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        """Read an entry from the disk tier through a memory map."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    audio = mapped[:]
+            os.utime(path)  # Access time for LRU order across restarts
+        except (OSError, ValueError) as e:
+            # Missing, unreadable or empty file
+            logger.warning(f"Dropping unreadable TTS cache entry {key[:12]}: {e}")
+            self._remove_disk(key)
+            return None
+
+        self._disk.move_to_end(key)
+        return audio
+
+    def _write_disk(self, key: str, audio: bytes) -> None:
+        """Write an entry to the disk tier atomically, evicting old entries if needed."""
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(audio)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.error(f"Failed to write TTS cache entry {key[:12]}: {e}")
+            return
+
+        self._disk_bytes += len(audio) - self._disk.pop(key, 0)
+        self._disk[key] = len(audio)
+        while self.disk_budget_bytes and self._disk_bytes > self.disk_budget_bytes and len(self._disk) > 1:
+            oldest = next(iter(self._disk))
+            self._remove_disk(oldest)
+            self.evictions += 1
+
+    def _remove_disk(self, key: str) -> None:
+        """Delete an entry from the disk tier."""
+        self._disk_bytes -= self._disk.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _remember(self, key: str, audio: bytes) -> None:
+        """Put an entry in the memory tier, evicting the least recently used ones."""
+        if len(audio) > self.memory_budget_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+        while self._memory_bytes > self.memory_budget_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Look up cached audio, counting the hit or miss.
+
+        Args:
+            key: Cache key of the request
+
+        Returns:
+            The audio, or None if it is not cached
+        """
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+        elif self.disk_dir and key in self._disk:
+            audio = self._read_disk(key)
+            if audio is not None:
+                self.disk_hits += 1
+                self._remember(key, audio)
+
+        if audio is None:
+            self.misses += 1
+            return None
+        self.bytes_saved += len(audio)
+        return audio
+
+    def contains(self, key: str) -> bool:
+        """Whether an entry is cached, without counting a hit or miss."""
+        return key in self._memory or (self.disk_dir is not None and key in self._disk)
+
+    def put(self, key: str, audio: bytes) -> None:
+        """
+        Store synthesized audio in both tiers.
+
+        Args:
+            key: Cache key of the request
+            audio: Complete audio file
+        """
+        if not audio:
+            return
+        self._remember(key, audio)
+        if self.disk_dir:
+            self._write_disk(key, audio)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the cache statistics.
+
+        Returns:
+            Dict containing hit counts and ratio, bytes served from the cache and tier sizes
+        """
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": hits / lookups if lookups else None,
+            "bytes_saved": self.bytes_saved,
+            "evictions": self.evictions,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes
+        }
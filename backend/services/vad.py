@@ -0,0 +1,233 @@
+"""
+Voice Activity Detection Service
+
+Trims leading and trailing silence from speech segments and rejects
+segments that contain no speech before they reach the Whisper decoder.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from .audio_processing import WHISPER_SAMPLE_RATE
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SpeechDetector:
+    """
+    Server-side voice activity detector for 16 kHz float32 audio.
+
+    The default "energy" backend classifies fixed-size frames by log energy
+    against an adaptive noise floor, then extends the detected speech region
+    over neighbouring frames with a high zero-crossing rate (unvoiced onsets
+    and endings such as "s" or "f" are quiet but noisy). The "silero" backend
+    additionally runs the small Silero ONNX model bundled with faster-whisper
+    on segments the energy stage accepted.
+    """
+
+    def __init__(
+        self,
+        backend: str = "energy",
+        frame_ms: float = 30.0,
+        energy_floor_db: float = -50.0,
+        noise_margin_db: float = 12.0,
+        zcr_threshold: float = 0.25,
+        padding_ms: float = 200.0,
+        min_speech_ms: float = 150.0,
+        model_threshold: float = 0.5
+    ):
+        """
+        Initialize the speech detector.
+
+        Args:
+            backend: Detection backend ('energy' or 'silero')
+            frame_ms: Analysis frame length in milliseconds
+            energy_floor_db: Frames quieter than this (dBFS) are never speech
+            noise_margin_db: How far above the estimated noise floor speech must be
+            zcr_threshold: Zero-crossing rate above which quiet frames count as unvoiced speech
+            padding_ms: Audio kept on each side of the detected speech
+            min_speech_ms: Segments with less detected speech than this are rejected
+            model_threshold: Speech probability threshold for the model backend
+        """
+        self.backend = backend
+        self.frame_samples = int(frame_ms / 1000 * WHISPER_SAMPLE_RATE)
+        self.energy_floor_db = energy_floor_db
+        self.noise_margin_db = noise_margin_db
+        self.zcr_threshold = zcr_threshold
+        self.padding_samples = int(padding_ms / 1000 * WHISPER_SAMPLE_RATE)
+        self.min_speech_frames = max(1, int(min_speech_ms / frame_ms))
+        self.model_threshold = model_threshold
+
+        # Unvoiced extensions are limited to a typical fricative length
+        self.max_unvoiced_frames = max(1, int(250 / frame_ms))
+
+        if backend == "silero" and not self._load_model():
+            logger.warning("Silero VAD unavailable, falling back to energy detection")
+            self.backend = "energy"
+
+        # Statistics (the detector is shared by all transcription workers)
+        self._lock = threading.Lock()
+        self.segments = 0
+        self.rejected = 0
+        self.input_seconds = 0.0
+        self.saved_seconds = 0.0
+        self.processing_time = 0.0
+
+        logger.info(f"Initialized Speech Detector with backend={self.backend}, "
+                   f"padding_ms={padding_ms}, min_speech_ms={min_speech_ms}")
+
+    def _load_model(self) -> bool:
+        """Load the Silero VAD model shipped with faster-whisper."""
+        try:
+            from faster_whisper.vad import get_speech_timestamps, get_vad_model, VadOptions
+            get_vad_model()
+        except Exception as e:
+            logger.error(f"Failed to load Silero VAD model: {e}")
+            return False
+
+        self._get_speech_timestamps = get_speech_timestamps
+        self._vad_options = VadOptions
+        return True
+
+    def _frame_features(self, audio: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute per-frame log energy and zero-crossing rate.
+
+        Args:
+            audio: Float32 samples at 16 kHz
+
+        Returns:
+            Tuple of (energy in dBFS, zero-crossing rate) arrays, one value per frame
+        """
+        frame_count = -(-len(audio) // self.frame_samples)
+        frames = np.zeros(frame_count * self.frame_samples, dtype=np.float32)
+        frames[:len(audio)] = audio
+        frames = frames.reshape(frame_count, self.frame_samples)
+
+        energy_db = 10 * np.log10(np.einsum("ij,ij->i", frames, frames) / self.frame_samples + 1e-10)
+        crossings = np.count_nonzero(np.diff(np.signbit(frames), axis=1), axis=1)
+        return energy_db, crossings / self.frame_samples
+
+    def _detect_energy(self, audio: np.ndarray) -> Optional[Tuple[int, int]]:
+        """
+        Find the speech region with the energy and zero-crossing detector.
+
+        Args:
+            audio: Float32 samples at 16 kHz
+
+        Returns:
+            Tuple of (first, last) speech frame indices, or None if there is no speech
+        """
+        energy_db, zcr = self._frame_features(audio)
+
+        # Adaptive threshold: a margin above the noise floor, but never above the
+        # loudest frames (a segment that is all speech has no quiet frames)
+        noise_floor = np.percentile(energy_db, 10)
+        threshold = max(self.energy_floor_db,
+                        min(noise_floor + self.noise_margin_db, energy_db.max() - self.noise_margin_db))
+
+        voiced = np.flatnonzero(energy_db > threshold)
+        if len(voiced) < self.min_speech_frames:
+            return None
+        first, last = voiced[0], voiced[-1]
+
+        # Extend over quiet, noisy frames next to the voiced region
+        unvoiced = (zcr > self.zcr_threshold) & (energy_db > noise_floor + 3)
+        before = unvoiced[max(0, first - self.max_unvoiced_frames):first][::-1]
+        after = unvoiced[last + 1:last + 1 + self.max_unvoiced_frames]
+        first -= int(np.argmin(before)) if not before.all() else len(before)
+        last += int(np.argmin(after)) if not after.all() else len(after)
+
+        return int(first), int(last)
+
+    def _detect_model(self, audio: np.ndarray) -> Optional[Tuple[int, int]]:
+        """
+        Find the speech region with the Silero model.
+
+        Args:
+            audio: Float32 samples at 16 kHz
+
+        Returns:
+            Tuple of (start, end) speech sample indices, or None if there is no speech
+        """
+        options = self._vad_options(
+            threshold=self.model_threshold,
+            min_speech_duration_ms=int(self.min_speech_frames * self.frame_samples * 1000 / WHISPER_SAMPLE_RATE),
+            speech_pad_ms=0
+        )
+        chunks = self._get_speech_timestamps(audio, options)
+        if not chunks:
+            return None
+        return chunks[0]["start"], chunks[-1]["end"]
+
+    def trim(self, audio: np.ndarray) -> Tuple[Optional[np.ndarray], Dict[str, Any]]:
+        """
+        Trim silence around the speech in a segment.
+
+        Args:
+            audio: Float32 samples at 16 kHz
+
+        Returns:
+            Tuple of (trimmed audio, or None if the segment has no speech) and
+            metadata with the speech and trimmed durations in seconds
+        """
+        start_time = time.perf_counter()
+        input_seconds = len(audio) / WHISPER_SAMPLE_RATE
+
+        region = None
+        if len(audio):
+            region = self._detect_energy(audio)
+            if region is not None:
+                start, end = region[0] * self.frame_samples, (region[1] + 1) * self.frame_samples
+                if self.backend == "silero":
+                    # Only pay for the model on segments the energy stage accepted
+                    region = self._detect_model(audio)
+                    if region is not None:
+                        start, end = region
+
+        if region is None:
+            trimmed = None
+            speech_seconds = 0.0
+            saved_seconds = input_seconds
+        else:
+            start = max(0, start - self.padding_samples)
+            end = min(len(audio), end + self.padding_samples)
+            trimmed = audio[start:end]
+            speech_seconds = len(trimmed) / WHISPER_SAMPLE_RATE
+            saved_seconds = input_seconds - speech_seconds
+
+        elapsed = time.perf_counter() - start_time
+        with self._lock:
+            self.segments += 1
+            self.rejected += trimmed is None
+            self.input_seconds += input_seconds
+            self.saved_seconds += saved_seconds
+            self.processing_time += elapsed
+
+        return trimmed, {
+            "vad_speech_duration": speech_seconds,
+            "vad_trimmed_duration": saved_seconds
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the current detection statistics.
+
+        Returns:
+            Dict containing segment counts and audio seconds saved
+        """
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "segments": self.segments,
+                "rejected": self.rejected,
+                "input_seconds": self.input_seconds,
+                "saved_seconds": self.saved_seconds,
+                "saved_ratio": self.saved_seconds / self.input_seconds if self.input_seconds else 0,
+                "processing_time": self.processing_time
+            }
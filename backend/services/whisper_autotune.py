@@ -0,0 +1,317 @@
+"""
+Whisper Autotuning Service
+
+Benchmarks candidate compute types and CTranslate2 thread settings on the
+current host at startup, and caches the fastest configuration that keeps
+transcripts within an accuracy tolerance.
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import platform
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+import ctranslate2
+import faster_whisper
+
+from .audio_processing import load_wav_pcm, WHISPER_SAMPLE_RATE
+from .transcription import WhisperTranscriber
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Compute types worth trying, most precise first (the first supported one is the reference)
+CPU_COMPUTE_TYPES = ["float32", "int8_float32", "int16", "int8"]
+CUDA_COMPUTE_TYPES = ["float32", "float16", "int8_float16", "int8"]
+
+def cpu_model() -> str:
+    """Return a human-readable name for the host CPU."""
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """
+    Compute the word error rate of a hypothesis against a reference transcript.
+
+    Args:
+        reference: Reference transcript
+        hypothesis: Transcript to score
+
+    Returns:
+        Word-level edit distance divided by the reference length
+    """
+    ref = re.findall(r"[a-z0-9']+", reference.lower())
+    hyp = re.findall(r"[a-z0-9']+", hypothesis.lower())
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    # Single-row Levenshtein distance over words
+    row = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, hyp_word in enumerate(hyp, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (ref_word != hyp_word))
+    return row[-1] / len(ref)
+
+def synthetic_clip(seconds: float = 5.0) -> np.ndarray:
+    """Create a speech-like 16 kHz clip (amplitude-modulated harmonics) for timing only."""
+    t = np.arange(int(seconds * WHISPER_SAMPLE_RATE)) / WHISPER_SAMPLE_RATE
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 3 * t))
+    signal = sum(np.sin(2 * np.pi * f * t) / i for i, f in enumerate((180, 360, 720, 1440), 1))
+    return (0.3 * envelope * signal / 2).astype(np.float32)
+
+class WhisperAutotuner:
+    """
+    Picks compute_type, cpu_threads and num_workers for this host.
+
+    Candidates are compared in two stages: compute type and thread count by
+    single-clip latency, then CTranslate2 workers by throughput with
+    concurrent requests. A candidate is only eligible if its transcript of the
+    benchmark clip stays within the word error rate tolerance of the most
+    precise compute type. Results are cached per CPU model, model size and
+    library version, so later boots skip the benchmark.
+    """
+
+    def __init__(
+        self,
+        model_size: str,
+        device: str = None,
+        workers: int = 1,
+        decoding_profile: str = "balanced",
+        clip_path: Optional[str] = None,
+        cache_path: str = os.path.join("cache", "whisper_autotune.json"),
+        wer_tolerance: float = 0.1,
+        repeats: int = 3
+    ):
+        """
+        Initialize the autotuner.
+
+        Args:
+            model_size: Whisper model size to tune
+            device: Device the models will run on, if None will auto-detect
+            workers: Transcription workers sharing the host (threads are divided between them)
+            decoding_profile: Decoding profile used for the benchmark decodes
+            clip_path: WAV clip of speech to benchmark with (synthetic audio if None or missing)
+            cache_path: JSON file holding tuned settings per host
+            wer_tolerance: Maximum word error rate against the reference transcript
+            repeats: Timed decodes per candidate (the median is used)
+        """
+        self.model_size = model_size
+        self.device = device or ("cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu")
+        self.workers = max(1, workers)
+        self.decoding_profile = decoding_profile
+        self.clip_path = clip_path
+        self.cache_path = cache_path
+        self.wer_tolerance = wer_tolerance
+        self.repeats = max(1, repeats)
+
+    @property
+    def cache_key(self) -> str:
+        """Key identifying the host and software the tuned settings apply to."""
+        return "|".join([
+            cpu_model(),
+            f"{os.cpu_count()} cpus",
+            self.device,
+            self.model_size,
+            f"{self.workers} workers",
+            f"faster-whisper {faster_whisper.__version__}",
+            f"ctranslate2 {ctranslate2.__version__}"
+        ])
+
+    def _load_cache(self) -> Dict[str, Any]:
+        """Load the cache file, returning an empty cache if it is missing or unreadable."""
+        try:
+            with open(self.cache_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self, cache: Dict[str, Any]) -> None:
+        """Write the cache file atomically."""
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            temp_path = f"{self.cache_path}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(cache, f, indent=2)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            logger.error(f"Failed to save autotune cache: {e}")
+
+    def _load_clip(self) -> Tuple[np.ndarray, bool]:
+        """
+        Load the benchmark clip.
+
+        Returns:
+            Tuple of 16 kHz float32 samples and whether the clip contains real speech
+        """
+        if self.clip_path and os.path.exists(self.clip_path):
+            with open(self.clip_path, "rb") as f:
+                samples = load_wav_pcm(f.read())
+            if samples is not None:
+                return samples, True
+            logger.warning(f"Autotune clip {self.clip_path} is not PCM WAV, using synthetic audio")
+        return synthetic_clip(), False
+
+    def _candidates(self) -> Tuple[List[str], List[int], List[int]]:
+        """
+        Build the candidate values for each setting.
+
+        Returns:
+            Tuple of (compute types, cpu thread counts, num_workers values)
+        """
+        supported = ctranslate2.get_supported_compute_types(self.device)
+        preferred = CUDA_COMPUTE_TYPES if self.device == "cuda" else CPU_COMPUTE_TYPES
+        compute_types = [compute_type for compute_type in preferred if compute_type in supported]
+
+        if self.device == "cuda":
+            return compute_types, [0], [1, 2]
+
+        # Threads available to each transcription worker, plus half of that
+        # (hyper-threads rarely help matrix multiplies)
+        per_worker = max(1, (os.cpu_count() or 1) // self.workers)
+        cpu_threads = sorted({per_worker, max(1, per_worker // 2)}, reverse=True)
+        num_workers = [1, 2] if per_worker >= 2 else [1]
+        return compute_types, cpu_threads, num_workers
+
+    def _measure(self, clip: np.ndarray, compute_type: str, cpu_threads: int,
+                 num_workers: int) -> Tuple[float, float, str]:
+        """
+        Load one candidate and time it on the clip.
+
+        Args:
+            clip: 16 kHz float32 benchmark clip
+            compute_type: CTranslate2 compute type
+            cpu_threads: CTranslate2 threads per model
+            num_workers: CTranslate2 workers per model
+
+        Returns:
+            Tuple of (median single-clip latency, clips per second with
+            num_workers concurrent requests, transcript)
+        """
+        transcriber = WhisperTranscriber(
+            model_size=self.model_size,
+            device=self.device,
+            compute_type=compute_type,
+            cpu_threads=cpu_threads,
+            num_workers=num_workers,
+            decoding_profile=self.decoding_profile
+        )
+
+        # The first decode warms up the model and gives the transcript to score
+        text, _ = transcriber.transcribe(clip)
+
+        latencies = []
+        for _ in range(self.repeats):
+            start = time.perf_counter()
+            transcriber.transcribe(clip)
+            latencies.append(time.perf_counter() - start)
+        latency = float(np.median(latencies))
+
+        throughput = 1 / latency
+        if num_workers > 1:
+            with ThreadPoolExecutor(max_workers=num_workers) as pool:
+                start = time.perf_counter()
+                list(pool.map(lambda _: transcriber.transcribe(clip), range(num_workers * self.repeats)))
+                throughput = num_workers * self.repeats / (time.perf_counter() - start)
+
+        return latency, throughput, text
+
+    def tune(self) -> Dict[str, Any]:
+        """
+        Benchmark the candidates and return the chosen settings.
+
+        Returns:
+            Dict with compute_type, cpu_threads, num_workers and the measurements behind them
+        """
+        start_time = time.time()
+        clip, has_speech = self._load_clip()
+        if not has_speech:
+            logger.warning("No speech clip for autotuning; selecting on speed only "
+                           "(set WHISPER_AUTOTUNE_CLIP to enable the accuracy check)")
+
+        compute_types, thread_counts, worker_counts = self._candidates()
+        logger.info(f"Autotuning Whisper {self.model_size} on {cpu_model()}: compute_types={compute_types}, "
+                   f"cpu_threads={thread_counts}, num_workers={worker_counts}")
+
+        # Stage 1: compute type and threads by single-clip latency
+        reference: Optional[str] = None
+        results = []
+        for compute_type in compute_types:
+            for cpu_threads in thread_counts:
+                try:
+                    latency, _, text = self._measure(clip, compute_type, cpu_threads, 1)
+                except Exception as e:
+                    logger.warning(f"Autotune candidate {compute_type}/{cpu_threads} failed: {e}")
+                    continue
+
+                if reference is None:
+                    reference = text
+                wer = word_error_rate(reference, text) if has_speech else 0.0
+                results.append({
+                    "compute_type": compute_type,
+                    "cpu_threads": cpu_threads,
+                    "latency": latency,
+                    "wer": wer
+                })
+                logger.info(f"Autotune {compute_type:<13} cpu_threads={cpu_threads:<3} "
+                           f"latency={latency:.3f}s wer={wer:.3f}")
+
+        eligible = [result for result in results if result["wer"] <= self.wer_tolerance]
+        if not eligible:
+            raise RuntimeError("No autotune candidate could be loaded")
+        best = min(eligible, key=lambda result: result["latency"])
+
+        # Stage 2: CTranslate2 workers by concurrent throughput
+        best["num_workers"] = 1
+        best["throughput"] = 1 / best["latency"]
+        for num_workers in worker_counts[1:]:
+            try:
+                _, throughput, _ = self._measure(clip, best["compute_type"], best["cpu_threads"], num_workers)
+            except Exception as e:
+                logger.warning(f"Autotune num_workers={num_workers} failed: {e}")
+                continue
+            logger.info(f"Autotune num_workers={num_workers} throughput={throughput:.2f} clips/s")
+            if throughput > best["throughput"]:
+                best["num_workers"] = num_workers
+                best["throughput"] = throughput
+
+        best.update({
+            "tuned_at": time.time(),
+            "tuning_time": time.time() - start_time,
+            "accuracy_checked": has_speech,
+            "candidates": len(results)
+        })
+        return best
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Return cached settings for this host, tuning and caching them first if needed.
+
+        Returns:
+            Dict with compute_type, cpu_threads and num_workers
+        """
+        cache = self._load_cache()
+        key = self.cache_key
+        if key in cache:
+            logger.info(f"Using cached Whisper autotune settings for {key}")
+            return cache[key]
+
+        settings = self.tune()
+        cache[key] = settings
+        self._save_cache(cache)
+
+        logger.info(f"Autotuned Whisper in {settings['tuning_time']:.1f}s: compute_type={settings['compute_type']}, "
+                   f"cpu_threads={settings['cpu_threads']}, num_workers={settings['num_workers']}")
+        return settings
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark the raw PCM fast path against container decoding.
+
+Compares the previous path (BytesIO + faster-whisper's PyAV decode_audio)
+with parse-in-place WAV reading and NumPy polyphase resampling, for common
+browser capture rates and utterance lengths.
+
+Usage:
+    python benchmarks/bench_pcm_fast_path.py [--repeat 20]
+"""
+
+import sys
+import os
+import io
+import time
+import argparse
+
+import numpy as np
+
+# Add the repository root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from faster_whisper import decode_audio
+
+from backend.services.audio_processing import load_wav_pcm, WHISPER_SAMPLE_RATE
+from benchmarks.fixtures import make_wav
+
+def time_call(func, repeat: int) -> float:
+    """Return the median time per call in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2] * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=20, help="Calls per measurement")
+    parser.add_argument("--rates", default="44100,48000", help="Comma-separated input sample rates")
+    parser.add_argument("--lengths", default="1,3,10,30", help="Comma-separated clip lengths in seconds")
+    args = parser.parse_args()
+
+    print("🚀 PCM fast path benchmark")
+    print(f"{'rate':>6} {'len (s)':>8} {'decode_audio (ms)':>18} {'fast path (ms)':>15} {'speedup':>8} {'max diff':>9}")
+    print("-" * 70)
+
+    for rate in (int(r) for r in args.rates.split(",")):
+        for seconds in (float(s) for s in args.lengths.split(",")):
+            audio = np.frombuffer(make_wav(seconds, rate), dtype=np.uint8)
+
+            baseline = lambda: decode_audio(io.BytesIO(bytes(audio)), sampling_rate=WHISPER_SAMPLE_RATE)
+            fast = lambda: load_wav_pcm(audio)
+
+            # Both paths should produce the same signal (up to resampler differences)
+            expected, actual = baseline(), fast()
+            length = min(len(expected), len(actual))
+            max_diff = np.abs(expected[:length] - actual[:length]).max()
+
+            baseline_ms = time_call(baseline, args.repeat)
+            fast_ms = time_call(fast, args.repeat)
+            print(f"{rate:>6} {seconds:>8.0f} {baseline_ms:>18.2f} {fast_ms:>15.2f} "
+                  f"{baseline_ms / fast_ms:>7.1f}x {max_diff:>9.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark cross-session micro-batching for Whisper inference.
+
+Simulates N concurrent callers, each sending utterances back to back, and
+reports throughput (utterances per second) against p95 latency with and
+without the batching scheduler.
+
+Usage:
+    python benchmarks/bench_transcription_batching.py [--audio clip.wav] [--model tiny.en]
+"""
+
+import sys
+import os
+import time
+import asyncio
+import argparse
+
+import numpy as np
+
+# Add the repository root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.services.transcription_executor import TranscriptionExecutor
+from benchmarks.fixtures import make_wav
+
+async def run_sessions(executor: TranscriptionExecutor, audio: np.ndarray,
+                       sessions: int, utterances: int):
+    """Run concurrent sessions and return (throughput, p50, p95) in seconds."""
+    latencies = []
+
+    async def session():
+        for _ in range(utterances):
+            start = time.perf_counter()
+            await executor.transcribe_async(audio)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session() for _ in range(sessions)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return len(latencies) / elapsed, p50, p95
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--audio", help="WAV clip to transcribe (synthetic if omitted)")
+    parser.add_argument("--model", default="tiny.en")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--utterances", type=int, default=4, help="Utterances per session")
+    parser.add_argument("--sessions", default="1,2,4,8,16", help="Comma-separated session counts")
+    args = parser.parse_args()
+
+    if args.audio:
+        with open(args.audio, "rb") as f:
+            wav_bytes = f.read()
+    else:
+        wav_bytes = make_wav()
+    audio = np.frombuffer(wav_bytes, dtype=np.uint8)
+
+    modes = {
+        "unbatched": dict(max_batch_size=1),
+        "batched": dict(max_batch_size=args.max_batch_size, max_batch_wait_ms=args.max_wait_ms),
+    }
+
+    print(f"🚀 Whisper batching benchmark (model={args.model}, workers={args.workers})")
+    print(f"{'mode':<10} {'sessions':>8} {'utt/s':>8} {'p50 (s)':>9} {'p95 (s)':>9}")
+    print("-" * 48)
+
+    for mode, options in modes.items():
+        executor = TranscriptionExecutor(model_size=args.model, workers=args.workers, **options)
+        # Warm up the model before measuring
+        await executor.transcribe_async(audio)
+
+        for sessions in (int(n) for n in args.sessions.split(",")):
+            throughput, p50, p95 = await run_sessions(executor, audio, sessions, args.utterances)
+            print(f"{mode:<10} {sessions:>8} {throughput:>8.2f} {p50:>9.3f} {p95:>9.3f}")
+
+        await executor.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark server CPU time per turn for the JSON and binary audio protocols.
+
+A turn is the user's utterance streamed as 16-bit PCM frames followed by
+the spoken reply sent as split WAV pieces. Both run through the
+WebSocketManager's real message handlers and senders against an in-memory
+socket that serializes like Starlette, with transcription stubbed out, so
+the measured CPU time is what the protocol itself costs the server.
+
+Usage:
+    python benchmarks/bench_websocket_protocols.py [--turns 20]
+"""
+
+import sys
+import os
+import json
+import time
+import base64
+import asyncio
+import argparse
+
+import numpy as np
+
+# Add the repository root to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.routes.websocket import WebSocketManager, MessageType
+from backend.services.tts import AudioChunk
+from backend.services.audio_processing import wav_header
+from backend.services.frame_protocol import FrameType, FrameFlag, FrameHeader, AudioFormat, encode_frame
+
+TTS_SAMPLE_RATE = 24000
+
+class MemorySocket:
+    """WebSocket stand-in that serializes outgoing messages as Starlette does and counts the bytes."""
+
+    def __init__(self):
+        self.bytes_sent = 0
+
+    async def send_json(self, data):
+        self.bytes_sent += len(json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+    async def send_bytes(self, data):
+        self.bytes_sent += len(data)
+
+def make_manager(binary: bool) -> WebSocketManager:
+    """Create a manager with only the state the audio paths use."""
+    manager = WebSocketManager.__new__(WebSocketManager)
+    manager.binary_frames = binary
+    manager.audio_turn = 0
+    manager.audio_seq = 0
+    manager.received = 0
+
+    async def handle_audio_stream(websocket, audio_data, sample_rate, final=False, cancel=False):
+        # What the real handler does with the frame before transcription
+        manager.received += len(np.frombuffer(audio_data, dtype=np.int16))
+
+    manager.handle_audio_stream = handle_audio_stream
+    return manager
+
+def client_frames(binary: bool, seconds: float, sample_rate: int, frame_ms: float) -> list:
+    """Build the client's streamed utterance as it arrives at the server (text or bytes messages)."""
+    samples_per_frame = int(sample_rate * frame_ms / 1000)
+    pcm = (np.random.default_rng(0).standard_normal(int(seconds * sample_rate)) * 3000).astype(np.int16)
+    frames = []
+    for start in range(0, len(pcm), samples_per_frame):
+        frame = pcm[start:start + samples_per_frame].tobytes()
+        final = start + samples_per_frame >= len(pcm)
+        if binary:
+            header = FrameHeader(FrameType.AUDIO_STREAM, AudioFormat.PCM_S16LE, FrameFlag.FINAL if final else 0,
+                                 seq=len(frames), sample_rate=sample_rate)
+            frames.append(encode_frame(header, frame))
+        else:
+            frames.append(json.dumps({"type": MessageType.AUDIO_STREAM,
+                                      "audio_data": base64.b64encode(frame).decode("ascii"),
+                                      "sample_rate": sample_rate, "final": final}))
+    return frames
+
+def reply_pieces(seconds: float, chunk_ms: float) -> list:
+    """Build the spoken reply as the TTS client yields it (split WAV pieces)."""
+    pcm = (np.random.default_rng(1).standard_normal(int(seconds * TTS_SAMPLE_RATE)) * 3000).astype(np.int16).tobytes()
+    piece_bytes = int(TTS_SAMPLE_RATE * chunk_ms / 1000) * 2
+    header = wav_header(TTS_SAMPLE_RATE, 1, 16)
+    return [AudioChunk(pcm[i:i + piece_bytes], "pcm", header if i == 0 else None)
+            for i in range(0, len(pcm), piece_bytes)]
+
+async def run_turn(manager: WebSocketManager, websocket: MemorySocket, frames: list, pieces: list) -> None:
+    """Receive an utterance and send a reply the way websocket_endpoint does."""
+    for frame in frames:
+        if isinstance(frame, bytes):
+            await manager.handle_binary_message(websocket, frame)
+        else:
+            await manager.handle_client_message(websocket, json.loads(frame))
+    await manager._send_tts_start(websocket)
+    for piece in pieces:
+        await manager._send_audio_chunk(websocket, piece)
+
+def measure(binary: bool, args) -> dict:
+    """Run the turns for one protocol and return CPU time and bytes per turn."""
+    manager = make_manager(binary)
+    websocket = MemorySocket()
+    frames = client_frames(binary, args.utterance_s, args.sample_rate, args.frame_ms)
+    pieces = reply_pieces(args.reply_s, args.chunk_ms)
+    received_bytes = sum(len(frame) for frame in frames)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(run_turn(manager, websocket, frames, pieces))  # Warm-up
+        websocket.bytes_sent = 0
+        timings = []
+        for _ in range(args.turns):
+            start = time.process_time()
+            loop.run_until_complete(run_turn(manager, websocket, frames, pieces))
+            timings.append(time.process_time() - start)
+    finally:
+        loop.close()
+
+    return {
+        "cpu_ms": sorted(timings)[len(timings) // 2] * 1000,
+        "received_kb": received_bytes / 1024,
+        "sent_kb": websocket.bytes_sent / args.turns / 1024
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, default=20, help="Turns per protocol")
+    parser.add_argument("--utterance-s", type=float, default=5.0, help="Length of the user's utterance")
+    parser.add_argument("--sample-rate", type=int, default=48000, help="Sample rate of the streamed utterance")
+    parser.add_argument("--frame-ms", type=float, default=100.0, help="Audio per streamed client frame")
+    parser.add_argument("--reply-s", type=float, default=10.0, help="Length of the spoken reply")
+    parser.add_argument("--chunk-ms", type=float, default=250.0, help="Audio per reply piece")
+    args = parser.parse_args()
+
+    print("🚀 WebSocket audio protocol benchmark")
+    print(f"Turn: {args.utterance_s:.0f}s utterance at {args.sample_rate} Hz in {args.frame_ms:.0f}ms frames, "
+          f"{args.reply_s:.0f}s reply at {TTS_SAMPLE_RATE} Hz in {args.chunk_ms:.0f}ms pieces")
+    print(f"{'protocol':>9} {'CPU/turn (ms)':>14} {'received (KB)':>14} {'sent (KB)':>10}")
+    print("-" * 51)
+
+    results = {}
+    for name, binary in (("json", False), ("binary", True)):
+        results[name] = measure(binary, args)
+        result = results[name]
+        print(f"{name:>9} {result['cpu_ms']:>14.2f} {result['received_kb']:>14.1f} {result['sent_kb']:>10.1f}")
+
+    print(f"\nBinary frames use {results['json']['cpu_ms'] / results['binary']['cpu_ms']:.1f}x less CPU per turn")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""
+Shared fixtures for the benchmark scripts.
+"""
+
+import io
+import wave
+
+import numpy as np
+
+def make_wav(seconds: float = 3.0, sample_rate: int = 44100) -> bytes:
+    """Create a synthetic speech-like WAV clip (amplitude-modulated harmonics)."""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 3 * t))
+    signal = sum(np.sin(2 * np.pi * f * t) / i for i, f in enumerate((180, 360, 720, 1440), 1))
+    pcm = (0.3 * envelope * signal / 2 * 32767).astype(np.int16)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
@@ -345,10 +345,21 @@ const ChatInterface: React.FC = () => {
         console.log("Empty transcript received, returning to idle");
         setAssistantState('idle');
       } else {
+        setResponse('');
         setAssistantState('processing');
       }
     };
     
+    // Handle partial transcripts while the user is still speaking
+    const handleTranscriptionPartial = (data: any) => {
+      setTranscript(data.text);
+    };
+    
+    // Handle streamed LLM tokens as they arrive
+    const handleLLMDelta = (data: any) => {
+      setResponse(prev => prev + data.text);
+    };
+    
     // Handle LLM response
     const handleLLMResponse = (data: any) => {
       // Store the response text
@@ -408,7 +419,9 @@ const ChatInterface: React.FC = () => {
     websocketService.addEventListener('close', handleConnectionChange);
     websocketService.addEventListener('error', handleConnectionChange);
     websocketService.addEventListener('transcription', handleTranscription);
+    websocketService.addEventListener('transcription_partial', handleTranscriptionPartial);
     websocketService.addEventListener('llm_response', handleLLMResponse);
+    websocketService.addEventListener('llm_delta', handleLLMDelta);
     // Add error handler for non-connection errors
     websocketService.addEventListener('error', handleError);
     
@@ -439,8 +452,11 @@ const ChatInterface: React.FC = () => {
     // Handle TTS audio chunks
     const handleTTSChunk = (data: any) => {
       if (data.audio_chunk) {
-        console.log(`Received TTS chunk (${data.audio_chunk.length} chars), sending to audio service`);
-        audioService.playAudioChunk(data.audio_chunk, data.format || 'mp3');
+        const size = typeof data.audio_chunk === 'string'
+          ? `${data.audio_chunk.length} chars`
+          : `${data.audio_chunk.byteLength} bytes`;
+        console.log(`Received TTS chunk (${size}), sending to audio service`);
+        audioService.playAudioChunk(data.audio_chunk, data.format || 'mp3', data.audio_header, data.stream_end);
       }
     };
     
@@ -455,7 +471,9 @@ const ChatInterface: React.FC = () => {
       websocketService.removeEventListener('close', handleConnectionChange);
       websocketService.removeEventListener('error', handleConnectionChange);
       websocketService.removeEventListener('transcription', handleTranscription);
+      websocketService.removeEventListener('transcription_partial', handleTranscriptionPartial);
       websocketService.removeEventListener('llm_response', handleLLMResponse);
+      websocketService.removeEventListener('llm_delta', handleLLMDelta);
       websocketService.removeEventListener('error', handleError);
       websocketService.removeEventListener('tts_chunk', handleTTSChunk);
       
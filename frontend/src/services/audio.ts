@@ -14,6 +14,8 @@ interface AudioConfig {
   noiseSuppression: boolean;
   autoGainControl: boolean;
   bufferSize: number;
+  streamingAsr: boolean; // Stream PCM frames while speaking so the server can transcribe incrementally
+  streamFrameMs: number; // Audio accumulated per streamed frame
 }
 
 // Default audio configuration
@@ -23,7 +25,9 @@ const DEFAULT_CONFIG: AudioConfig = {
   echoCancellation: true,
   noiseSuppression: true,
   autoGainControl: true,
-  bufferSize: 4096
+  bufferSize: 4096,
+  streamingAsr: true,
+  streamFrameMs: 250
 };
 
 // Audio service state
@@ -47,6 +51,14 @@ export enum AudioEvent {
   AUDIO_STATE_CHANGE = 'audio_state_change'
 }
 
+// Sample format of streamed PCM audio
+interface PcmFormat {
+  formatTag: number;
+  channels: number;
+  sampleRate: number;
+  bitsPerSample: number;
+}
+
 // Event listener interface
 type AudioEventListener = (data: any) => void;
 
@@ -69,6 +81,12 @@ export class AudioService {
   private isSpeaking: boolean = false; // Distinct from isPlaying to track TTS specifically
   private isMuted: boolean = false; // Track microphone mute state
   private currentSource: AudioBufferSourceNode | null = null;
+  private scheduledSources: AudioBufferSourceNode[] = []; // Chunks started or waiting to start
+  private nextStartTime: number = 0; // AudioContext time at which the scheduled audio ends
+  private pcmFormat: PcmFormat | null = null; // Format of the streamed PCM, from its WAV header
+  private playbackChain: Promise<void> = Promise.resolve(); // Keeps chunk decoding in arrival order
+  private playbackGeneration: number = 0; // Bumped by stopPlayback() to drop chunks still decoding
+  private encodedParts: ArrayBuffer[] = []; // Parts of the Opus stream being received
   
   // State tracking (for UI coordination)
   private isProcessing: boolean = false;
@@ -81,6 +99,11 @@ export class AudioService {
   private silenceTimeout: number = 1000; // ms to keep recording after voice drops below threshold
   private lastVoiceTime: number = 0;
   private minRecordingLength: number = 1000; // Minimum ms of audio to send
+  
+  // Streaming ASR state
+  private streamPending: Float32Array[] = []; // Audio not yet sent as a frame
+  private streamPendingLength: number = 0;
+  private streamedLength: number = 0; // Samples already sent for the current utterance
 
   constructor(config: Partial<AudioConfig> = {}) {
     this.config = { ...DEFAULT_CONFIG, ...config };
@@ -354,7 +377,11 @@ export class AudioService {
     
     // Add to buffer if voice is detected or we're in the silence timeout period
     if (this.isVoiceDetected) {
-      this.audioBuffer.push(bufferCopy);
+      if (this.config.streamingAsr) {
+        this.queueStreamFrame(bufferCopy);
+      } else {
+        this.audioBuffer.push(bufferCopy);
+      }
       
       // Check if we've exceeded silence timeout
       const timeSinceVoice = Date.now() - this.lastVoiceTime;
@@ -433,10 +460,81 @@ export class AudioService {
     }
   }
 
+  /**
+   * Convert Float32 samples [-1.0,1.0] to 16-bit PCM
+   */
+  private float32ToInt16(buffers: Float32Array[], totalLength: number): Int16Array {
+    const pcm = new Int16Array(totalLength);
+    let offset = 0;
+    for (const buffer of buffers) {
+      for (let i = 0; i < buffer.length; i++) {
+        const sample = Math.max(-1.0, Math.min(1.0, buffer[i]));
+        pcm[offset + i] = sample < 0 ? sample * 32768 : sample * 32767;
+      }
+      offset += buffer.length;
+    }
+    return pcm;
+  }
+
+  /**
+   * Queue audio for streaming and send a frame once enough has accumulated
+   */
+  private queueStreamFrame(buffer: Float32Array): void {
+    this.streamPending.push(buffer);
+    this.streamPendingLength += buffer.length;
+    
+    const pendingMs = (this.streamPendingLength / this.config.sampleRate) * 1000;
+    if (pendingMs >= this.config.streamFrameMs) {
+      this.flushStreamFrame(false);
+    }
+  }
+
+  /**
+   * Send the pending streamed audio as one PCM frame
+   */
+  private flushStreamFrame(final: boolean): void {
+    const pcm = this.float32ToInt16(this.streamPending, this.streamPendingLength);
+    websocketService.sendAudioStream(pcm, this.config.sampleRate, final);
+    
+    this.streamedLength += this.streamPendingLength;
+    this.streamPending = [];
+    this.streamPendingLength = 0;
+  }
+
+  /**
+   * End the streamed utterance, or cancel it if it should be discarded
+   */
+  private finishAudioStream(): void {
+    const totalLength = this.streamedLength + this.streamPendingLength;
+    if (totalLength === 0) {
+      return;
+    }
+    
+    const audioLengthMs = (totalLength / this.config.sampleRate) * 1000;
+    const discard = this.isProcessing || (!this.isVoiceDetected && audioLengthMs < this.minRecordingLength);
+    
+    if (discard) {
+      console.log(`Discarding streamed utterance (${audioLengthMs.toFixed(0)}ms)`);
+      websocketService.sendAudioStream(new Int16Array(0), this.config.sampleRate, false, true);
+    } else {
+      console.log(`Ending streamed utterance: ${audioLengthMs.toFixed(0)}ms`);
+      this.flushStreamFrame(true);
+    }
+    
+    this.streamPending = [];
+    this.streamPendingLength = 0;
+    this.streamedLength = 0;
+  }
+
   /**
    * Send accumulated audio chunk to WebSocket
    */
   private sendAudioChunk(): void {
+    if (this.config.streamingAsr) {
+      this.finishAudioStream();
+      return;
+    }
+    
     if (this.audioBuffer.length === 0) {
       return;
     }
@@ -484,70 +582,142 @@ export class AudioService {
   /**
    * Play audio from base64-encoded data
    * 
-   * The backend now sends complete audio files instead of chunks,
-   * so we just need to decode and play the entire file at once.
+   * The backend sends either complete audio files, or raw PCM pieces of a
+   * streamed WAV file (format 'pcm'), whose WAV header arrives once with the
+   * first piece. Pieces are queued in arrival order and played back to back,
+   * so playback starts as soon as the first piece arrives. Audio received as
+   * binary WebSocket frames is passed as ArrayBuffers instead of base64.
+   * 
+   * Opus-encoded speech arrives in parts of one Ogg/WebM stream per sentence
+   * (streamEnd set on each part, true on the last); the browser can only
+   * decode such a stream whole, so its parts are collected until it ends.
    * 
    * This method is specifically for playing TTS content and will
    * set the state to SPEAKING rather than just PLAYING.
    */
-  public async playAudioChunk(base64AudioChunk: string, format: string = 'wav'): Promise<void> {
-    try {
-      await this.initAudioContext();
-      
-      if (!this.audioContext) {
-        throw new Error('AudioContext not initialized');
-      }
-      
-      // Convert base64 to ArrayBuffer
-      const audioData = WebSocketService.base64ToArrayBuffer(base64AudioChunk);
-      
-      console.log(`Received complete audio file (${audioData.byteLength} bytes)`);
-      
-      // Decode the audio data
+  public playAudioChunk(audioChunk: string | ArrayBuffer, format: string = 'wav', audioHeader?: string | ArrayBuffer,
+                        streamEnd?: boolean): Promise<void> {
+    const generation = this.playbackGeneration;
+    
+    // Decode in arrival order (decodeAudioData is asynchronous, PCM conversion is not)
+    this.playbackChain = this.playbackChain.then(async () => {
       try {
-        const audioBuffer = await this.audioContext.decodeAudioData(audioData);
+        await this.initAudioContext();
         
-        // Add to queue (instead of immediate playback)
-        this.audioQueue.push(audioBuffer);
+        if (!this.audioContext) {
+          throw new Error('AudioContext not initialized');
+        }
+        
+        // Get the audio bytes
+        let audioData = AudioService.toArrayBuffer(audioChunk);
+        
+        // Collect the parts of an encoded stream until the last one
+        if (streamEnd !== undefined) {
+          this.encodedParts.push(audioData);
+          if (!streamEnd) {
+            return;
+          }
+          audioData = AudioService.concatBuffers(this.encodedParts);
+          this.encodedParts = [];
+        }
+        
+        let audioBuffer: AudioBuffer;
+        try {
+          if (format === 'pcm') {
+            if (audioHeader) {
+              this.pcmFormat = AudioService.parseWavHeader(AudioService.toArrayBuffer(audioHeader));
+            }
+            audioBuffer = this.pcmToAudioBuffer(audioData);
+          } else {
+            console.log(`Received complete audio file (${audioData.byteLength} bytes)`);
+            audioBuffer = await this.audioContext.decodeAudioData(audioData);
+          }
+        } catch (error) {
+          console.error('Error decoding audio data:', error);
+          this.dispatchEvent(AudioEvent.AUDIO_ERROR, { error });
+          return;
+        }
         
-        // Start playback if not already playing
-        if (!this.isPlaying) {
-          this.playNextChunk();
-        } else {
-          console.log(`Added audio buffer to queue: duration=${audioBuffer.duration.toFixed(2)}s`);
+        // Playback was stopped while this chunk was being decoded
+        if (generation !== this.playbackGeneration) {
+          return;
         }
         
+        // Add to queue and schedule it after the audio already playing
+        this.audioQueue.push(audioBuffer);
+        this.playNextChunk();
       } catch (error) {
-        console.error('Error decoding audio data:', error);
+        console.error('Error queueing audio chunk:', error);
         this.dispatchEvent(AudioEvent.AUDIO_ERROR, { error });
       }
-    } catch (error) {
-      console.error('Error queueing audio chunk:', error);
-      this.dispatchEvent(AudioEvent.AUDIO_ERROR, { error });
+    });
+    return this.playbackChain;
+  }
+  
+  /**
+   * Join the parts of an encoded stream into one buffer
+   */
+  private static concatBuffers(parts: ArrayBuffer[]): ArrayBuffer {
+    const joined = new Uint8Array(parts.reduce((total, part) => total + part.byteLength, 0));
+    let offset = 0;
+    parts.forEach(part => {
+      joined.set(new Uint8Array(part), offset);
+      offset += part.byteLength;
+    });
+    return joined.buffer;
+  }
+  
+  /**
+   * Get audio bytes received as base64 (JSON messages) or as a binary frame
+   */
+  private static toArrayBuffer(audio: string | ArrayBuffer): ArrayBuffer {
+    return typeof audio === 'string' ? WebSocketService.base64ToArrayBuffer(audio) : audio;
+  }
+  
+  /**
+   * Read the sample format from a canonical 44-byte WAV header
+   */
+  private static parseWavHeader(header: ArrayBuffer): PcmFormat {
+    const view = new DataView(header);
+    return {
+      formatTag: view.getUint16(20, true),
+      channels: view.getUint16(22, true),
+      sampleRate: view.getUint32(24, true),
+      bitsPerSample: view.getUint16(34, true)
+    };
+  }
+  
+  /**
+   * Convert a piece of streamed PCM (16-bit integer or 32-bit float) to an AudioBuffer
+   */
+  private pcmToAudioBuffer(data: ArrayBuffer): AudioBuffer {
+    if (!this.audioContext || !this.pcmFormat) {
+      throw new Error('PCM audio received before its WAV header');
+    }
+    
+    const { channels, sampleRate, bitsPerSample } = this.pcmFormat;
+    const samples = bitsPerSample === 32 ? new Float32Array(data) : new Int16Array(data);
+    const scale = bitsPerSample === 32 ? 1 : 1 / 32768;
+    const frames = Math.floor(samples.length / channels);
+    const buffer = this.audioContext.createBuffer(channels, frames, sampleRate);
+    
+    // De-interleave into the buffer's channels
+    for (let channel = 0; channel < channels; channel++) {
+      const output = buffer.getChannelData(channel);
+      for (let i = 0; i < frames; i++) {
+        output[i] = samples[i * channels + channel] * scale;
+      }
     }
+    return buffer;
   }
   
   /**
-   * Play next audio chunk from the queue
+   * Schedule the queued audio chunks back to back after the audio already playing
    */
   private playNextChunk(): void {
     console.log(`>> playNextChunk called. Queue length: ${this.audioQueue.length}, isPlaying: ${this.isPlaying}, isSpeaking: ${this.isSpeaking}`);
     
-    if (this.audioQueue.length === 0) {
-      this.isPlaying = false;
-      this.isSpeaking = false;
-      this.audioState = AudioState.INACTIVE;
-      this.dispatchEvent(AudioEvent.PLAYBACK_END, {
-        previousState: AudioState.SPEAKING
-      });
-      console.log('Audio queue empty, playback complete');
-      return;
-    }
-    
-    if (!this.audioContext) return;
-    
-    const buffer = this.audioQueue.shift();
-    if (!buffer) return;
+    if (!this.audioContext || this.audioQueue.length === 0) return;
     
     // Set playback state - only dispatch PLAYBACK_START on the first buffer
     const wasPlaying = this.isPlaying;
@@ -555,37 +725,45 @@ export class AudioService {
     this.isSpeaking = true;
     this.audioState = AudioState.SPEAKING;
     
-    // Create source node
-    const source = this.audioContext.createBufferSource();
-    source.buffer = buffer;
-    source.connect(this.audioContext.destination);
-    
-    // Handle when this chunk ends
-    source.onended = () => {
-      console.log(`Buffer playback ended. Queue length: ${this.audioQueue.length}`);
-      // If there are more chunks, play them
-      if (this.audioQueue.length > 0) {
-        this.playNextChunk();
-      } else {
-        // No more chunks, end playback
-        this.isPlaying = false;
-        this.isSpeaking = false;
-        this.audioState = AudioState.INACTIVE;
-        this.currentSource = null;
-        this.dispatchEvent(AudioEvent.PLAYBACK_END, {
-          previousState: AudioState.SPEAKING
-        });
-        console.log('Last audio chunk complete, playback ended');
-      }
-    };
-    
-    // Keep track of current source for stopping
-    this.currentSource = source;
-    
-    // Start playback with a small delay
-    source.start(this.audioContext.currentTime + 0.05);
-    
-    console.log(`Playing audio buffer: duration=${buffer.duration.toFixed(2)}s, queue remaining: ${this.audioQueue.length}`);
+    while (this.audioQueue.length > 0) {
+      const buffer = this.audioQueue.shift();
+      if (!buffer) break;
+      
+      // Create source node
+      const source = this.audioContext.createBufferSource();
+      source.buffer = buffer;
+      source.connect(this.audioContext.destination);
+      
+      // Handle when this chunk ends
+      source.onended = () => {
+        this.scheduledSources = this.scheduledSources.filter(scheduled => scheduled !== source);
+        if (this.currentSource === source) {
+          this.currentSource = null;
+        }
+        console.log(`Buffer playback ended. Buffers remaining: ${this.scheduledSources.length}`);
+        if (this.scheduledSources.length === 0 && this.audioQueue.length === 0 && this.isPlaying) {
+          // No more chunks, end playback
+          this.isPlaying = false;
+          this.isSpeaking = false;
+          this.audioState = AudioState.INACTIVE;
+          this.dispatchEvent(AudioEvent.PLAYBACK_END, {
+            previousState: AudioState.SPEAKING
+          });
+          console.log('Last audio chunk complete, playback ended');
+        }
+      };
+      
+      // Start right after the previous chunk, or after a small delay if nothing is playing
+      const startTime = Math.max(this.audioContext.currentTime + 0.05, this.nextStartTime);
+      source.start(startTime);
+      this.nextStartTime = startTime + buffer.duration;
+      
+      // Keep track of scheduled sources for stopping
+      this.scheduledSources.push(source);
+      this.currentSource = source;
+      
+      console.log(`Scheduled audio buffer: duration=${buffer.duration.toFixed(2)}s, buffers scheduled: ${this.scheduledSources.length}`);
+    }
     
     // Dispatch playback start event only if we weren't already playing
     if (!wasPlaying) {
@@ -645,19 +823,30 @@ export class AudioService {
    * Stop audio playback
    */
   public stopPlayback(): void {
-    if (!this.currentSource) {
+    // Drop chunks that are still being decoded or collected
+    this.playbackGeneration++;
+    this.encodedParts = [];
+    
+    if (this.scheduledSources.length === 0) {
       return;
     }
     
     // Store previous state for the event
     const previousState = this.audioState;
     
-    try {
-      this.currentSource.stop();
-      this.currentSource = null;
-    } catch (error) {
-      console.error('Error stopping playback:', error);
-    }
+    // Stop the playing chunk and cancel the ones scheduled after it
+    const sources = this.scheduledSources;
+    this.scheduledSources = [];
+    this.currentSource = null;
+    this.nextStartTime = 0;
+    sources.forEach(source => {
+      try {
+        source.onended = null;
+        source.stop();
+      } catch (error) {
+        console.error('Error stopping playback:', error);
+      }
+    });
     
     // Clear the queue
     this.audioQueue = [];
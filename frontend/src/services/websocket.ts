@@ -7,8 +7,11 @@
 // Message types (corresponds to backend message types)
 export enum MessageType {
   AUDIO = "audio",
+  AUDIO_STREAM = "audio_stream",
   TRANSCRIPTION = "transcription",
+  TRANSCRIPTION_PARTIAL = "transcription_partial",
   LLM_RESPONSE = "llm_response",
+  LLM_DELTA = "llm_delta",
   TTS_CHUNK = "tts_chunk",
   TTS_START = "tts_start",
   TTS_END = "tts_end",
@@ -22,6 +25,7 @@ export enum MessageType {
   SYSTEM_PROMPT_UPDATED = "system_prompt_updated",
   USER_PROFILE = "user_profile",
   USER_PROFILE_UPDATED = "user_profile_updated",
+  TRANSCRIPTION_SETTINGS = "transcription_settings",
   GREETING = "greeting",
   SILENT_FOLLOWUP = "silent_followup",
   
@@ -46,6 +50,47 @@ export enum MessageType {
   VISION_READY = "vision_ready"
 }
 
+// Binary audio frames (corresponds to backend/services/frame_protocol.py)
+// Header: version, frame type, audio format, flags (1 byte each), then
+// turn id, sequence number and sample rate (uint32 little-endian each)
+export const BINARY_PROTOCOL = 'binary';
+const FRAME_VERSION = 1;
+const FRAME_HEADER_SIZE = 16;
+const WAV_HEADER_SIZE = 44;
+
+export enum FrameType {
+  AUDIO = 1,
+  AUDIO_STREAM = 2,
+  TTS_CHUNK = 3
+}
+
+export enum FrameFlag {
+  FINAL = 0x01,
+  CANCEL = 0x02,
+  WAV_HEADER = 0x04,
+  ENCODED = 0x08,
+  STREAM_END = 0x10
+}
+
+// Audio format codes and their JSON names
+const AUDIO_FORMATS: Record<number, string> = {
+  1: 'pcm',
+  2: 'pcm_s16le',
+  3: 'pcm_f32le',
+  4: 'wav',
+  5: 'mp3',
+  6: 'opus',
+  7: 'flac',
+  8: 'aac',
+  9: 'webm'
+};
+
+// Opus containers the server may encode speech to, with the MIME types the browser is asked about
+const OPUS_FORMATS: Record<string, string> = {
+  opus: 'audio/ogg; codecs="opus"',
+  webm: 'audio/webm; codecs="opus"'
+};
+
 // Session interface
 export interface Session {
   id: string;
@@ -68,7 +113,9 @@ type WebSocketEventType =
   | 'error'
   | 'audio'
   | 'transcription'
+  | 'transcription_partial'
   | 'llm_response'
+  | 'llm_delta'
   | 'tts_start'
   | 'tts_chunk'
   | 'tts_end'
@@ -80,6 +127,7 @@ type WebSocketEventType =
   | 'system_prompt_updated'
   | 'user_profile'
   | 'user_profile_updated'
+  | 'transcription_settings'
   | 'save_session_result'
   | 'load_session_result'
   | 'list_sessions_result'
@@ -118,18 +166,32 @@ export class WebSocketService {
   
   // Track states that should prevent interrupt signals
   private isInGreetingFlow: boolean = false;
+  
+  // Conversation session assigned by the backend, resumed on reconnect
+  private sessionId: string | null = null;
+  
+  // After an interrupt, audio already in flight is dropped until the next reply starts
+  private droppingAudio: boolean = false;
+  
+  // Binary audio frames are requested at connect time and used once the server confirms them
+  private requestBinaryFrames: boolean;
+  private binaryFrames: boolean = false;
+  private audioStreamSeq: number = 0;
+  private audioStreamTurn: number = 0;
 
   constructor(
     url: string = 'ws://localhost:8000/ws', 
     autoReconnect: boolean = true,
     reconnectInterval: number = 3000,
-    maxReconnectAttempts: number = 5
+    maxReconnectAttempts: number = 5,
+    requestBinaryFrames: boolean = true
   ) {
     this.url = url;
     this.autoReconnect = autoReconnect;
     this.reconnectInterval = reconnectInterval;
     this.reconnectAttempts = 0;
     this.maxReconnectAttempts = maxReconnectAttempts;
+    this.requestBinaryFrames = requestBinaryFrames;
   }
 
   /**
@@ -144,7 +206,23 @@ export class WebSocketService {
     this.setConnectionState(ConnectionState.CONNECTING);
     
     try {
-      this.socket = new WebSocket(this.url);
+      const params: string[] = [];
+      if (this.sessionId) {
+        params.push(`session_id=${encodeURIComponent(this.sessionId)}`);
+      }
+      if (this.requestBinaryFrames) {
+        params.push(`protocol=${BINARY_PROTOCOL}`);
+      }
+      const audioFormats = WebSocketService.supportedOpusFormats();
+      if (audioFormats.length > 0) {
+        params.push(`audio_formats=${audioFormats.join(',')}`);
+      }
+      const url = params.length > 0
+        ? `${this.url}${this.url.includes('?') ? '&' : '?'}${params.join('&')}`
+        : this.url;
+      this.binaryFrames = false;
+      this.socket = new WebSocket(url);
+      this.socket.binaryType = 'arraybuffer';
       
       this.socket.onopen = this.onOpen.bind(this);
       this.socket.onclose = this.onClose.bind(this);
@@ -203,6 +281,14 @@ export class WebSocketService {
    * Send audio data to the WebSocket server
    */
   public sendAudio(audioData: Float32Array | ArrayBuffer): boolean {
+    // Send the bytes as they are over binary frames
+    if (this.binaryFrames) {
+      const bytes = audioData instanceof Float32Array
+        ? new Uint8Array(audioData.buffer, audioData.byteOffset, audioData.byteLength)
+        : new Uint8Array(audioData);
+      return this.sendFrame(FrameType.AUDIO, 0, 0, 0, bytes);
+    }
+    
     // Convert to base64 if Float32Array
     let base64Data: string;
     
@@ -222,6 +308,65 @@ export class WebSocketService {
     });
   }
 
+  /**
+   * Send a frame of streamed 16-bit PCM audio to the WebSocket server
+   * 
+   * @param pcm PCM samples for this frame (may be empty for the final frame)
+   * @param sampleRate Sample rate of the samples in Hz
+   * @param final Whether this frame ends the utterance
+   * @param cancel Whether the utterance should be discarded
+   */
+  public sendAudioStream(pcm: Int16Array, sampleRate: number, final: boolean = false, cancel: boolean = false): boolean {
+    if (this.binaryFrames) {
+      const flags = (final ? FrameFlag.FINAL : 0) | (cancel ? FrameFlag.CANCEL : 0);
+      const sent = this.sendFrame(FrameType.AUDIO_STREAM, flags, this.audioStreamSeq++, sampleRate,
+        new Uint8Array(pcm.buffer, pcm.byteOffset, pcm.byteLength));
+      
+      // The next frame starts a new utterance
+      if (final || cancel) {
+        this.audioStreamTurn++;
+        this.audioStreamSeq = 0;
+      }
+      return sent;
+    }
+    
+    return this.send(MessageType.AUDIO_STREAM, {
+      audio_data: this.arrayBufferToBase64(pcm.buffer as ArrayBuffer),
+      sample_rate: sampleRate,
+      final,
+      cancel
+    });
+  }
+
+  /**
+   * Send a binary audio frame to the WebSocket server
+   */
+  private sendFrame(type: FrameType, flags: number, seq: number, sampleRate: number, payload: Uint8Array): boolean {
+    if (!this.socket || this.socket.readyState !== WebSocket.OPEN) {
+      console.error('WebSocket not connected');
+      return false;
+    }
+    
+    try {
+      const frame = new Uint8Array(FRAME_HEADER_SIZE + payload.byteLength);
+      const view = new DataView(frame.buffer);
+      view.setUint8(0, FRAME_VERSION);
+      view.setUint8(1, type);
+      view.setUint8(2, type === FrameType.AUDIO_STREAM ? 2 : 0); // 16-bit PCM for streamed frames
+      view.setUint8(3, flags);
+      view.setUint32(4, this.audioStreamTurn, true);
+      view.setUint32(8, seq, true);
+      view.setUint32(12, sampleRate, true);
+      frame.set(payload, FRAME_HEADER_SIZE);
+      
+      this.socket.send(frame.buffer);
+      return true;
+    } catch (error) {
+      console.error('Error sending binary frame:', error);
+      return false;
+    }
+  }
+
   /**
    * Send an interrupt signal to stop ongoing TTS
    * Will not send if we're in the initial greeting flow
@@ -234,6 +379,7 @@ export class WebSocketService {
     }
     
     console.log('Sending interrupt signal to server');
+    this.droppingAudio = true;
     return this.send(MessageType.INTERRUPT);
   }
   
@@ -289,6 +435,31 @@ export class WebSocketService {
     });
   }
   
+  /**
+   * Request the current transcription settings
+   */
+  public getTranscriptionSettings(): boolean {
+    // Send explicit string type expected by backend
+    return this.send("get_transcription_settings" as any);
+  }
+  
+  /**
+   * Update this session's transcription settings
+   * 
+   * Only the settings given are changed; null restores the server default.
+   * 
+   * @param settings.decodingProfile Profile name (realtime, balanced, accurate)
+   * @param settings.model Whisper model tier (e.g. tiny.en, small.en)
+   */
+  public updateTranscriptionSettings(settings: { decodingProfile?: string | null; model?: string | null }): boolean {
+    const payload: Record<string, string | null> = {};
+    if (settings.decodingProfile !== undefined) payload.decoding_profile = settings.decodingProfile;
+    if (settings.model !== undefined) payload.model = settings.model;
+    
+    // Send explicit string type expected by backend
+    return this.send("update_transcription_settings" as any, payload);
+  }
+  
   /**
    * Request the current vision settings
    */
@@ -471,6 +642,11 @@ export class WebSocketService {
    * Handle WebSocket message event
    */
   private onMessage(event: MessageEvent): void {
+    if (event.data instanceof ArrayBuffer) {
+      this.onBinaryMessage(event.data);
+      return;
+    }
+    
     try {
       const message = JSON.parse(event.data);
       const type = message.type as WebSocketEventType;
@@ -489,6 +665,26 @@ export class WebSocketService {
         return;
       }
       
+      // Drop audio the server sent before it saw our interrupt
+      if (message.type === MessageType.TTS_START) {
+        this.droppingAudio = false;
+      } else if (message.type === MessageType.TTS_CHUNK && this.droppingAudio) {
+        console.debug('Dropping audio chunk from interrupted reply');
+        return;
+      }
+      
+      // Remember the conversation session so a reconnect resumes it
+      if (message.type === 'status' && message.status === 'connected' && message.data?.session_id) {
+        this.sessionId = message.data.session_id;
+      }
+      
+      // Use binary audio frames only if the server accepted them
+      if (message.type === 'status' && message.status === 'connected') {
+        this.binaryFrames = message.data?.protocol === BINARY_PROTOCOL;
+        console.log(`Audio protocol: ${this.binaryFrames ? 'binary frames' : 'JSON'}, ` +
+          `speech encoding: ${message.data?.opus_format || 'server default'}`);
+      }
+      
       // Notify listeners
       this.notifyListeners(type, message);
     } catch (error) {
@@ -496,6 +692,48 @@ export class WebSocketService {
     }
   }
 
+  /**
+   * Handle a binary audio frame, delivered to listeners like the JSON message it replaces
+   */
+  private onBinaryMessage(frame: ArrayBuffer): void {
+    if (frame.byteLength < FRAME_HEADER_SIZE) {
+      console.error(`Binary frame of ${frame.byteLength} bytes is shorter than its header`);
+      return;
+    }
+    
+    const view = new DataView(frame);
+    const version = view.getUint8(0);
+    const type = view.getUint8(1);
+    if (version !== FRAME_VERSION || type !== FrameType.TTS_CHUNK) {
+      console.error(`Unsupported binary frame (version ${version}, type ${type})`);
+      return;
+    }
+    
+    // Drop audio the server sent before it saw our interrupt
+    if (this.droppingAudio) {
+      console.debug('Dropping audio chunk from interrupted reply');
+      return;
+    }
+    
+    const flags = view.getUint8(3);
+    let offset = FRAME_HEADER_SIZE;
+    let header: ArrayBuffer | undefined;
+    if (flags & FrameFlag.WAV_HEADER) {
+      header = frame.slice(offset, offset + WAV_HEADER_SIZE);
+      offset += WAV_HEADER_SIZE;
+    }
+    
+    this.notifyListeners('tts_chunk', {
+      type: MessageType.TTS_CHUNK,
+      audio_chunk: frame.slice(offset),
+      audio_header: header,
+      format: AUDIO_FORMATS[view.getUint8(2)] || 'wav',
+      stream_end: flags & FrameFlag.ENCODED ? (flags & FrameFlag.STREAM_END) !== 0 : undefined,
+      turn_id: view.getUint32(4, true),
+      seq: view.getUint32(8, true)
+    });
+  }
+
   /**
    * Notify all listeners of an event
    */
@@ -535,6 +773,17 @@ export class WebSocketService {
     this.connectionState = state;
   }
 
+  /**
+   * Get the Opus containers this browser can decode, for the server to encode speech to
+   */
+  private static supportedOpusFormats(): string[] {
+    if (typeof document === 'undefined') {
+      return [];
+    }
+    const probe = document.createElement('audio');
+    return Object.keys(OPUS_FORMATS).filter(format => probe.canPlayType(OPUS_FORMATS[format]) !== '');
+  }
+
   /**
    * Convert ArrayBuffer to Base64 string
    */
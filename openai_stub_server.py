@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Minimal OpenAI-compatible stub server for testing the OpenAI Agent offline.
+
+Serves the three endpoints the agent uses, streaming the way the real API
+does: chat completions (server-sent events when stream=true), speech
+(a sine tone streamed in small pieces) and transcriptions (multipart
+upload). Replies are canned, so no API key or network access is needed.
+
+Usage:
+    python openai_stub_server.py [--port 8000]
+    OPENAI_BASE_URL=http://127.0.0.1:8000/v1 OPENAI_API_KEY=stub USE_OPENAI=true \\
+        python test_openai_integration.py
+"""
+
+import json
+import time
+import asyncio
+import argparse
+from typing import Any, Dict
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, File, Form, UploadFile
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from backend.services.audio_processing import wav_header
+
+SAMPLE_RATE = 24000  # The speech API's raw PCM rate
+TOKEN_DELAY_S = 0.02
+AUDIO_PIECE_MS = 50
+
+app = FastAPI(title="OpenAI stub")
+
+def completion_chunk(model: str, delta: Dict[str, Any], finish_reason=None) -> str:
+    """Format one chat.completion.chunk server-sent event."""
+    return "data: " + json.dumps({
+        "id": "chatcmpl-stub",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    }) + "\n\n"
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: Dict[str, Any]):
+    """Reply with a canned sentence quoting the last user message."""
+    model = body.get("model", "stub")
+    user_messages = [m["content"] for m in body.get("messages", []) if m.get("role") == "user"]
+    reply = f"This is the stub server. You said: {user_messages[-1] if user_messages else ''}"
+    usage = {"prompt_tokens": sum(len(str(m.get("content", "")).split()) for m in body.get("messages", [])),
+             "completion_tokens": len(reply.split())}
+    usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+    if not body.get("stream"):
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            "usage": usage
+        }
+
+    async def events():
+        yield completion_chunk(model, {"role": "assistant", "content": ""})
+        for i, word in enumerate(reply.split(" ")):
+            await asyncio.sleep(TOKEN_DELAY_S)
+            yield completion_chunk(model, {"content": word if i == 0 else " " + word})
+        yield completion_chunk(model, {}, "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield "data: " + json.dumps({"id": "chatcmpl-stub", "object": "chat.completion.chunk",
+                                         "created": int(time.time()), "model": model,
+                                         "choices": [], "usage": usage}) + "\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.post("/v1/audio/speech")
+async def speech(body: Dict[str, Any]):
+    """Stream a tone lasting about 60 ms per character (raw PCM, or WAV for any other format)."""
+    duration_s = min(10.0, 0.06 * len(body.get("input", "")))
+    t = np.arange(int(duration_s * SAMPLE_RATE)) / SAMPLE_RATE
+    pcm = (np.sin(2 * np.pi * 220 * t) * 8000).astype(np.int16).tobytes()
+    raw = body.get("response_format") == "pcm"
+    piece_bytes = SAMPLE_RATE * AUDIO_PIECE_MS // 1000 * 2
+
+    async def audio():
+        if not raw:
+            yield wav_header(SAMPLE_RATE, 1, 16)
+        for start in range(0, len(pcm), piece_bytes):
+            await asyncio.sleep(AUDIO_PIECE_MS / 1000 / 4)  # Synthesis runs faster than real time
+            yield pcm[start:start + piece_bytes]
+
+    return StreamingResponse(audio(), media_type="audio/pcm" if raw else "audio/wav")
+
+@app.post("/v1/audio/transcriptions")
+async def transcriptions(file: UploadFile = File(...), model: str = Form("whisper-1"),
+                         response_format: str = Form("json")):
+    """Describe the uploaded audio instead of transcribing it."""
+    audio = await file.read()
+    text = f"Stub transcription of {len(audio)} bytes from {file.filename}"
+    if response_format == "text":
+        return PlainTextResponse(text)
+    return {"text": text}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
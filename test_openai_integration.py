@@ -2,6 +2,10 @@
 """
 Test script to verify OpenAI Agent SDK integration with Vocalis backend.
 This script tests the basic functionality without requiring the full frontend.
+
+Set OPENAI_BASE_URL to run it against an OpenAI-compatible server instead
+of OpenAI, e.g. the bundled stub (python openai_stub_server.py) at
+http://127.0.0.1:8000/v1.
 """
 
 import sys
@@ -9,6 +13,7 @@ import os
 import asyncio
 import json
 import base64
+import time
 from pathlib import Path
 
 # Add the backend directory to Python path
@@ -36,12 +41,16 @@ async def test_openai_agent():
         print("❌ OpenAI not enabled. Please set USE_OPENAI=true in backend/.env")
         return False
     
+    agent = None
     try:
         # Initialize OpenAI Agent
         print("🔧 Initializing OpenAI Agent...")
         agent = OpenAIAgent(
             api_key=config["openai_api_key"],
-            model=config["openai_model"]
+            model=config["openai_model"],
+            base_url=config["openai_base_url"] or None,
+            tts_voice=config["openai_tts_voice"],
+            tts_model=config["openai_tts_model"]
         )
         
         # Test basic conversation
@@ -49,7 +58,7 @@ async def test_openai_agent():
         system_prompt = "You are a helpful assistant. Respond briefly."
         user_message = "Hello! Can you introduce yourself?"
         
-        response = agent.get_response(user_message, system_prompt)
+        response = await agent.get_response(user_message, system_prompt)
         
         print(f"✅ Conversation test successful!")
         print(f"   User: {user_message}")
@@ -63,11 +72,53 @@ async def test_openai_agent():
         print(f"✅ TTS test successful!")
         print(f"   Generated {len(audio_data)} bytes of audio data")
         
+        # Test streamed conversation
+        print("💬 Testing streamed conversation...")
+        start_time = time.perf_counter()
+        first_token = None
+        deltas = 0
+        async for event in agent.stream_response(user_message, system_prompt):
+            if "delta" in event:
+                deltas += 1
+                first_token = first_token or time.perf_counter() - start_time
+            else:
+                response = event
+        if "error" in response or not deltas:
+            raise RuntimeError(f"streamed conversation failed: {response.get('error', 'no tokens')}")
+        
+        print(f"✅ Streamed conversation test successful!")
+        print(f"   {deltas} deltas, first after {first_token:.2f}s: {response['text']}")
+        
+        # Test streamed TTS
+        print("🔊 Testing streamed TTS...")
+        start_time = time.perf_counter()
+        first_piece = None
+        pieces = []
+        async for piece in agent.stream_audio(tts_text):
+            first_piece = first_piece or time.perf_counter() - start_time
+            pieces.append(piece)
+        if not pieces or pieces[0].header is None:
+            raise RuntimeError("streamed TTS returned no playable audio")
+        
+        print(f"✅ Streamed TTS test successful!")
+        print(f"   {len(pieces)} {pieces[0].format} pieces, first after {first_piece:.2f}s")
+        
+        # Test speech-to-text, uploading the synthesized speech from memory
+        print("🎤 Testing speech-to-text...")
+        wav_data = pieces[0].header + b"".join(piece.data for piece in pieces)
+        transcript = await agent.speech_to_text(wav_data)
+        
+        print(f"✅ Speech-to-text test successful!")
+        print(f"   Transcript: {transcript.strip()}")
+        
         return True
         
     except Exception as e:
         print(f"❌ Test failed: {e}")
         return False
+    finally:
+        if agent is not None:
+            await agent.close()
 
 async def test_configuration():
     """Test the configuration system."""
@@ -77,6 +128,7 @@ async def test_configuration():
     
     print(f"   USE_OPENAI: {config['use_openai']}")
     print(f"   OPENAI_MODEL: {config['openai_model']}")
+    print(f"   OPENAI_BASE_URL: {config['openai_base_url'] or '[OpenAI]'}")
     print(f"   OPENAI_TTS_VOICE: {config['openai_tts_voice']}")
     print(f"   OPENAI_TTS_MODEL: {config['openai_tts_model']}")
     
@@ -0,0 +1,127 @@
+"""
+Audio Processing Tests
+
+Covers streamed resampling against the one-shot resampler and splitting
+of streamed WAV files into playable pieces.
+"""
+
+import struct
+
+import numpy as np
+import pytest
+
+from backend.services.audio_processing import (
+    StreamResampler, WavStreamSplitter, WAVE_FORMAT_IEEE_FLOAT, resample, wav_header
+)
+
+RATE_PAIRS = [(48000, 16000), (44100, 16000), (22050, 16000), (8000, 16000), (24000, 16000)]
+
+def _signal(rate: int, seconds: float = 0.5) -> np.ndarray:
+    rng = np.random.default_rng(rate)
+    return rng.uniform(-1, 1, int(rate * seconds)).astype(np.float32)
+
+def _stream(resampler: StreamResampler, samples: np.ndarray, frame_sizes) -> np.ndarray:
+    outputs = []
+    start = 0
+    for size in frame_sizes:
+        outputs.append(resampler.process(samples[start:start + size]))
+        start += size
+    outputs.append(resampler.process(samples[start:]))
+    outputs.append(resampler.flush())
+    return np.concatenate(outputs)
+
+@pytest.mark.parametrize("from_rate,to_rate", RATE_PAIRS)
+@pytest.mark.parametrize("frame_size", [1, 7, 160, 441, 1024])
+def test_streamed_output_matches_one_shot(from_rate, to_rate, frame_size):
+    samples = _signal(from_rate)
+    streamed = _stream(StreamResampler(from_rate, to_rate), samples, [frame_size] * (len(samples) // frame_size))
+
+    expected = resample(samples, from_rate, to_rate)
+    assert len(streamed) == len(expected)
+    np.testing.assert_allclose(streamed, expected, atol=1e-5)
+
+@pytest.mark.parametrize("from_rate,to_rate", RATE_PAIRS)
+def test_irregular_frames_match_one_shot(from_rate, to_rate):
+    samples = _signal(from_rate)
+    frame_sizes = np.random.default_rng(0).integers(0, 2000, 30)
+    streamed = _stream(StreamResampler(from_rate, to_rate), samples, frame_sizes)
+
+    np.testing.assert_allclose(streamed, resample(samples, from_rate, to_rate), atol=1e-5)
+
+def test_passthrough():
+    resampler = StreamResampler(16000, 16000)
+    samples = _signal(16000)
+
+    np.testing.assert_array_equal(resampler.process(samples), samples)
+    assert len(resampler.flush()) == 0
+
+def _wav(pcm: bytes, sample_rate: int = 24000, channels: int = 1, bits: int = 16,
+         data_size=None, extra_chunk: bytes = b"") -> bytes:
+    """Build a WAV file with an optional chunk between fmt and data."""
+    header = wav_header(sample_rate, channels, bits)
+    fmt = header[12:36]
+    size = len(pcm) if data_size is None else data_size
+    return (b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE" + fmt + extra_chunk
+            + b"data" + struct.pack("<I", size) + pcm)
+
+def _split(data: bytes, splitter: WavStreamSplitter, piece: int) -> list:
+    pieces = []
+    for start in range(0, len(data), piece):
+        pieces.extend(splitter.feed(data[start:start + piece]))
+    return pieces + splitter.flush()
+
+@pytest.mark.parametrize("piece", [1, 3, 44, 45, 1000, 100000])
+def test_pieces_rejoin_to_the_data_chunk(piece):
+    pcm = np.arange(24000 * 2 + 17, dtype=np.int16).tobytes()
+    splitter = WavStreamSplitter(chunk_ms=250)
+    pieces = _split(_wav(pcm), splitter, piece)
+
+    assert b"".join(pieces) == pcm
+    assert all(len(p) == 6000 * 2 for p in pieces[:-1])
+    assert 0 < len(pieces[-1]) <= 6000 * 2
+    assert splitter.header == wav_header(24000, 1, 16)
+
+def test_pieces_are_cut_on_sample_frames():
+    pcm = np.zeros(4410 * 2, dtype=np.float32).tobytes()
+    data = (b"RIFF" + struct.pack("<I", 0) + b"WAVE"
+            + wav_header(44100, 2, 32, WAVE_FORMAT_IEEE_FLOAT)[12:36]
+            + b"data" + struct.pack("<I", len(pcm)) + pcm)
+    pieces = _split(data, WavStreamSplitter(chunk_ms=33), 777)
+
+    assert b"".join(pieces) == pcm
+    assert all(len(p) % 8 == 0 for p in pieces)
+
+def test_declared_data_size_stops_the_stream():
+    pcm = np.ones(1000, dtype=np.int16).tobytes()
+    pieces = _split(_wav(pcm, data_size=800) + b"LIST trailing chunk", WavStreamSplitter(), 64)
+
+    assert b"".join(pieces) == pcm[:800]
+
+def test_odd_sized_chunks_before_data_are_skipped():
+    pcm = np.ones(100, dtype=np.int16).tobytes()
+    extra = b"LIST" + struct.pack("<I", 3) + b"abc" + b"\0"
+    pieces = _split(_wav(pcm, extra_chunk=extra), WavStreamSplitter(), 5)
+
+    assert b"".join(pieces) == pcm
+
+def test_trailing_partial_frame_is_dropped():
+    pcm = np.ones(100, dtype=np.int16).tobytes()
+    pieces = _split(_wav(pcm + b"\x01"), WavStreamSplitter(), 7)
+
+    assert b"".join(pieces) == pcm
+
+def test_no_pieces_until_the_header_is_complete():
+    splitter = WavStreamSplitter()
+    data = _wav(np.ones(24000, dtype=np.int16).tobytes())
+
+    assert splitter.feed(data[:43]) == []
+    assert splitter.header is None
+    assert splitter.feed(data[43:]) != []
+
+def test_truncated_or_unsupported_streams_are_rejected():
+    with pytest.raises(ValueError):
+        WavStreamSplitter().flush()
+    with pytest.raises(ValueError):
+        WavStreamSplitter().feed(b"RIFF\0\0\0\0AVI LIST")
+    with pytest.raises(ValueError):
+        WavStreamSplitter().feed(_wav(b"\0" * 30, bits=24))
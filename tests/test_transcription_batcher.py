@@ -0,0 +1,165 @@
+"""
+Transcription Batching Tests
+
+Covers the clip layout handed to faster-whisper's batched pipeline, the
+mapping of decoded segments back to requests, and draining on close().
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from backend.services.transcription_batcher import BatchingScheduler, layout_batch_clips
+
+# faster-whisper's feature extractor defaults
+SAMPLING_RATE = 16000
+CHUNK_SAMPLES = 30 * SAMPLING_RATE
+FRAME_SAMPLES = 160
+FRAMES_PER_SECOND = SAMPLING_RATE // FRAME_SAMPLES
+
+# Lengths around frame boundaries and the 30 s window, where an off-by-one would show
+SEGMENT_LENGTHS = [1, 159, 160, 161, 16000, 16001, CHUNK_SAMPLES - 1, CHUNK_SAMPLES,
+                   CHUNK_SAMPLES + 1, 2 * CHUNK_SAMPLES + 80]
+
+def _segments(lengths):
+    """Build (index, samples) pairs whose samples identify the request."""
+    return [(index, np.full(length, index + 1, dtype=np.float32)) for index, length in enumerate(lengths)]
+
+def _layout(segments):
+    return layout_batch_clips(segments, SAMPLING_RATE, CHUNK_SAMPLES, FRAME_SAMPLES, FRAMES_PER_SECOND)
+
+def test_clips_are_frame_aligned_and_separated():
+    audio, clips, _ = _layout(_segments(SEGMENT_LENGTHS))
+
+    for clip, following in zip(clips, clips[1:] + [None]):
+        assert clip["start"] % FRAME_SAMPLES == 0
+        assert 0 < clip["end"] - clip["start"] <= CHUNK_SAMPLES
+        gap_end = following["start"] if following else len(audio)
+        assert gap_end - clip["end"] >= FRAME_SAMPLES
+        assert not audio[clip["end"]:gap_end].any()
+    assert len(audio) % FRAME_SAMPLES == 0
+
+def test_clips_cover_every_sample_in_order():
+    segments = _segments(SEGMENT_LENGTHS)
+    audio, clips, seek_to_index = _layout(segments)
+
+    rebuilt = {index: [] for index, _ in segments}
+    for clip in clips:
+        samples = audio[clip["start"]:clip["end"]]
+        index = seek_to_index[int(clip["start"] / SAMPLING_RATE * FRAMES_PER_SECOND)]
+        assert (samples == index + 1).all()
+        rebuilt[index].append(samples)
+
+    for index, samples in segments:
+        np.testing.assert_array_equal(np.concatenate(rebuilt[index]), samples)
+
+def test_long_segments_split_into_windows():
+    _, clips, seek_to_index = _layout(_segments([2 * CHUNK_SAMPLES + 80]))
+
+    assert [clip["end"] - clip["start"] for clip in clips] == [CHUNK_SAMPLES, CHUNK_SAMPLES, 80]
+    assert set(seek_to_index.values()) == {0}
+    assert len(seek_to_index) == 3
+
+def test_seek_values_are_unique_per_clip():
+    _, clips, seek_to_index = _layout(_segments(SEGMENT_LENGTHS))
+
+    assert len(seek_to_index) == len(clips)
+
+def test_skipped_requests_get_no_clip():
+    segments = [(0, np.ones(800, dtype=np.float32)), (2, np.ones(1600, dtype=np.float32))]
+    _, clips, seek_to_index = _layout(segments)
+
+    assert len(clips) == 2
+    assert sorted(seek_to_index.values()) == [0, 2]
+
+def test_empty_batch():
+    audio, clips, seek_to_index = _layout([])
+
+    assert len(audio) == 0
+    assert clips == [] and seek_to_index == {}
+
+def test_seek_matches_pipeline_output():
+    vad = pytest.importorskip("faster_whisper.vad")
+    segments = _segments(SEGMENT_LENGTHS)
+    audio, clips, seek_to_index = _layout(segments)
+
+    # The batched pipeline sets Segment.seek from the chunk start time this way
+    _, chunks_metadata = vad.collect_chunks(audio, clips, sampling_rate=SAMPLING_RATE)
+    indices = [seek_to_index[int(chunk["start_time"] * FRAMES_PER_SECOND)] for chunk in chunks_metadata]
+
+    expected = [index for index, samples in segments for _ in range(0, len(samples), CHUNK_SAMPLES)]
+    assert indices == expected
+
+def _echo_scheduler(release: asyncio.Event, batch_sizes: list, **kwargs) -> BatchingScheduler:
+    """Scheduler whose batches wait for release and echo each segment's first sample."""
+    async def run_batch(audios, profile):
+        batch_sizes.append(len(audios))
+        await release.wait()
+        return [(f"{profile}:{int(audio[0])}", {}) for audio in audios]
+    return BatchingScheduler(run_batch, **kwargs)
+
+def test_close_drains_queued_and_in_flight_segments():
+    async def scenario():
+        release = asyncio.Event()
+        batch_sizes = []
+        scheduler = _echo_scheduler(release, batch_sizes, max_batch_size=2, max_wait_ms=1, concurrency=1)
+        submits = [asyncio.create_task(scheduler.submit(np.full(1, i, dtype=np.float32), "fast"))
+                   for i in range(7)]
+
+        # One batch in flight, one being built while the worker is busy, the rest queued
+        await asyncio.sleep(0.05)
+        closing = asyncio.create_task(scheduler.close())
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.wait_for(closing, 1)
+
+        results = await asyncio.wait_for(asyncio.gather(*submits), 1)
+        assert [text for text, _ in results] == [f"fast:{i}" for i in range(7)]
+        assert all(size <= 2 for size in batch_sizes)
+        assert sum(batch_sizes) == 7
+        assert not scheduler._slots.locked()
+
+    asyncio.run(scenario())
+
+@pytest.mark.parametrize("delay", [0, 0.0005, 0.002, 0.02])
+def test_close_during_batch_window(delay):
+    async def scenario():
+        release = asyncio.Event()
+        release.set()
+        batch_sizes = []
+        scheduler = _echo_scheduler(release, batch_sizes, max_batch_size=4, max_wait_ms=10, concurrency=1)
+        submits = [asyncio.create_task(scheduler.submit(np.full(1, i, dtype=np.float32))) for i in range(5)]
+
+        await asyncio.sleep(delay)
+        await asyncio.wait_for(scheduler.close(), 1)
+
+        results = await asyncio.wait_for(asyncio.gather(*submits), 1)
+        assert [text for text, _ in results] == [f"None:{i}" for i in range(5)]
+        assert not scheduler._slots.locked()
+
+    asyncio.run(scenario())
+
+def test_close_fails_waiters_when_the_batch_fails():
+    async def scenario():
+        async def run_batch(audios, profile):
+            raise RuntimeError("decoder failed")
+        scheduler = BatchingScheduler(run_batch, max_batch_size=2, max_wait_ms=50)
+        submits = [asyncio.create_task(scheduler.submit(np.zeros(1, dtype=np.float32))) for _ in range(3)]
+
+        await asyncio.sleep(0)
+        await asyncio.wait_for(scheduler.close(), 1)
+
+        results = await asyncio.gather(*submits, return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    asyncio.run(scenario())
+
+def test_submit_after_close_is_rejected():
+    async def scenario():
+        scheduler = _echo_scheduler(asyncio.Event(), [])
+        await scheduler.close()
+        with pytest.raises(RuntimeError):
+            await scheduler.submit(np.zeros(1, dtype=np.float32))
+
+    asyncio.run(scenario())